@@ -0,0 +1,813 @@
+# Copyright Peter Roger. All rights reserved.
+#
+# This file is part of relathon. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE file.
+
+"""This module implements the relation algorithms behind several
+builtin functions. Each algorithm works directly on the pyrel Relation
+datatype so that loops which would otherwise be interpreted statement by
+statement run natively. Where an algorithm needs the pairs of a
+relation, they are read with set operations by an Elements reader, so
+the cost follows the pairs read rather than the dimension."""
+
+import weakref
+from itertools import count as count_from
+from pyrel import Relation
+
+
+def closure(relation):
+    """Return the transitive closure of a homogeneous relation.
+
+    The closure is computed by iterative squaring (R := R | R*R), so
+    only O(log n) rounds are needed instead of the O(n) of the naive
+    power series. Since R*R only gains pairs through the pairs added in
+    the last round, each round composes just that delta with R, and the
+    loop stops as soon as a round adds nothing.
+    """
+    result = delta = relation
+    while True:
+        step = Relation.join(Relation.composition(delta, result), Relation.composition(result, delta))
+        delta = Relation.meet(step, Relation.complement(result))
+        if delta.is_empty():
+            # a builtin never returns its argument itself
+            return relation.copy() if result is relation else result
+        result = Relation.join(result, delta)
+
+
+def reflexive_closure(relation):
+    """Return the reflexive transitive closure of a homogeneous relation."""
+    return Relation.join(closure(relation), Relation.identity(relation))
+
+
+class Elements:
+    """Reads the elements of the n x 1 vectors over n elements with set
+    operations alone, so no relation is ever rendered or enumerated
+    pair by pair.
+
+    A vector is split at the middle of the range of elements it may
+    hold until each part is empty or holds its whole range, so a vector
+    of k runs of consecutive elements is read in O(k log n) meets and
+    tests. Only O(n) distinct middles occur, so the vector of the
+    elements below each of them is built once and kept.
+
+    Attributes:
+        context - weak reference to the PyrelContext of the vectors
+        n (int) - number of elements
+        belows (dict) - the vector of the elements below each middle
+    """
+
+    def __init__(self, context, n):
+        # the reader is kept with its context and must not keep it alive
+        self.context = weakref.proxy(context)
+        self.n = n
+        self.belows = {}
+        self._less = None
+
+    @property
+    def less(self):
+        """The n x n strict order relating x to y iff x < y."""
+        if self._less is None:
+            self._less = closure(self.context.new(self.n, self.n, [(x, x + 1) for x in range(self.n - 1)]))
+        return self._less
+
+    def below(self, middle):
+        """Return the n x 1 vector of the elements below middle."""
+        below = self.belows.get(middle)
+        if below is None:
+            below = self.belows[middle] = self.context.new(self.n, 1, [(x, 0) for x in range(middle)])
+        return below
+
+    def point(self, x):
+        """Return the n x 1 vector of element x."""
+        return self.context.new(self.n, 1, [(x, 0)])
+
+    def runs(self, vector):
+        """Yield the ranges (lower, upper) of consecutive elements of
+        the vector in ascending order, upper excluded."""
+        ones = Relation.universal(self.context.new(self.n, 1))
+        parts = [(vector, ones, 0, self.n)]
+        while parts:
+            part, whole, lower, upper = parts.pop()
+            if part.is_empty():
+                continue
+            if Relation.equals(part, whole):
+                yield lower, upper
+                continue
+            middle = (lower + upper) // 2
+            below = self.below(middle)
+            above = Relation.complement(below)
+            parts.append((Relation.meet(part, above), Relation.meet(whole, above), middle, upper))
+            parts.append((Relation.meet(part, below), Relation.meet(whole, below), lower, middle))
+
+    def read(self, vector):
+        """Yield the elements of the vector in ascending order."""
+        for lower, upper in self.runs(vector):
+            yield from range(lower, upper)
+
+    def first(self, vector):
+        """Return the smallest element of the vector, or None if it is
+        empty."""
+        return next(self.read(vector), None)
+
+    def count(self, vector):
+        """Return the number of elements of the vector."""
+        return sum(upper - lower for lower, upper in self.runs(vector))
+
+
+# the readers of each context, which live as long as the context
+_readers = weakref.WeakKeyDictionary()
+
+
+def reader(context, n):
+    """Return the Elements reader of n elements of context, which is
+    kept for the next relation of that size."""
+    readers = _readers.setdefault(context, {})
+    if n not in readers:
+        readers[n] = Elements(context, n)
+    return readers[n]
+
+
+def ones(context, n):
+    """Return the n x 1 vector of all elements."""
+    return Relation.universal(context.new(n, 1))
+
+
+def power(relation, n):
+    """Return relation composed with itself n times.
+
+    Exponentiation by repeated squaring needs O(log n) compositions.
+    The zeroth power is the identity.
+    """
+    if relation.rows != relation.cols:
+        raise ValueError("power needs a homogeneous relation, not [{}<->{}].".format(relation.rows, relation.cols))
+    if n < 0:
+        raise ValueError("power needs a non-negative exponent, not {}.".format(n))
+    result = None
+    square = relation
+    while n:
+        if n & 1:
+            result = square if result is None else Relation.composition(result, square)
+        n >>= 1
+        if n:
+            square = Relation.composition(square, square)
+    if result is None:
+        return Relation.identity(relation)
+    return relation.copy() if result is relation else result
+
+
+def _check_dimensions(relations):
+    """Raise ValueError unless all relations have the same dimension."""
+    dimension = (relations[0].rows, relations[0].cols)
+    for relation in relations:
+        if (relation.rows, relation.cols) != dimension:
+            raise ValueError("relations of dimension [{}<->{}] and [{}<->{}] cannot be combined.".format(*dimension, relation.rows, relation.cols))
+
+
+def join_all(relations):
+    """Return the join of a non-empty list of relations, boolean or
+    weighted.
+
+    The relations are joined pairwise in a balanced tree, so the chain
+    is only O(log n) joins deep and most intermediate results stay as
+    small as their operands.
+    """
+    _check_dimensions(relations)
+    original = relations
+    while len(relations) > 1:
+        joined = [a.join(b) for a, b in zip(relations[::2], relations[1::2])]
+        if len(relations) % 2:
+            joined.append(relations[-1])
+        relations = joined
+    return relations[0].copy() if relations is original else relations[0]
+
+
+def meet_all(relations):
+    """Return the meet of a non-empty list of relations, stopping as
+    soon as the intermediate result is empty.
+
+    pyrel gives no cheap estimate of the size of a relation, so the
+    operands are not reordered smallest first. Only an empty operand,
+    which is found without a meet, is moved to the front and ends the
+    reduction at once; the others are met from left to right.
+    """
+    _check_dimensions(relations)
+    for relation in relations:
+        if relation.is_empty():
+            return relation.copy()
+    if len(relations) == 1:
+        return relations[0].copy()
+    result = relations[0]
+    for relation in relations[1:]:
+        result = Relation.meet(result, relation)
+        if result.is_empty():
+            break
+    return result
+
+
+def reach(relation, vector, steps=None):
+    """Return the vector of elements reachable from vector by relation.
+
+    Level-synchronous breadth-first search: only the frontier of newly
+    reached elements is composed with the converse in each step and met
+    with the set of unvisited elements, which shrinks by the frontier.
+    The search stops as soon as the frontier is empty or after steps
+    levels. Since composition acts on every column at once, a relation
+    whose columns hold different source sets is searched bit-parallel.
+    """
+    converse = Relation.transpose(relation)
+    unvisited = Relation.complement(vector)
+    frontier = vector
+    while not frontier.is_empty() and (steps is None or steps > 0):
+        frontier = Relation.meet(Relation.composition(converse, frontier), unvisited)
+        unvisited = Relation.meet(unvisited, Relation.complement(frontier))
+        if steps is not None:
+            steps -= 1
+    return Relation.complement(unvisited)
+
+
+def projection(context, numbering):
+    """Return the n x k relation mapping each element to its class,
+    where numbering maps the n elements to k class numbers."""
+    classes = max(numbering) + 1 if numbering else 1
+    return context.new(len(numbering), classes, list(enumerate(numbering)))
+
+
+def classes(context, equivalence):
+    """Return the n x k projection mapping each element to its class
+    under an equivalence, and the smallest element of each class.
+    Classes are numbered in the order of their smallest element.
+
+    An element is the smallest of its class unless it is equivalent to a
+    smaller one, so only the k smallest elements are read.
+    """
+    n = equivalence.rows
+    order = reader(context, n)
+    larger = Relation.meet(equivalence, Relation.transpose(order.less))
+    smallest = list(order.read(Relation.complement(Relation.composition(larger, ones(context, n)))))
+    select = context.new(n, len(smallest), [(x, c) for c, x in enumerate(smallest)])
+    return Relation.composition(equivalence, select), smallest
+
+
+def scc(context, relation):
+    """Return the equivalence relation of mutually reachable elements.
+
+    Forward-backward decomposition: the elements reachable both from
+    and to a pivot, the smallest element of a part, are its component.
+    The remaining elements reached only forward, only backward, or not
+    at all each hold whole components and are decomposed in turn. Before
+    a pivot is chosen, the elements of a part that have no successor or
+    no predecessor within it are trimmed off as components of their own,
+    so an acyclic relation needs no search at all.
+    """
+    n = relation.rows
+    order = reader(context, n)
+    all_ = ones(context, n)
+    components = Relation.identity(relation)
+    parts = [all_]
+    while parts:
+        part = parts.pop()
+        while True:
+            inner = Relation.meet(relation, Relation.composition(part, Relation.transpose(part)))
+            cyclic = Relation.meet(Relation.composition(inner, all_),
+                                   Relation.composition(Relation.transpose(inner), all_))
+            if Relation.equals(cyclic, part):
+                break
+            part = cyclic
+        if part.is_empty():
+            continue
+        pivot = order.point(order.first(part))
+        forward = reach(inner, pivot)
+        backward = reach(Relation.transpose(inner), pivot)
+        component = Relation.meet(forward, backward)
+        components = Relation.join(components, Relation.composition(component, Relation.transpose(component)))
+        for rest in (Relation.meet(forward, Relation.complement(component)),
+                     Relation.meet(backward, Relation.complement(component)),
+                     Relation.meet(part, Relation.complement(Relation.join(forward, backward)))):
+            if not rest.is_empty():
+                parts.append(rest)
+    return components
+
+
+def condense(context, relation):
+    """Return the quotient of relation by its strongly connected
+    components, a k x k acyclic relation between the components.
+    Component c is the component with the c-th smallest element."""
+    project, _ = classes(context, scc(context, relation))
+    quotient = Relation.composition(Relation.transpose(project),
+                                    Relation.composition(relation, project))
+    return Relation.meet(quotient, Relation.complement(Relation.identity(quotient)))
+
+
+def bisimulation(context, relation, partition):
+    """Return the coarsest stable refinement of the equivalence
+    partition under relation: the largest bisimulation contained in it.
+
+    Paige-Tarjan relational coarsest partition: blocks are refined
+    against the smaller half of a compound block, and per-element edge
+    counts into each compound block give the three-way split without
+    scanning the larger half, for O(m log n) time in the m pairs of the
+    relation.
+    """
+    if relation.rows != partition.rows or partition.rows != partition.cols:
+        raise ValueError("bisimulation needs a partition of dimension [{0}<->{0}], not [{1}<->{2}].".format(relation.rows, partition.rows, partition.cols))
+    if not (Relation.isSubset(Relation.identity(partition), partition)
+            and Relation.isSubset(Relation.transpose(partition), partition)
+            and Relation.isSubset(Relation.composition(partition, partition), partition)):
+        raise ValueError("bisimulation needs the partition to be an equivalence relation.")
+    n = relation.rows
+    class_of = [0] * n
+    project, _ = classes(context, partition)
+    for x, c in pairs(context, project):
+        class_of[x] = c
+    predecessors = [[] for _ in range(n)]
+    successors = [0] * n
+    for x, y in pairs(context, relation):
+        predecessors[y].append(x)
+        successors[x] += 1
+
+    # initial blocks: the classes of the partition, split by whether an
+    # element has a successor at all, so they are stable with respect
+    # to the single compound block of all elements
+    initial = {}
+    blocks = {}
+    block_of = []
+    for x in range(n):
+        key = (class_of[x], successors[x] != 0)
+        if key not in initial:
+            initial[key] = len(blocks)
+            blocks[initial[key]] = set()
+        blocks[initial[key]].add(x)
+        block_of.append(initial[key])
+    compound = {0: set(blocks)}
+    compound_of = dict.fromkeys(blocks, 0)
+    count = {(x, 0): successors[x] for x in range(n) if successors[x]}
+    splitters = [0]
+    block_ids, compound_ids = count_from(len(blocks)), count_from(1)
+
+    def split(xs):
+        """Move the elements xs of each block into a new block."""
+        twins = {}
+        for x in xs:
+            block = block_of[x]
+            if block not in twins:
+                twins[block] = next(block_ids)
+                blocks[twins[block]] = set()
+            blocks[block].discard(x)
+            blocks[twins[block]].add(x)
+            block_of[x] = twins[block]
+        for block, twin in twins.items():
+            if not blocks[block]:
+                # every element moved; keep the block as it was
+                blocks[block] = blocks.pop(twin)
+                for x in blocks[block]:
+                    block_of[x] = block
+            else:
+                outer = compound_of[block]
+                compound[outer].add(twin)
+                compound_of[twin] = outer
+                if len(compound[outer]) == 2:
+                    splitters.append(outer)
+
+    while splitters:
+        outer = splitters.pop()
+        if len(compound[outer]) < 2:
+            continue
+        first, second = list(compound[outer])[:2]
+        smaller = first if len(blocks[first]) <= len(blocks[second]) else second
+        compound[outer].discard(smaller)
+        if len(compound[outer]) > 1:
+            splitters.append(outer)
+        inner = next(compound_ids)
+        compound[inner] = {smaller}
+        compound_of[smaller] = inner
+
+        into = {}
+        for y in blocks[smaller]:
+            for x in predecessors[y]:
+                into[x] = into.get(x, 0) + 1
+        split(into)
+        # elements whose every edge into the compound block ends in the
+        # smaller block
+        split([x for x, c in into.items() if c == count[(x, outer)]])
+        for x, c in into.items():
+            count[(x, outer)] -= c
+            count[(x, inner)] = c
+
+    numbering = {}
+    project = projection(context, [numbering.setdefault(block, len(numbering)) for block in block_of])
+    return Relation.composition(project, Relation.transpose(project))
+
+
+def reduce(context, relation):
+    """Return the transitive reduction of a homogeneous relation: the
+    smallest relation with the same transitive closure, ignoring
+    reflexive pairs. For a partial order this is its Hasse diagram.
+
+    Edges between components are the edges of the acyclic condensation
+    that no path of two or more edges implies, and connect the smallest
+    elements of the components. A cyclic component is replaced by a
+    single cycle: each element is related to the next larger element of
+    its component and the largest element to the smallest.
+    """
+    n = relation.rows
+    equivalent = scc(context, relation)
+    project, smallest = classes(context, equivalent)
+    quotient = Relation.composition(Relation.transpose(project),
+                                    Relation.composition(relation, project))
+    quotient = Relation.meet(quotient, Relation.complement(Relation.identity(quotient)))
+    implied = Relation.composition(quotient, closure(quotient))
+    hasse = Relation.meet(quotient, Relation.complement(implied))
+    lift = context.new(len(smallest), n, list(enumerate(smallest)))
+    between = Relation.composition(Relation.transpose(lift), Relation.composition(hasse, lift))
+
+    all_ = ones(context, n)
+    later = Relation.meet(equivalent, reader(context, n).less)
+    following = Relation.meet(later, Relation.complement(Relation.composition(later, later)))
+    largest = Relation.complement(Relation.composition(later, all_))
+    least = Relation.complement(Relation.composition(Relation.transpose(later), all_))
+    wrap = Relation.meet(Relation.composition(largest, Relation.transpose(all_)),
+                         Relation.composition(all_, Relation.transpose(least)))
+    wrap = Relation.meet(Relation.meet(wrap, equivalent), Relation.complement(Relation.identity(relation)))
+    return Relation.join(between, Relation.join(following, wrap))
+
+
+def pairs(context, relation):
+    """Yield the pairs of a relation in row-major order. The rows with
+    an image are read from the domain, then each of them from the
+    converse, so only the pairs themselves are ever read."""
+    rows, cols = reader(context, relation.rows), reader(context, relation.cols)
+    domain = Relation.composition(relation, ones(context, relation.cols))
+    converse = Relation.transpose(relation)
+    for i in rows.read(domain):
+        for j in cols.read(Relation.composition(converse, rows.point(i))):
+            yield i, j
+
+
+def first_pair(context, relation):
+    """Return the first pair of a relation in row-major order, or None
+    if it is empty."""
+    return next(pairs(context, relation), None)
+
+
+# Each violations function returns a relation that is empty if and only
+# if the relation has the property, which is all a predicate tests. Only
+# witness reads a pair from it: by default its first pair, or the pair
+# the counterexample function of the property finds. A property that
+# requires a pair reports the missing pair.
+
+def reflexive_violations(context, relation):
+    """(i, i) is missing from the relation."""
+    return Relation.meet(Relation.identity(relation), Relation.complement(relation))
+
+
+def symmetric_violations(context, relation):
+    """(i, j) is in the relation but (j, i) is not."""
+    return Relation.meet(relation, Relation.complement(Relation.transpose(relation)))
+
+
+def antisymmetric_violations(context, relation):
+    """(i, j) and (j, i) are both in the relation and i != j."""
+    both = Relation.meet(relation, Relation.transpose(relation))
+    return Relation.meet(both, Relation.complement(Relation.identity(relation)))
+
+
+def transitive_violations(context, relation):
+    """(i, j) and (j, k) are in the relation but (i, k) is missing; the
+    pair (i, k) is reported."""
+    square = Relation.composition(relation, relation)
+    return Relation.meet(square, Relation.complement(relation))
+
+
+def acyclic_violations(context, relation):
+    """(i, j) is an edge on a cycle: j reaches i. A loop (i, i) is a
+    cycle too."""
+    back = Relation.transpose(reflexive_closure(relation))
+    return Relation.meet(relation, back)
+
+
+def function_violations(context, relation):
+    """(j, k) with j != k are images of the same element."""
+    shared = Relation.composition(Relation.transpose(relation), relation)
+    return Relation.meet(shared, Relation.complement(Relation.identity(shared)))
+
+
+def total_violations(context, relation):
+    """The n x 1 vector of the elements without an image."""
+    return Relation.complement(Relation.composition(relation, ones(context, relation.cols)))
+
+
+def injective_violations(context, relation):
+    """(i, k) with i != k are preimages of the same element."""
+    shared = Relation.composition(relation, Relation.transpose(relation))
+    return Relation.meet(shared, Relation.complement(Relation.identity(shared)))
+
+
+def surjective_violations(context, relation):
+    """The m x 1 vector of the elements without a preimage."""
+    return Relation.complement(Relation.composition(Relation.transpose(relation), ones(context, relation.rows)))
+
+
+def first_violation(context, relation, violations):
+    """Return the first pair of the non-empty violations."""
+    return first_pair(context, violations)
+
+
+def function_counterexample(context, relation, violations):
+    """(i, j) is in the relation and i also has a smaller image."""
+    later = Relation.composition(relation, reader(context, relation.cols).less)
+    return first_pair(context, Relation.meet(relation, later))
+
+
+def total_counterexample(context, relation, violations):
+    """i has no image; the pair (i, 0) is reported."""
+    return reader(context, relation.rows).first(violations), 0
+
+
+def injective_counterexample(context, relation, violations):
+    """(i, j) is in the relation and j also has a smaller preimage; the
+    pair with the smallest j is reported."""
+    earlier = Relation.transpose(reader(context, relation.rows).less)
+    shared = Relation.meet(relation, Relation.composition(earlier, relation))
+    return first_pair(context, Relation.transpose(shared))[::-1]
+
+
+def surjective_counterexample(context, relation, violations):
+    """j has no preimage; the pair (0, j) is reported."""
+    return 0, reader(context, relation.cols).first(violations)
+
+
+def left_residual(r, s):
+    """Return the left residual R\\S = ~(R^ * ~S): (i, j) is related iff
+    column i of R is a subset of column j of S."""
+    if r.rows != s.rows:
+        raise ValueError("left residual needs relations with the same number of rows, not [{}<->{}] and [{}<->{}].".format(r.rows, r.cols, s.rows, s.cols))
+    return Relation.complement(Relation.composition(Relation.transpose(r), Relation.complement(s)))
+
+
+def right_residual(r, s):
+    """Return the right residual R/S = ~(~R * S^): (i, j) is related iff
+    row j of S is a subset of row i of R."""
+    if r.cols != s.cols:
+        raise ValueError("right residual needs relations with the same number of columns, not [{}<->{}] and [{}<->{}].".format(r.rows, r.cols, s.rows, s.cols))
+    return Relation.complement(Relation.composition(Relation.complement(r), Relation.transpose(s)))
+
+
+def symmetric_quotient(r, s):
+    """Return the symmetric quotient syq(R, S) = R\\S & (S\\R)^: (i, j) is
+    related iff column i of R equals column j of S."""
+    if r.rows != s.rows:
+        raise ValueError("symmetric quotient needs relations with the same number of rows, not [{}<->{}] and [{}<->{}].".format(r.rows, r.cols, s.rows, s.cols))
+    return Relation.meet(left_residual(r, s), Relation.transpose(left_residual(s, r)))
+
+
+def _check_element(size, element):
+    """Raise ValueError unless 0 <= element < size."""
+    if not 0 <= element < size:
+        raise ValueError("element {} is out of range for a relation of size {}.".format(element, size))
+
+
+def _point(context, size, element):
+    """Return the size x size vector of a single element."""
+    _check_element(size, element)
+    point = context.new(size, size)
+    point.vector(vector=element)
+    return point
+
+
+def domain(context, relation):
+    """Return the vector of the elements with an image, shaped like the
+    relation: the composition R * L.
+
+    pyrel offers no quantification of the columns on its own, so this
+    is a full composition with the universal relation, as a script
+    would write it; the builtin only saves the interpreted steps.
+    """
+    universal = Relation.universal(context.new(relation.cols, relation.cols))
+    return Relation.composition(relation, universal)
+
+
+def range_(context, relation):
+    """Return the vector of the elements with a preimage, shaped like
+    the transposed relation."""
+    return domain(context, Relation.transpose(relation))
+
+
+def row(context, relation, i):
+    """Return row i of the relation as a vector shaped like the
+    transposed relation: the composition of R^ with the point vector
+    of i."""
+    point = _point(context, relation.rows, i)
+    return Relation.composition(Relation.transpose(relation), point)
+
+
+def column(context, relation, j):
+    """Return column j of the relation as a vector shaped like the
+    relation: the composition of R with the point vector of j."""
+    return Relation.composition(relation, _point(context, relation.cols, j))
+
+
+def _halves(context, relation, middle, by_rows):
+    """Return the n x m relation of all pairs in the rows, or columns,
+    below middle and its complement."""
+    n, m = relation.rows, relation.cols
+    if by_rows:
+        low = Relation.composition(reader(context, n).below(middle), Relation.transpose(ones(context, m)))
+    else:
+        low = Relation.composition(ones(context, n), Relation.transpose(reader(context, m).below(middle)))
+    return low, Relation.complement(low)
+
+
+def _blocks(context, relation, rows_only=False):
+    """Split the relation into blocks and yield each non-empty block as
+    (part, rows, cols, full), where full tells whether the part holds
+    every pair of its rows and columns. A block is split at the middle
+    of its longer side, or of its rows if rows_only, until it is empty,
+    full, or, if rows_only, a single row. A relation made of k
+    rectangles is thus read in O(k log nm) meets and tests rather than
+    row by row."""
+    blocks = [(relation, Relation.universal(relation), 0, relation.rows, 0, relation.cols)]
+    while blocks:
+        part, whole, top, bottom, left, right = blocks.pop()
+        if part.is_empty():
+            continue
+        full = Relation.equals(part, whole)
+        if full or (rows_only and bottom - top == 1):
+            yield part, bottom - top, right - left, full
+            continue
+        if rows_only or bottom - top >= right - left:
+            middle = (top + bottom) // 2
+            low, high = _halves(context, relation, middle, True)
+            halves = ((low, top, middle, left, right), (high, middle, bottom, left, right))
+        else:
+            middle = (left + right) // 2
+            low, high = _halves(context, relation, middle, False)
+            halves = ((low, top, bottom, left, middle), (high, top, bottom, middle, right))
+        for mask, *bounds in halves:
+            blocks.append((Relation.meet(part, mask), Relation.meet(whole, mask), *bounds))
+
+
+def _row_size(context, row):
+    """Return the number of pairs of a relation with a single row."""
+    columns = Relation.composition(Relation.transpose(row), ones(context, row.rows))
+    return reader(context, row.cols).count(columns)
+
+
+def cardinality(context, relation):
+    """Return the number of pairs in the relation, the sum of the sizes
+    of its full blocks."""
+    return sum(rows * cols for _, rows, cols, _ in _blocks(context, relation))
+
+
+def out_degree(context, relation, i=None):
+    """Return the number of images of element i, or the largest number
+    of images of any element if i is None. Rows are only counted one by
+    one where the relation is split down to a single row that is not
+    full."""
+    if i is None:
+        return max((cols if full else _row_size(context, part)
+                    for part, _, cols, full in _blocks(context, relation, rows_only=True)), default=0)
+    _check_element(relation.rows, i)
+    rows, cols = reader(context, relation.rows), reader(context, relation.cols)
+    return cols.count(Relation.composition(Relation.transpose(relation), rows.point(i)))
+
+
+def in_degree(context, relation, j=None):
+    """Return the number of preimages of element j, or the largest
+    number of preimages of any element if j is None."""
+    return out_degree(context, Relation.transpose(relation), j)
+
+
+def density(context, relation):
+    """Return the fraction of all pairs that are in the relation."""
+    return cardinality(context, relation) / (relation.rows * relation.cols)
+
+
+# Direct products: the pair (x, y) of an n x m product is the element
+# x * m + y.
+
+def _check_factors(n, m):
+    if n < 1 or m < 1:
+        raise ValueError("direct product needs positive sizes, not {} and {}.".format(n, m))
+
+
+def first_projection(context, n, m):
+    """Return the (n*m) x n projection pi mapping each pair to its first
+    component."""
+    _check_factors(n, m)
+    return context.new(n * m, n, [(x * m + y, x) for x in range(n) for y in range(m)])
+
+
+def second_projection(context, n, m):
+    """Return the (n*m) x m projection rho mapping each pair to its
+    second component."""
+    _check_factors(n, m)
+    return context.new(n * m, m, [(x * m + y, y) for x in range(n) for y in range(m)])
+
+
+def tupling(context, r, s):
+    """Return the tupling [R, S] = R * pi^ & S * rho^, relating x to
+    the pair (y, z) iff x R y and x S z."""
+    if r.rows != s.rows:
+        raise ValueError("tupling needs relations with the same number of rows, not [{}<->{}] and [{}<->{}].".format(r.rows, r.cols, s.rows, s.cols))
+    first = Relation.composition(r, Relation.transpose(first_projection(context, r.cols, s.cols)))
+    second = Relation.composition(s, Relation.transpose(second_projection(context, r.cols, s.cols)))
+    return Relation.meet(first, second)
+
+
+def kronecker(context, r, s):
+    """Return the Kronecker product pi * R * pi^ & rho * S * rho^,
+    relating the pair (w, x) to the pair (y, z) iff w R y and x S z."""
+    first = Relation.composition(first_projection(context, r.rows, s.rows),
+                                 Relation.composition(r, Relation.transpose(first_projection(context, r.cols, s.cols))))
+    second = Relation.composition(second_projection(context, r.rows, s.rows),
+                                  Relation.composition(s, Relation.transpose(second_projection(context, r.cols, s.cols))))
+    return Relation.meet(first, second)
+
+
+def _injection(context, size, total, offset):
+    """Return the size x total relation mapping i to offset + i."""
+    return context.new(size, total, [(i, offset + i) for i in range(size)])
+
+
+def submatrix(context, relation, r0, r1, c0, c1):
+    """Return the block of rows r0 to r1 and columns c0 to c1 (upper
+    bounds excluded) as E * R * F^, where E and F are the injections of
+    the rows and columns of the block."""
+    if not (0 <= r0 < r1 <= relation.rows and 0 <= c0 < c1 <= relation.cols):
+        raise ValueError("block [{}:{}, {}:{}] is out of range for a relation of dimension [{}<->{}].".format(r0, r1, c0, c1, relation.rows, relation.cols))
+    rows = _injection(context, r1 - r0, relation.rows, r0)
+    cols = _injection(context, c1 - c0, relation.cols, c0)
+    return Relation.composition(rows, Relation.composition(relation, Relation.transpose(cols)))
+
+
+def hcat(context, r, s):
+    """Return the block matrix [R S] = R * E | S * F, where E and F
+    inject the columns of R and S into the columns of the result."""
+    if r.rows != s.rows:
+        raise ValueError("hcat needs relations with the same number of rows, not [{}<->{}] and [{}<->{}].".format(r.rows, r.cols, s.rows, s.cols))
+    cols = r.cols + s.cols
+    return Relation.join(Relation.composition(r, _injection(context, r.cols, cols, 0)),
+                         Relation.composition(s, _injection(context, s.cols, cols, r.cols)))
+
+
+def vcat(context, r, s):
+    """Return the block matrix with R above S."""
+    if r.cols != s.cols:
+        raise ValueError("vcat needs relations with the same number of columns, not [{}<->{}] and [{}<->{}].".format(r.rows, r.cols, s.rows, s.cols))
+    return Relation.transpose(hcat(context, Relation.transpose(r), Relation.transpose(s)))
+
+
+def cuthill_mckee(context, relation):
+    """Return the reverse Cuthill-McKee order of a homogeneous relation:
+    a list of the elements in their new order.
+
+    The relation is treated as an undirected graph, whose edges are read
+    from R | R^ without loops. Each component is searched breadth first
+    from an element of least degree, visiting neighbours in order of
+    increasing degree; reversing the resulting order keeps related
+    elements close, which reduces the bandwidth.
+    """
+    n = relation.rows
+    undirected = Relation.join(relation, Relation.transpose(relation))
+    undirected = Relation.meet(undirected, Relation.complement(Relation.identity(relation)))
+    neighbours = [[] for _ in range(n)]
+    for i, j in pairs(context, undirected):
+        neighbours[i].append(j)
+    degree = [len(row) for row in neighbours]
+    visited = [False] * n
+    order = []
+    for root in sorted(range(n), key=degree.__getitem__):
+        if visited[root]:
+            continue
+        visited[root] = True
+        order.append(root)
+        k = len(order) - 1
+        while k < len(order):
+            unvisited = [w for w in neighbours[order[k]] if not visited[w]]
+            for w in unvisited:
+                visited[w] = True
+            order.extend(sorted(unvisited, key=degree.__getitem__))
+            k += 1
+    order.reverse()
+    return order
+
+
+def reorder(context, relation):
+    """Return the permutation relation mapping each element to its
+    position in the reverse Cuthill-McKee order."""
+    if relation.rows != relation.cols:
+        raise ValueError("reorder needs a homogeneous relation, not [{}<->{}].".format(relation.rows, relation.cols))
+    order = cuthill_mckee(context, relation)
+    return context.new(len(order), len(order), [(old, new) for new, old in enumerate(order)])
+
+
+def permute(relation, permutation):
+    """Return P^ * R * P, the relation with each element i renamed to
+    its image under the permutation P."""
+    if not relation.rows == relation.cols == permutation.rows == permutation.cols:
+        raise ValueError("permute needs a homogeneous relation and a permutation of the same size, not [{}<->{}] and [{}<->{}].".format(relation.rows, relation.cols, permutation.rows, permutation.cols))
+    identity = Relation.identity(permutation)
+    if not (Relation.equals(Relation.composition(permutation, Relation.transpose(permutation)), identity)
+            and Relation.equals(Relation.composition(Relation.transpose(permutation), permutation), identity)):
+        raise ValueError("permute needs a permutation, a bijective relation.")
+    return Relation.composition(Relation.transpose(permutation), Relation.composition(relation, permutation))
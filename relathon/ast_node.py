@@ -11,14 +11,27 @@ that the interpreter then evaluates."""
 class ASTNode:
     """Abstract class for a node of an irregular heterogeneous
     abstract syntax tree.
+
+    Nodes declare their attributes in __slots__, so that a large tree
+    does not carry a dict per node. Two nodes are equal if their
+    attributes other than the location are equal.
     """
+    __slots__ = ('location',)
+
+    _fields = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._fields = tuple(key for klass in reversed(cls.__mro__)
+                            for key in klass.__dict__.get('__slots__', ())
+                            if key != 'location')
+
     def __init__(self, location):
         self.location = location
 
     def __eq__(self, other):
         return (isinstance(other, self.__class__) and
-                all(val == other.__dict__[key] for key, val in self.__dict__.items()
-                    if key != "location"))
+                all(getattr(self, key) == getattr(other, key) for key in self._fields))
 
     def __ne__(self, other):
         return not self.__eq__(other)
@@ -34,6 +47,7 @@ class ASTNode:
 
 
 class Module(ASTNode):
+    __slots__ = ('statements',)
 
     def __init__(self, location, statements):
         super().__init__(location)
@@ -47,6 +61,7 @@ class Module(ASTNode):
 
 
 class Suite(ASTNode):
+    __slots__ = ('statements',)
 
     def __init__(self, location, statements):
         super().__init__(location)
@@ -60,6 +75,7 @@ class Suite(ASTNode):
 
 
 class ImportStatement(ASTNode):
+    __slots__ = ('name',)
 
     def __init__(self, location, name):
         super().__init__(location)
@@ -69,7 +85,24 @@ class ImportStatement(ASTNode):
         return self.name
 
 
+class FromImportStatement(ASTNode):
+    """Import of the given names from a module, as in from m import f, g."""
+    __slots__ = ('module', 'names')
+
+    def __init__(self, location, module, names):
+        super().__init__(location)
+        self.module = module
+        self.names = names
+
+    def data(self):
+        return self.module
+
+    def children(self):
+        return self.names
+
+
 class FunctionDefinition(ASTNode):
+    __slots__ = ('name', 'parameters', 'suite')
 
     def __init__(self, location, name, parameters, suite):
         super().__init__(location)
@@ -82,6 +115,7 @@ class FunctionDefinition(ASTNode):
 
 
 class Parameter(ASTNode):
+    __slots__ = ('variable',)
 
     def __init__(self, location, variable):
         super().__init__(location)
@@ -98,11 +132,14 @@ class Parameter(ASTNode):
 
 class Statement(ASTNode):
     """ABSTRACT"""
+    __slots__ = ()
+
     def __init__(self, location):
         super().__init__(location)
 
 
 class ReturnStatement(Statement):
+    __slots__ = ('expression',)
 
     def __init__(self, location, expression):
         super().__init__(location)
@@ -113,6 +150,7 @@ class ReturnStatement(Statement):
 
 
 class Assignment(Statement):
+    __slots__ = ('target', 'operator', 'expression')
 
     def __init__(self, location, target, operator, expression):
         super().__init__(location)
@@ -125,6 +163,7 @@ class Assignment(Statement):
 
 
 class WhileStatement(Statement):
+    __slots__ = ('condition', 'whileSuite', '_else')
 
     def __init__(self, location, condition, whileSuite, _else):
         super().__init__(location)
@@ -134,6 +173,7 @@ class WhileStatement(Statement):
 
 
 class IfStatement(Statement):
+    __slots__ = ('condition', 'ifSuite', 'elifStatements', 'elseSuite')
 
     def __init__(self, location, condition, ifSuite, elifStatements, elseSuite):
         super().__init__(location)
@@ -144,6 +184,7 @@ class IfStatement(Statement):
 
 
 class ElifStatement(Statement):
+    __slots__ = ('condition', 'body')
 
     def __init__(self, location, condition, body):
         super().__init__(location)
@@ -152,29 +193,36 @@ class ElifStatement(Statement):
 
 
 class BreakStatement(Statement):
+    __slots__ = ()
 
     def __init__(self, location):
         super().__init__(location)
 
 
 class ContinueStatement(Statement):
+    __slots__ = ()
 
     def __init__(self, location):
         super().__init__(location)
 
 
 class PassStatement(Statement):
+    __slots__ = ()
+
     def __init__(self, location):
         super().__init__(location)
 
 
 class Expression(ASTNode):
     """ABSTRACT"""
+    __slots__ = ()
+
     def __init__(self, location):
         super().__init__(location)
 
 
 class TernaryOperation(Expression):
+    __slots__ = ('expr', 'condition', 'orElse')
 
     def __init__(self, location, expr, condition, orElse):
         super().__init__(location)
@@ -187,6 +235,7 @@ class TernaryOperation(Expression):
 
 
 class BinaryOperation(Expression):
+    __slots__ = ('left', 'operator', 'right')
 
     def __init__(self, location, left, operator, right):
         super().__init__(location)
@@ -198,7 +247,21 @@ class BinaryOperation(Expression):
         return self.operator.lexeme
 
 
+class NaryOperation(Expression):
+    """A chain of the same associative operator, e.g. a | b | c."""
+    __slots__ = ('operator', 'operands')
+
+    def __init__(self, location, operator, operands):
+        super().__init__(location)
+        self.operator = operator
+        self.operands = operands
+
+    def data(self):
+        return self.operator.lexeme
+
+
 class BooleanOperation(BinaryOperation):
+    __slots__ = ()
 
     def __init__(self, location, left, operator, right):
         super().__init__(location, left, operator, right)
@@ -208,12 +271,14 @@ class BooleanOperation(BinaryOperation):
 
 
 class Comparison(BinaryOperation):
+    __slots__ = ()
 
     def __init__(self, location, left, operator, right):
         super().__init__(location, left, operator, right)
 
 
 class UnaryOperation(Expression):
+    __slots__ = ('operand', 'operator')
 
     def __init__(self, location, operand, operator):
         super().__init__(location)
@@ -225,6 +290,7 @@ class UnaryOperation(Expression):
 
 
 class FunctionCall(Expression):
+    __slots__ = ('callee', 'arguments')
 
     def __init__(self, location, callee, arguments):
         super().__init__(location)
@@ -235,7 +301,29 @@ class FunctionCall(Expression):
         return self.callee.data()
 
 
+class Subscript(Expression):
+    """A block of a relation, e.g. R[r0:r1, c0:c1]."""
+    __slots__ = ('value', 'rows', 'cols')
+
+    def __init__(self, location, value, rows, cols):
+        super().__init__(location)
+        self.value = value
+        self.rows = rows
+        self.cols = cols
+
+
+class Slice(ASTNode):
+    """Bounds of a slice; either bound may be None."""
+    __slots__ = ('lower', 'upper')
+
+    def __init__(self, location, lower, upper):
+        super().__init__(location)
+        self.lower = lower
+        self.upper = upper
+
+
 class Variable(Expression):
+    __slots__ = ('identifier',)
 
     def __init__(self, location, identifier):
         super().__init__(location)
@@ -246,19 +334,24 @@ class Variable(Expression):
 
 
 class OrderedPairs(Expression):
+    """Pairs (xs[i], ys[i]), kept as two integer arrays rather than a
+    node per element."""
+    __slots__ = ('xs', 'ys')
 
-    def __init__(self, location, pairs):
-            super().__init__(location)
-            self.pairs = pairs
+    def __init__(self, location, xs, ys):
+        super().__init__(location)
+        self.xs = xs
+        self.ys = ys
 
     def data(self):
-        return self.pairs
+        return list(zip(self.xs, self.ys))
 
     def __str__(self):
-        return "[" + str(self.pairs)[1:-1] + "]"
+        return "[" + str(self.data())[1:-1] + "]"
 
 
 class Literal(Expression):
+    __slots__ = ('value',)
 
     def __init__(self, location, value):
         super().__init__(location)
@@ -272,36 +365,42 @@ class Literal(Expression):
 
 
 class Integer(Literal):
+    __slots__ = ()
 
     def __init__(self, location, integer):
         super().__init__(location, int(integer.lexeme))
 
 
 class Float(Literal):
+    __slots__ = ()
 
     def __init__(self, location, float_):
         super().__init__(location, float(float_.lexeme))
 
 
 class Boolean(Literal):
+    __slots__ = ()
 
     def __init__(self, location, boolean):
         super().__init__(location, True if boolean.lexeme == 'True' else False)
 
 
 class Char(Literal):
+    __slots__ = ()
 
     def __init__(self, location, char):
         super().__init__(location, str(char.lexeme))
 
 
 class None_(Literal):
+    __slots__ = ()
 
     def __init__(self, location):
         super().__init__(location, None)
 
 
 class Null(ASTNode):
+    __slots__ = ()
 
     def __init__(self, location):
         super().__init__(location)
\ No newline at end of file
@@ -0,0 +1,97 @@
+# Copyright Peter Roger. All rights reserved.
+#
+# This file is part of relathon. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE file.
+
+"""Throughput benchmark of the lexer. A large source file is generated
+and tokenized both from a string and streamed from the file, by the
+lexer and by the baseline lexer that matches every token with the
+regular expression, and the rates are reported in MB/s.
+
+    python bench_lexer.py [--lines N] [--repeat N]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from contextlib import contextmanager
+from lexer import Lexer
+from relathon import Source
+from tok import EOF
+
+STATEMENTS = (
+    "R = new(64, 64)",
+    "S = random(R, 0.25)",
+    "T = (R | S) & ~R^ * S",
+    "if R <= S and not R == S: # compare",
+    "    U = closure(R | S ** 2)",
+    "while cardinality(S) > 1.5:",
+    "    S = S * R",
+    "R = [(0, 1), (2, 3), (4, 5)]",
+    "print(pi(R, S)[0:8, 1:])",
+    "",
+    "# comment only line",
+)
+
+def generate(lines, seed=0):
+    rng = random.Random(seed)
+    return "\n".join(rng.choice(STATEMENTS) for _ in range(lines)) + "\n"
+
+class RegexLexer(Lexer):
+    """The baseline lexer: every token, blanks included, is matched by
+    the alternation of Lexer.EXPRESSIONS."""
+    def _match(self, string, p):
+        match = self.REGEX.match(string, p)
+        if match is None:
+            return None
+        tag = match.lastgroup
+        return (tag,) + match.span(tag)
+
+def tokenize(lexer_class, source):
+    lexer = lexer_class(source)
+    count = 0
+    while lexer.extractToken().tag != EOF:
+        count += 1
+    return count
+
+def measure(lexer_class, make_source, size, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        with make_source() as source:
+            start = time.perf_counter()
+            count = tokenize(lexer_class, source)
+            best = min(best, time.perf_counter() - start)
+    return count, size / best / 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Lexer throughput benchmark.")
+    parser.add_argument('--lines', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    text = generate(args.lines)
+    size = len(text.encode())
+    with tempfile.NamedTemporaryFile('w', suffix='.rel', delete=False) as fd:
+        fd.write(text)
+    try:
+        @contextmanager
+        def from_string():
+            yield Source(fd.name, text)
+        @contextmanager
+        def from_stream():
+            with open(fd.name) as stream:
+                yield Source(fd.name, stream=stream)
+        print("{} lines, {:.1f} MB".format(args.lines, size / 1e6))
+        for mode, make_source in (("string", from_string), ("stream", from_stream)):
+            count, baseline = measure(RegexLexer, make_source, size, args.repeat)
+            print("{:<6} regex {:>9} tokens {:8.2f} MB/s".format(mode, count, baseline))
+            count, rate = measure(Lexer, make_source, size, args.repeat)
+            print("{:<6} lexer {:>9} tokens {:8.2f} MB/s {:6.2f}x".format(
+                mode, count, rate, rate / baseline))
+    finally:
+        os.unlink(fd.name)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# Copyright Peter Roger. All rights reserved.
+#
+# This file is part of relathon. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE file.
+
+"""Memory benchmark of the abstract syntax tree. A large script is
+generated and parsed, and the memory held by the tree, its tokens and
+locations is reported along with the number of nodes.
+
+    python bench_memory.py [--lines N]
+"""
+
+import argparse
+import random
+import tracemalloc
+from lexer import Lexer
+from parser import Parser
+from relathon import Source
+from ast_node import ASTNode
+
+STATEMENTS = (
+    "R{i} = new(64, 64)",
+    "S{i} = random(R, 0.25)",
+    "T{i} = (R | S | U) & ~R^ * S",
+    "U{i} = closure(R | S ** 2) if a < b and not c else S",
+    "V{i} = pi(R, S)[0:8, 1:] * f(a, b)",
+    "W{i} = [(0, 1), (2, 3), (4, 5)]",
+)
+
+BLOCK = "if R{i} <= S and not R == S:\n    X{i} = T * S\n    Y{i} = X{i} | R\n"
+
+def generate(lines, seed=0):
+    rng = random.Random(seed)
+    source = []
+    for i in range(lines):
+        if rng.random() < 0.1:
+            source.append(BLOCK.format(i=i))
+        else:
+            source.append(rng.choice(STATEMENTS).format(i=i) + "\n")
+    return "".join(source)
+
+def count_nodes(node):
+    count = 0
+    stack = [node]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, ASTNode):
+            count += 1
+            stack.extend(getattr(value, key) for key in value._fields)
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description="AST memory benchmark.")
+    parser.add_argument('--lines', type=int, default=100000)
+    args = parser.parse_args()
+
+    text = generate(args.lines)
+    tracemalloc.start()
+    tree = Parser(Lexer(Source('bench', text))).module()
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    nodes = count_nodes(tree)
+    print("{} lines, {:.1f} MB of source".format(args.lines, len(text) / 1e6))
+    print("{} nodes, {:.1f} MB, {:.0f} bytes per node (peak {:.1f} MB)".format(
+        nodes, size / 1e6, size / nodes, peak / 1e6))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,309 @@
+# Copyright Peter Roger. All rights reserved.
+#
+# This file is part of relathon. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE file.
+
+"""This module keeps the abstract syntax trees of Relathon modules on
+disk, so a module that has not changed since it was last run is not
+lexed and parsed again. The tree of module.rel is stored in
+__relcache__/module.relc next to the source, or in a mirror of the
+source directory below a cache directory when one is given.
+
+A cache file begins with a header holding the relathon version, a hash
+of the modules that define the syntax trees, and the modification time,
+size and hash of the source. Any change to the lexer, parser or tree
+classes thus invalidates every cache file, even if the version is not
+bumped. The modification time and size are compared first; the source
+is hashed only when they differ, and a file that was touched but not
+edited keeps its tree and gets the new modification time written into
+its header, so it is not hashed again on the next run. Cache files are
+written to a temporary file that is renamed over the old one, so runs
+sharing a cache never read a partly written tree.
+
+Loading a tree may run any code stored in the cache file, so a cache
+file is only read if it and the directories holding it are owned by
+the current user and writable by no one else.
+
+Classes:
+    ASTCache - on-disk cache of parsed modules
+"""
+
+import gc
+import os
+import pickle
+import struct
+import hashlib
+import tempfile
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+import ast_node
+import lexer
+import location
+import parser
+import tok
+
+# the modules whose classes and parse rules shape a cached tree
+TREE_MODULES = (ast_node, location, tok, lexer, parser)
+
+@lru_cache(maxsize=None)
+def tree_format():
+    """Return a hash of the sources of TREE_MODULES."""
+    sha = hashlib.sha256()
+    for module in TREE_MODULES:
+        with open(module.__file__, 'rb') as f:
+            sha.update(f.read())
+    return sha.digest()
+
+@contextmanager
+def _collector_paused():
+    """Pause the garbage collector, which would otherwise traverse the
+    tree many times while it is serialized or loaded, although none of
+    it is garbage."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+class ASTCache:
+    """On-disk cache of the abstract syntax trees of .rel modules.
+
+    Attributes:
+        version (str) - relathon version the trees were parsed by
+        prefix (str) - directory holding the cache files, or None to
+                       keep them next to their sources
+    """
+    MAGIC = b'RELC'
+    # modification time, size and hash of the source
+    STAMP = struct.Struct('<qq32s')
+    SOURCE_SUFFIX = '.rel'
+    SUFFIX = '.relc'
+    DIRECTORY = '__relcache__'
+    TEMPORARY_SUFFIX = '.tmp'
+    # seconds after which a temporary file is left by an interrupted
+    # write rather than being written by another run
+    TEMPORARY_AGE = 3600
+
+    def __init__(self, version, prefix=None):
+        self.version = version
+        self.prefix = prefix
+
+    def path(self, filename):
+        """Return the cache file of the source filename, or None if the
+        source is not a module."""
+        directory, name = os.path.split(os.path.abspath(filename))
+        stem, suffix = os.path.splitext(name)
+        if suffix != self.SOURCE_SUFFIX:
+            return None
+        if self.prefix is None:
+            directory = os.path.join(directory, self.DIRECTORY)
+        else:
+            directory = os.path.join(self.prefix, os.path.splitdrive(directory)[1].lstrip(os.sep))
+        return os.path.join(directory, stem + self.SUFFIX)
+
+    def source(self, path):
+        """Return the source file of the cache file path."""
+        directory, name = os.path.split(os.path.abspath(path))
+        name = os.path.splitext(name)[0] + self.SOURCE_SUFFIX
+        if self.prefix is None:
+            return os.path.join(os.path.dirname(directory), name)
+        relative = os.path.relpath(directory, os.path.abspath(self.prefix))
+        return os.path.join(os.sep, relative, name)
+
+    @staticmethod
+    def _private(status):
+        """Return True if the file of status is owned by the current user
+        and writable by no one else."""
+        if not hasattr(os, 'getuid'):
+            return True
+        return status.st_uid == os.getuid() and not status.st_mode & 0o022
+
+    def _open(self, path):
+        """Open the cache file path for reading.
+
+        Raises:
+            PermissionError - if another user could have written the file
+        """
+        f = open(path, 'rb')
+        try:
+            private = self._private(os.fstat(f.fileno()))
+            top = os.path.abspath(self.prefix if self.prefix is not None else os.path.dirname(path))
+            directory = os.path.dirname(os.path.abspath(path))
+            while private:
+                private = self._private(os.stat(directory))
+                parent = os.path.dirname(directory)
+                if directory == top or parent == directory:
+                    break
+                directory = parent
+            if not private:
+                raise PermissionError("cache file not private: " + path)
+        except BaseException:
+            f.close()
+            raise
+        return f
+
+    @staticmethod
+    def _makedirs(directory):
+        """Create directory and its missing parents, writable by the
+        current user only."""
+        if os.path.isdir(directory):
+            return
+        ASTCache._makedirs(os.path.dirname(directory))
+        try:
+            os.mkdir(directory, 0o755)
+        except FileExistsError:
+            pass
+
+    @staticmethod
+    def digest(filename):
+        """Return the hash of the contents of filename."""
+        sha = hashlib.sha256()
+        with open(filename, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 16), b''):
+                sha.update(chunk)
+        return sha.digest()
+
+    def _fresh(self, f, filename):
+        """Read the header of the cache file f and return True if its
+        tree is that of the current source filename."""
+        if f.read(len(self.MAGIC)) != self.MAGIC:
+            return False
+        if pickle.load(f) != (self.version, tree_format()):
+            return False
+        offset = f.tell()
+        mtime, size, digest = self.STAMP.unpack(f.read(self.STAMP.size))
+        status = os.stat(filename)
+        if (mtime, size) == (status.st_mtime_ns, status.st_size):
+            return True
+        if size != status.st_size or digest != self.digest(filename):
+            return False
+        self._restamp(f.name, offset, digest, status)
+        return True
+
+    def _restamp(self, path, offset, digest, status):
+        """Write the modification time of the unchanged source into the
+        header of the cache file path at offset. The file is checked to
+        still hold the tree of digest, as another run may have replaced
+        it in the meantime."""
+        try:
+            with open(path, 'r+b') as f:
+                f.seek(offset)
+                if self.STAMP.unpack(f.read(self.STAMP.size))[2] != digest:
+                    return
+                f.seek(offset)
+                f.write(self.STAMP.pack(status.st_mtime_ns, status.st_size, digest))
+        except OSError:
+            # a read-only cache is still used; the source is just hashed
+            # again on the next run
+            pass
+
+    def load(self, filename):
+        """Return the cached tree of the source filename, or None if it
+        has no cache file or the source changed since it was written."""
+        path = self.path(filename)
+        if path is None:
+            return None
+        try:
+            with self._open(path) as f, _collector_paused():
+                if not self._fresh(f, filename):
+                    return None
+                tree = pickle.load(f)
+        except Exception:
+            # a missing, damaged, foreign or shared cache file is a cache
+            # miss
+            return None
+        # the source may have been run under another name since
+        tree.location.table.filename = filename
+        return tree
+
+    def store(self, filename, tree, status):
+        """Write the tree of the source filename to its cache file.
+
+        Args:
+            filename - the source file
+            tree - the abstract syntax tree of the source
+            status - os.stat_result of the source taken before it was
+                     parsed; nothing is stored if the source changed since
+
+        Returns:
+            True if the tree was stored.
+        """
+        path = self.path(filename)
+        if path is None:
+            return False
+        try:
+            digest = self.digest(filename)
+            current = os.stat(filename)
+            if (current.st_mtime_ns, current.st_size) != (status.st_mtime_ns, status.st_size):
+                return False
+            directory = os.path.dirname(path)
+            self._makedirs(directory)
+            fd, temp = tempfile.mkstemp(suffix=self.TEMPORARY_SUFFIX, dir=directory)
+            try:
+                with os.fdopen(fd, 'wb') as f, _collector_paused():
+                    f.write(self.MAGIC)
+                    pickle.dump((self.version, tree_format()), f, pickle.HIGHEST_PROTOCOL)
+                    f.write(self.STAMP.pack(status.st_mtime_ns, status.st_size, digest))
+                    pickle.dump(tree, f, pickle.HIGHEST_PROTOCOL)
+                os.chmod(temp, status.st_mode & 0o644)
+                os.replace(temp, path)
+            except BaseException:
+                os.unlink(temp)
+                raise
+        except (OSError, pickle.PicklingError, RecursionError):
+            # an unwritable directory or a tree too deep to serialize
+            # only costs the next run a parse
+            return False
+        return True
+
+    def prune(self, root):
+        """Remove the cache files below root whose source is gone or has
+        changed, or that were written by another version of relathon or
+        of its parser, along with temporary files left by interrupted
+        writes. Temporary files younger than TEMPORARY_AGE may still be
+        written by another run and are kept, as are cache files another
+        user could have written, which are never read.
+
+        Returns:
+            the number of files removed.
+        """
+        removed = 0
+        now = time.time()
+        if self.prefix is not None:
+            root = self.path(os.path.join(root, 'module' + self.SOURCE_SUFFIX))
+            root = os.path.dirname(root)
+        for directory, dirs, files in os.walk(root, topdown=False):
+            if self.prefix is None and os.path.basename(directory) != self.DIRECTORY:
+                continue
+            for name in files:
+                path = os.path.join(directory, name)
+                if name.endswith(self.SUFFIX):
+                    try:
+                        with self._open(path) as f:
+                            if self._fresh(f, self.source(path)):
+                                continue
+                    except PermissionError:
+                        continue
+                    except Exception:
+                        pass
+                elif not name.endswith(self.TEMPORARY_SUFFIX):
+                    continue
+                else:
+                    try:
+                        if now - os.stat(path).st_mtime < self.TEMPORARY_AGE:
+                            continue
+                    except OSError:
+                        continue
+                try:
+                    os.unlink(path)
+                    removed += 1
+                except OSError:
+                    pass
+            try:
+                os.rmdir(directory)
+            except OSError:
+                pass
+        return removed
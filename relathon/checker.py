@@ -0,0 +1,533 @@
+# Copyright Peter Roger. All rights reserved.
+#
+# This file is part of relathon. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE file.
+
+"""This module checks the abstract syntax tree of a module before it is
+run. The checker walks the tree like the interpreter does, but instead
+of building relations it infers the dimension of each of them from the
+sizes passed to new, O, L, I, random and vec and from the operations
+and builtins applied to them. Dimensions that do not fit and names that
+are never defined are reported before the first relation is built.
+
+A size that cannot be known before the module runs, such as one that
+depends on a function parameter or differs between the branches of an
+if statement, is left unknown and never reported, so a module that the
+checker rejects fails when it is run, if the statement is reached.
+Errors in branches that are never taken, such as the body of an
+if False, are not reported, as the interpreter never runs them.
+
+Classes:
+    Shape - dimension of a relation, whose sizes may be unknown
+    Checker - static checker of the dimensions and names of a module
+"""
+
+from collections import ChainMap, namedtuple
+from contextlib import contextmanager, nullcontext
+from ast_node import (ASTNode, Assignment, Boolean, FunctionDefinition, FromImportStatement,
+                      ImportStatement, Variable)
+from errors import NameException, RelationException, TypeException
+from interpreter import Visitor
+from tok import *
+
+
+class Shape(namedtuple('Shape', ['rows', 'cols'])):
+    """Dimension [rows<->cols] of a relation. Either size is None if it
+    cannot be known before the module runs."""
+    __slots__ = ()
+
+    def __str__(self):
+        return "[{}<->{}]".format(*('?' if size is None else size for size in self))
+
+    def transpose(self):
+        return Shape(self.cols, self.rows)
+
+
+BOOLEAN = Shape(1, 1)
+
+
+def _differ(a, b):
+    """Return True if the sizes a and b are both known and differ."""
+    return a is not None and b is not None and a != b
+
+def _either(a, b):
+    return a if a is not None else b
+
+def _sum(a, b):
+    return None if a is None or b is None else a + b
+
+def _product(a, b):
+    return None if a is None or b is None else a * b
+
+def _int(value):
+    return value if type(value) == int else None
+
+def _same(a, b):
+    return type(a) == type(b) and a == b
+
+def _merge_value(a, b):
+    """Return what is known of a value that is either a or b."""
+    if isinstance(a, Shape) and isinstance(b, Shape):
+        return Shape(a.rows if a.rows == b.rows else None,
+                     a.cols if a.cols == b.cols else None)
+    return a if _same(a, b) else None
+
+def _constant(condition):
+    """Return the value of a condition that is the literal True or
+    False, or None if it is only known when the module runs."""
+    return condition.value if isinstance(condition, Boolean) else None
+
+def _changes(state, base):
+    """Return the names that state, a child of the ChainMap base,
+    defines over base, mapped to their values."""
+    changes = {}
+    for overlay in reversed(state.maps[:len(state.maps) - len(base.maps)]):
+        changes.update(overlay)
+    return changes
+
+def _merge(base, states):
+    """Return what is known of the names that some of the states define
+    over base, where each state is a path from base through the module.
+    Only the names a path defines are looked at, so that a branch of a
+    module with many names costs no more than the names it assigns."""
+    changes = [_changes(state, base) for state in states]
+    merged = {}
+    for name in set().union(*changes):
+        values = [state[name] for state in states if name in state]
+        merged[name] = values[0]
+        for value in values[1:]:
+            merged[name] = _merge_value(merged[name], value)
+    return merged
+
+def _walk(node):
+    """Yield node and every node below it."""
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(reversed(node))
+        elif isinstance(node, ASTNode):
+            yield node
+            stack.extend(reversed([getattr(node, key) for key in node._fields]))
+
+def _binds(node):
+    """Return the names that node itself defines."""
+    if isinstance(node, Assignment):
+        return [node.target.data()]
+    if isinstance(node, FunctionDefinition):
+        return [node.name.data()] + [param.data() for param in node.parameters]
+    if isinstance(node, FromImportStatement):
+        return [name.data() for name in node.names]
+    return []
+
+def _bound(node):
+    """Yield the names that are defined somewhere below node."""
+    for child in _walk(node):
+        yield from _binds(child)
+
+
+class Checker(Visitor):
+    """A tree walker with a method for each AST node type that returns
+    what is known of the value of the node: the Shape of a relation,
+    an int whose value is known, or None.
+
+    CALLS maps the builtins whose result is known to the method that
+    checks their arguments and returns the result, as callConstructor
+    for new; the result of any other function is unknown.
+    """
+
+    # builtins with the same rule share a method
+    CALLS = {
+        'new': 'Constructor', 'random': 'Constructor', 'vec': 'Constructor',
+        'O': 'Constructor', 'L': 'Constructor', 'I': 'Constructor',
+        'closure': 'Homogeneous', 'rtc': 'Homogeneous', 'pow': 'Homogeneous',
+        'reduce': 'Homogeneous', 'scc': 'Homogeneous', 'reorder': 'Homogeneous',
+        'bisim': 'Homogeneous', 'reach': 'Graph', 'reach_within': 'Graph',
+        'condense': 'Graph', 'lres': 'Pair', 'rres': 'Pair', 'syq': 'Pair',
+        'tuple': 'Pair', 'kron': 'Pair', 'hcat': 'Pair', 'vcat': 'Pair',
+        'dom': 'Domain', 'col': 'Domain', 'ran': 'Range', 'row': 'Range',
+        'pi': 'Projection', 'rho': 'Projection', 'joinall': 'Reduction',
+        'meetall': 'Reduction', 'permute': 'Permute', 'empty': 'Predicate',
+        'is_reflexive': 'Predicate', 'is_symmetric': 'Predicate',
+        'is_antisymmetric': 'Predicate', 'is_transitive': 'Predicate',
+        'is_acyclic': 'Predicate', 'is_function': 'Predicate',
+        'is_total': 'Predicate', 'is_injective': 'Predicate',
+        'is_surjective': 'Predicate',
+    }
+
+    # builtins combining two relations: the size both must share, the
+    # name the algorithm reports, and the dimension of the result
+    PAIRS = {
+        'lres': ('rows', "left residual", lambda r, s: (r.cols, s.cols)),
+        'rres': ('cols', "right residual", lambda r, s: (r.rows, s.rows)),
+        'syq': ('rows', "symmetric quotient", lambda r, s: (r.cols, s.cols)),
+        'tuple': ('rows', "tupling", lambda r, s: (_either(r.rows, s.rows), _product(r.cols, s.cols))),
+        'hcat': ('rows', "hcat", lambda r, s: (_either(r.rows, s.rows), _sum(r.cols, s.cols))),
+        'vcat': ('cols', "vcat", lambda r, s: (_sum(r.rows, s.rows), _either(r.cols, s.cols))),
+        'kron': (None, "kron", lambda r, s: (_product(r.rows, s.rows), _product(r.cols, s.cols))),
+    }
+
+    def __init__(self, builtins, scope='globals', enclosing=None):
+        """
+        Attributes:
+            builtins - names defined before the module runs, such as the
+                       builtin functions and imported names
+            scope - name of the environment the module runs in
+            enclosing - names defined by the modules an imported module
+                        is nested in, or None for the main script; since
+                        they may define more names before a function of
+                        the module is called, names in function bodies
+                        are then not reported
+            errors - the errors found, in the order of the source
+            values - ChainMap of each name that may be defined where the
+                     checker is to what is known of its value; each
+                     branch and loop adds a child for the names it defines
+            names - every name the module defines anywhere
+            outer - names defined outside the current scope that it may
+                    use; a function body resolves names when it is
+                    called, by which time the module may define any of
+                    its names
+            imports - True if the module imports a whole module
+            opaque - True once names may have been imported from modules
+                     the checker does not see
+            loops - states in which each enclosing loop is left by break
+                    and continued by continue
+        """
+        self.builtins = builtins
+        self.scope = scope
+        self.enclosing = enclosing
+        self.errors = []
+        self.values = ChainMap()
+        self.names = set()
+        self.outer = frozenset(enclosing or ())
+        self.opaque = False
+        self.imports = False
+        self.loops = []
+
+    def check(self, tree):
+        """Check the tree of a module and return the errors found."""
+        names = []
+        for node in _walk(tree):
+            if isinstance(node, ImportStatement):
+                self.imports = True
+            elif isinstance(node, FunctionDefinition):
+                # a function importing a module may be called anywhere
+                self.opaque |= any(isinstance(child, ImportStatement) for child in _walk(node.suite))
+            names.extend(_binds(node))
+        self.names = set(names)
+        self.visit(tree)
+        return self.errors
+
+    def error(self, exception, node, msg):
+        self.errors.append(exception([], node.location, self.scope, msg))
+
+    @contextmanager
+    def quiet(self):
+        """Drop the errors found in the block, which checks a loop with
+        what is known before its sizes have settled."""
+        errors, self.errors = self.errors, []
+        try:
+            yield
+        finally:
+            self.errors = errors
+
+    def dead(self, dead):
+        """Drop the errors found in the block if dead, for a branch that
+        is never taken."""
+        return self.quiet() if dead else nullcontext()
+
+    def builtin(self, name):
+        """Return True if name surely refers to the builtin of that name."""
+        return name in self.builtins and name not in self.names and name not in self.outer and not self.opaque
+
+    def condition(self, node, location):
+        shape = self.visit(node)
+        if isinstance(shape, Shape) and (_differ(shape.rows, 1) or _differ(shape.cols, 1)):
+            self.errors.append(TypeException([], location, self.scope,
+                "condition must reduce to a relation of type [1<->1], not {}".format(shape)))
+
+    def combine(self, node, shapes):
+        """Check that the shapes can be joined or met and return the
+        dimension of the result."""
+        rows = cols = None
+        for shape in shapes:
+            if _differ(rows, shape.rows) or _differ(cols, shape.cols):
+                self.error(RelationException, node, "relations of dimension {} and {} cannot be combined.".format(Shape(rows, cols), shape))
+                return None
+            rows, cols = _either(rows, shape.rows), _either(cols, shape.cols)
+        return Shape(rows, cols)
+
+    def homogeneous(self, node, shape, msg):
+        """Check that shape is square and return what is known of it."""
+        if not isinstance(shape, Shape):
+            return None
+        if _differ(shape.rows, shape.cols):
+            self.error(RelationException, node, msg.format(shape))
+            return None
+        return shape
+
+    def visitModule(self, node):
+        self.visitSuite(node)
+
+    def visitSuite(self, node):
+        for stmt in node.statements:
+            if stmt is not None and stmt != []:
+                self.visit(stmt)
+
+    def visitImportStatement(self, node):
+        self.opaque = True
+
+    def visitFromImportStatement(self, node):
+        for name in node.names:
+            self.values[name.data()] = None
+
+    def visitFunctionDefinition(self, node):
+        name = node.name.data()
+        self.values[name] = None
+        saved = self.values, self.scope, self.outer, self.loops, self.opaque
+        # nothing is known of the arguments
+        self.values = ChainMap({param.data(): None for param in node.parameters})
+        self.scope, self.outer, self.loops = name, self.outer | self.names, []
+        self.opaque |= self.imports or self.enclosing is not None
+        try:
+            self.visit(node.suite)
+        finally:
+            self.values, self.scope, self.outer, self.loops, self.opaque = saved
+
+    def visitReturnStatement(self, node):
+        if node.expression:
+            self.visit(node.expression)
+
+    def visitAssignment(self, node):
+        name = node.target.data()
+        value = self.visit(node.expression)
+        if node.operator.tag != EQUAL: # augmented assignment
+            value = self.operate(node, node.operator.tag.replace(EQUAL, ''), self.visit(node.target), value)
+        self.values[name] = value
+
+    def iterate(self, node, head):
+        """Check the condition and the body of a loop once, starting
+        from the state head. Returns the states in which the loop goes
+        back to its condition and those in which break leaves it."""
+        self.values = head.new_child()
+        self.loops.append((head, [], []))
+        self.condition(node.condition, node.location)
+        self.visit(node.whileSuite)
+        _, breaks, continues = self.loops.pop()
+        ends = [self.values] + continues
+        self.values = head
+        return ends, breaks
+
+    def visitWhileStatement(self, node):
+        # sizes that change from one pass to the next become unknown;
+        # the loop is then checked once more with what is left
+        outer = self.values
+        head = outer.new_child()
+        for name in _bound(node.whileSuite):
+            if name not in head:
+                head[name] = None
+        while True:
+            with self.quiet():
+                ends, breaks = self.iterate(node, head)
+            changed = {name: value for name, value in _merge(head, [head] + ends).items()
+                       if name not in head or not _same(head[name], value)}
+            if not changed:
+                break
+            head.update(changed)
+        with self.dead(_constant(node.condition) is False):
+            ends, breaks = self.iterate(node, head)
+        head.update(_merge(head, [head] + breaks))
+        outer.update(head.maps[0])
+        self.values = outer
+
+    def visitIfStatement(self, node):
+        before = self.values
+        branches = [(node.ifSuite, node.condition)]
+        branches += [(elif_.body, elif_.condition) for elif_ in node.elifStatements]
+        if node.elseSuite:
+            branches.append((node.elseSuite, None))
+        states = []
+        # no branch after one whose condition is True is taken
+        taken = False
+        for suite, condition in branches:
+            constant = _constant(condition) if condition is not None else None
+            with self.dead(taken or constant is False):
+                if condition is not None:
+                    self.condition(condition, node.location)
+                self.values = before.new_child()
+                self.visit(suite)
+            states.append(self.values)
+            self.values = before
+            taken |= constant is True
+        if not node.elseSuite:
+            states.append(before)
+        before.update(_merge(before, states))
+
+    def exit(self, exits):
+        """Record the state in which break or continue leaves the body
+        of the innermost loop."""
+        if self.loops:
+            head = self.loops[-1][0]
+            self.loops[-1][exits].append(head.new_child(_changes(self.values, head)))
+
+    def visitBreakStatement(self, node):
+        self.exit(1)
+
+    def visitContinueStatement(self, node):
+        self.exit(2)
+
+    def visitPassStatement(self, node):
+        pass
+
+    def visitTernaryOperation(self, node):
+        self.condition(node.condition, node.location)
+        constant = _constant(node.condition)
+        with self.dead(constant is False):
+            expr = self.visit(node.expr)
+        with self.dead(constant is True):
+            orElse = self.visit(node.orElse)
+        return _merge_value(expr, orElse)
+
+    def visitBinaryOperation(self, node):
+        lhs = self.visit(node.left)
+        rhs = self.visit(node.right)
+        return self.operate(node, node.operator.tag, lhs, rhs)
+
+    visitBooleanOperation = visitBinaryOperation
+
+    def operate(self, node, operator, lhs, rhs):
+        if not isinstance(lhs, Shape):
+            return None
+        if operator == DOUBLESTAR:
+            return self.homogeneous(node, lhs, "power needs a homogeneous relation, not {}.")
+        if not isinstance(rhs, Shape):
+            return None
+        if operator == STAR:
+            if _differ(lhs.cols, rhs.rows):
+                self.error(RelationException, node, "relations of dimension {} and {} cannot be composed.".format(lhs, rhs))
+                return None
+            return Shape(lhs.rows, rhs.cols)
+        if operator in (VBAR, OR, AMBER, AND):
+            return self.combine(node, [lhs, rhs])
+        return None
+
+    def visitNaryOperation(self, node):
+        shapes = [self.visit(operand) for operand in node.operands]
+        if all(isinstance(shape, Shape) for shape in shapes):
+            return self.combine(node, shapes)
+        return None
+
+    def visitComparison(self, node):
+        self.visit(node.left)
+        self.visit(node.right)
+        return BOOLEAN
+
+    def visitUnaryOperation(self, node):
+        shape = self.visit(node.operand)
+        if not isinstance(shape, Shape):
+            return None
+        if node.operator.tag == CIRCUMFLEX:
+            return shape.transpose()
+        return shape
+
+    def visitFunctionCall(self, node):
+        args = [self.visit(arg) for arg in node.arguments]
+        callee = node.callee
+        if isinstance(callee, Variable) and self.builtin(callee.data()):
+            name = callee.data()
+            method = self.CALLS.get(name)
+            return getattr(self, 'call' + method)(node, name, args) if method else None
+        self.visit(callee)
+        return None
+
+    def callConstructor(self, node, name, args):
+        # new(rel, ...) or new(rows, cols, ...), and alike
+        if args and isinstance(args[0], Shape):
+            return args[0]
+        if len(args) >= 2 and type(args[0]) == int:
+            return Shape(args[0], _int(args[1]))
+        return Shape(None, None)
+
+    def callHomogeneous(self, node, name, args):
+        shape = args[0] if args else None
+        return self.homogeneous(node, shape, name + "() argument 'relation' must be a homogeneous relation, not {}.")
+
+    def callGraph(self, node, name, args):
+        self.callHomogeneous(node, name, args)
+        return None
+
+    def callPair(self, node, name, args):
+        if len(args) != 2 or not all(isinstance(arg, Shape) for arg in args):
+            return None
+        r, s = args
+        size, description, result = self.PAIRS[name]
+        if size is not None and _differ(getattr(r, size), getattr(s, size)):
+            kind = "rows" if size == 'rows' else "columns"
+            self.error(RelationException, node, "{} needs relations with the same number of {}, not {} and {}.".format(description, kind, r, s))
+            return None
+        return Shape(*result(r, s))
+
+    def callDomain(self, node, name, args):
+        return args[0] if args and isinstance(args[0], Shape) else None
+
+    def callRange(self, node, name, args):
+        return args[0].transpose() if args and isinstance(args[0], Shape) else None
+
+    def callProjection(self, node, name, args):
+        if len(args) != 2:
+            return None
+        n, m = _int(args[0]), _int(args[1])
+        return Shape(_product(n, m), n if name == 'pi' else m)
+
+    def callReduction(self, node, name, args):
+        if args and all(isinstance(arg, Shape) for arg in args):
+            return self.combine(node, args)
+        return None
+
+    def callPermute(self, node, name, args):
+        if len(args) != 2 or not all(isinstance(arg, Shape) for arg in args):
+            return None
+        relation, permutation = args
+        sizes = [relation.rows, relation.cols, permutation.rows, permutation.cols]
+        known = {size for size in sizes if size is not None}
+        if len(known) > 1:
+            self.error(RelationException, node, "permute needs a homogeneous relation and a permutation of the same size, not {} and {}.".format(relation, permutation))
+            return None
+        return relation
+
+    def callPredicate(self, node, name, args):
+        return BOOLEAN
+
+    def visitSubscript(self, node):
+        shape = self.visit(node.value)
+        sizes = []
+        for slice_, size in ((node.rows, getattr(shape, 'rows', None)), (node.cols, getattr(shape, 'cols', None))):
+            lower = 0 if slice_.lower is None else _int(self.visit(slice_.lower))
+            upper = size if slice_.upper is None else _int(self.visit(slice_.upper))
+            sizes.append(None if lower is None or upper is None else upper - lower)
+        return Shape(*sizes) if isinstance(shape, Shape) else None
+
+    def visitVariable(self, node):
+        name = node.data()
+        if name in self.values:
+            return self.values[name]
+        if name not in self.builtins and name not in self.outer and not self.opaque:
+            self.errors.append(NameException([], node.location, self.scope, name))
+        return None
+
+    def visitOrderedPairs(self, node):
+        return None
+
+    def visitInteger(self, node):
+        return node.data()
+
+    def visitBoolean(self, node):
+        return BOOLEAN
+
+    def visitFloat(self, node):
+        return None
+
+    visitChar = visitNone_ = visitFloat
+
+    def visitNull(self, node):
+        return None
@@ -58,4 +58,30 @@ class Environment:
         value = self.values.get(name, False)
         if value is False and self.enclosingEnv is not None:
             value = self.enclosingEnv.resolve(name)
-        return value
\ No newline at end of file
+        return value
+
+class ImportEnvironment(Environment):
+    """Environment of the names imported from modules. The names of a
+    module are looked up in its namespace, which is not copied; the
+    names of the latest import hide those of the earlier ones.
+
+    Attributes:
+        namespaces (list) - (key, namespace) of each import, latest last
+    """
+
+    def __init__(self, name="", level=0, enclosingEnv=None):
+        super().__init__(name, level, enclosingEnv)
+        self.namespaces = []
+
+    def add(self, key, namespace):
+        """Import a namespace, a mapping of names to values. An import
+        of the same key replaces the earlier one and moves to the end,
+        so that it hides the others again."""
+        self.namespaces = [(k, n) for k, n in self.namespaces if k != key]
+        self.namespaces.append((key, namespace))
+
+    def resolve(self, name):
+        for _, namespace in reversed(self.namespaces):
+            if name in namespace:
+                return namespace[name]
+        return super().resolve(name)
@@ -18,14 +18,13 @@ Exceptions:
     NameException
     TypeException
     ModuleNotFoundException
+    ImportException
 """
 
 __all__ = ['RelathonException', 'InterpreterException', 'LexerException',
            'IndentationException', 'ParserException', 'RelationException',
            'ArityException', 'NameException', 'TypeException',
-           'ModuleNotFoundException']
-
-TABSIZE = 8 # also used by lexer; should move into shared globals
+           'ModuleNotFoundException', 'ImportException']
 
 class RelathonException(Exception):
     """Exception for errors that arise from Relathon."""
@@ -82,9 +81,9 @@ class RelathonException(Exception):
         """Formats string for syntax errors."""
         location = self._fmt_location(self.location)
         line = self._get_line(self.location, string)
-        num_of_tabs = line.count('\t')
-        whitespace = (len(line) - len(line.strip())) + num_of_tabs * (TABSIZE - 1)
-        position = self.location.columnBegin - whitespace
+        # the line is shown without its indentation
+        pos = self.location.pos
+        position = len(string[pos - self.location.columnBegin:pos].lstrip())
         carrot = "{space}^".format(space=position * " ")
         return "{loc}\n    {line}\n    {car}".format(loc=location, line=line.strip(), car=carrot)
 
@@ -165,6 +164,15 @@ class ModuleNotFoundException(InterpreterException):
         msg = "No module named \'{}\'".format(module_name)
         super().__init__(callstack, location, scope, msg)
 
+class ImportException(InterpreterException):
+    """Exception when importing a name that a module does not define."""
+
+    TYPE = "Import"
+
+    def __init__(self, callstack, location, scope, name, module_name):
+        msg = "cannot import name \'{}\' from \'{}\'".format(name, module_name)
+        super().__init__(callstack, location, scope, msg)
+
 class ArityException(InterpreterException):
     """Exception for when the arguments to a function call do not match
     the parameters to the function definition.
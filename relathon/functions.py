@@ -7,9 +7,39 @@
 as well as a function object for custom defined functions."""
 
 from abc import ABC, abstractmethod
+from array import array
+from functools import partial
 from pyrel import Relation
-from errors import ArityException, TypeException
+from errors import ArityException, RelationException, TypeException
 from environment import Environment
+from weighted import Semiring, WeightedRelation
+import algorithms
+import weighted
+
+
+class OrderedPairs:
+    """Value of an ordered pairs literal such as [(0,1),(1,2)].
+
+    Attributes:
+        xs (array) - first element of each pair
+        ys (array) - second element of each pair
+    """
+
+    def __init__(self, xs, ys):
+        self.xs = xs
+        self.ys = ys
+
+    @classmethod
+    def from_pairs(cls, pairs):
+        return cls(array('q', (x for x, _ in pairs)), array('q', (y for _, y in pairs)))
+
+    @property
+    def pairs(self):
+        """The pairs, generated from the arrays as they are consumed."""
+        return zip(self.xs, self.ys)
+
+    def __str__(self):
+        return "[" + str(list(self.pairs))[1:-1] + "]"
 
 
 class Callable(ABC):
@@ -57,17 +87,20 @@ class Callable(ABC):
 class Function(Callable):
     """Object for custom functions defined within Relathon."""
 
-    def __init__(self, name, parameters, statements):
+    def __init__(self, name, parameters, statements, env=None):
         """
         Attributes:
             parameters - list of the function parameters
             statements - the body of the function
-            interpreter - the interpreter
+            env - environment of the imported module the function was
+                  defined in, in which its body resolves the names that
+                  are not its own; None to resolve them in the caller
         """
         arity = (len(parameters), len(parameters))
         super().__init__(name, arity)
         self.parameters = parameters
         self.statements = statements
+        self.env = env
 
     def call(self, callstack, args):
         super().call(callstack, args)
@@ -367,4 +400,562 @@ class IsEmptyFunction(Callable):
         relation = args[0]
         if not isinstance(relation, Relation):
             raise TypeException(callstack, callstack[-1].location, "empty() argument must be a relation, not {}.".format(args[0].__class__.__name__))
-        return self.rel_true if relation.is_empty() else self.rel_false
\ No newline at end of file
+        return self.rel_true if relation.is_empty() else self.rel_false
+
+class AlgorithmFunction(Callable):
+    """Parent Class for builtin functions that pass their arguments to
+    one of the relation algorithms.
+
+    Algorithms raise ValueError for relations of unsuitable dimension;
+    it is reported as a RelationException.
+
+    Attributes:
+        homogeneous - parameters that must be homogeneous (square) relations
+    """
+
+    homogeneous = ()
+
+    def __init__(self, name, parameters, algorithm, types=None, required=None):
+        """
+        Args:
+            parameters - names of the parameters
+            algorithm - the function that computes the result
+            types - expected type of each parameter; default is Relation
+            required - number of required parameters; default is all
+        """
+        required = len(parameters) if required is None else required
+        arity = (required, len(parameters))
+        super().__init__(name, arity)
+        self.parameters = parameters
+        self.algorithm = algorithm
+        self.types = types if types else [Relation] * len(parameters)
+
+    def call(self, callstack, args):
+        super().call(callstack, args)
+        for param, type_, arg in zip(self.parameters, self.types, args):
+            if not isinstance(arg, type_):
+                expected = " or ".join(t.__name__ for t in type_) if isinstance(type_, tuple) else type_.__name__
+                msg = "{}() argument '{}' must be {}, not {}.".format(self.name, param, expected, arg.__class__.__name__)
+                raise TypeException(callstack, callstack[-1].location, self.name, msg)
+            if param in self.homogeneous and arg.rows != arg.cols:
+                msg = "{}() argument '{}' must be a homogeneous relation, not [{}<->{}].".format(self.name, param, arg.rows, arg.cols)
+                raise RelationException(callstack, callstack[-1].location, self.name, msg)
+        try:
+            return self.algorithm(*args)
+        except ValueError as e:
+            raise RelationException(callstack, callstack[-1].location, self.name, str(e))
+
+
+class ClosureFunction(AlgorithmFunction):
+    """Inbuilt closure function. Returns the transitive closure, or for
+    a weighted relation the sum of its positive powers."""
+
+    homogeneous = ('relation',)
+
+    def __init__(self):
+        super().__init__("closure", ['relation'], self.closure, [(Relation, WeightedRelation)])
+
+    def closure(self, relation):
+        if isinstance(relation, WeightedRelation):
+            return relation.closure()
+        return algorithms.closure(relation)
+
+class ReflexiveClosureFunction(AlgorithmFunction):
+    """Inbuilt rtc function. Returns the reflexive transitive closure."""
+
+    homogeneous = ('relation',)
+
+    def __init__(self):
+        super().__init__("rtc", ['relation'], algorithms.reflexive_closure)
+
+
+class PowerFunction(AlgorithmFunction):
+    """Inbuilt pow function. Returns the relation composed with itself
+    n times; pow(rel, n) is the same as rel ** n.
+
+    pow(rel, n):
+        rel (Relation) - homogeneous relation
+        n (int) - the exponent
+    """
+
+    homogeneous = ('relation',)
+
+    def __init__(self):
+        super().__init__("pow", ['relation', 'n'], algorithms.power, [Relation, int])
+
+
+class WeightedFunction(AlgorithmFunction):
+    """Inbuilt weighted function. Returns a weighted relation that gives
+    each pair of a relation the same weight.
+
+    weighted(rel, semiring, w):
+        rel (Relation) - the relation
+        semiring (Semiring) - one of boolean, minplus, maxmin or counting
+        w (int or float) - optional; the weight, by default the one of
+                           the semiring
+    """
+
+    def __init__(self, context):
+        super().__init__("weighted", ['relation', 'semiring', 'weight'], partial(weighted.from_relation, context),
+                         [Relation, Semiring, (int, float)], required=2)
+
+class SupportFunction(AlgorithmFunction):
+    """Inbuilt support function. Returns the relation of the pairs of a
+    weighted relation that have a non-zero weight."""
+
+    def __init__(self, context):
+        super().__init__("support", ['weighted'], partial(weighted.support, context), [WeightedRelation])
+
+class WeightFunction(AlgorithmFunction):
+    """Inbuilt weight function. Returns the weight of a pair.
+
+    weight(w, i, j):
+        w (WeightedRelation) - the weighted relation
+        i (int) - the row element
+        j (int) - the column element
+    """
+
+    def __init__(self):
+        super().__init__("weight", ['weighted', 'i', 'j'], WeightedRelation.weight, [WeightedRelation, int, int])
+
+
+class ReductionFunction(Callable):
+    """Parent Class for variadic builtin functions that combine any
+    number of relations of the same dimension into one."""
+
+    def __init__(self, name, reduction):
+        """
+        Args:
+            reduction - the function that combines a list of relations
+        """
+        arity = (0,) # 1 to inf
+        super().__init__(name, arity)
+        self.parameters = ['relation', '*relations']
+        self.reduction = reduction
+
+    def call(self, callstack, args):
+        super().call(callstack, args)
+        if not args:
+            raise TypeException(callstack, callstack[-1].location, self.name, "{}() takes at least one relation.".format(self.name))
+        for arg in args:
+            if not isinstance(arg, Relation):
+                msg = "{}() arguments must be relations, not {}.".format(self.name, arg.__class__.__name__)
+                raise TypeException(callstack, callstack[-1].location, self.name, msg)
+        try:
+            return self.reduction(list(args))
+        except ValueError as e:
+            raise RelationException(callstack, callstack[-1].location, self.name, str(e))
+
+class JoinAllFunction(ReductionFunction):
+    """Inbuilt joinall function. Returns the join of all arguments."""
+
+    def __init__(self):
+        super().__init__("joinall", algorithms.join_all)
+
+class MeetAllFunction(ReductionFunction):
+    """Inbuilt meetall function. Returns the meet of all arguments.
+
+    The arguments are met from left to right, not smallest first, and
+    the reduction stops once the result is empty; an empty argument
+    ends it before any meet.
+    """
+
+    def __init__(self):
+        super().__init__("meetall", algorithms.meet_all)
+
+
+class ReachFunction(AlgorithmFunction):
+    """Inbuilt reach function. Returns the vector of all elements
+    reachable from the source vector.
+
+    reach(rel, vec):
+        rel (Relation) - homogeneous relation (graph)
+        vec (Relation) - vector of the sources; each column is expanded
+                         independently, so several source sets can be
+                         searched in one pass
+    """
+
+    homogeneous = ('relation',)
+
+    def __init__(self):
+        super().__init__("reach", ['relation', 'vec'], algorithms.reach)
+
+class ReachWithinFunction(AlgorithmFunction):
+    """Inbuilt reach_within function. Returns the vector of all elements
+    reachable from the source vector in at most k steps."""
+
+    homogeneous = ('relation',)
+
+    def __init__(self):
+        super().__init__("reach_within", ['relation', 'vec', 'k'], algorithms.reach, [Relation, Relation, int])
+
+
+class SCCFunction(AlgorithmFunction):
+    """Inbuilt scc function. Returns the equivalence relation of the
+    strongly connected components."""
+
+    homogeneous = ('relation',)
+
+    def __init__(self, context):
+        super().__init__("scc", ['relation'], partial(algorithms.scc, context))
+
+class CondenseFunction(AlgorithmFunction):
+    """Inbuilt condense function. Returns the acyclic quotient relation
+    between the strongly connected components. Component k is the
+    component with the k-th smallest element."""
+
+    homogeneous = ('relation',)
+
+    def __init__(self, context):
+        super().__init__("condense", ['relation'], partial(algorithms.condense, context))
+
+
+class BisimFunction(AlgorithmFunction):
+    """Inbuilt bisim function. Returns the coarsest refinement of an
+    equivalence that is stable under a transition relation.
+
+    bisim(rel, part):
+        rel (Relation) - homogeneous transition relation
+        part (Relation) - initial partition as an equivalence relation
+    """
+
+    homogeneous = ('relation',)
+
+    def __init__(self, context):
+        super().__init__("bisim", ['relation', 'partition'], partial(algorithms.bisimulation, context))
+
+class ReduceFunction(AlgorithmFunction):
+    """Inbuilt reduce function. Returns the transitive reduction; for a
+    partial order this is its Hasse diagram."""
+
+    homogeneous = ('relation',)
+
+    def __init__(self, context):
+        super().__init__("reduce", ['relation'], partial(algorithms.reduce, context))
+
+
+class LeftResidualFunction(AlgorithmFunction):
+    """Inbuilt lres function. Returns the left residual R\\S = ~(R^ * ~S)."""
+
+    def __init__(self):
+        super().__init__("lres", ['r', 's'], algorithms.left_residual)
+
+class RightResidualFunction(AlgorithmFunction):
+    """Inbuilt rres function. Returns the right residual R/S = ~(~R * S^)."""
+
+    def __init__(self):
+        super().__init__("rres", ['r', 's'], algorithms.right_residual)
+
+class SymmetricQuotientFunction(AlgorithmFunction):
+    """Inbuilt syq function. Returns the symmetric quotient
+    syq(R, S) = ~(R^ * ~S) & ~(~R^ * S)."""
+
+    def __init__(self):
+        super().__init__("syq", ['r', 's'], algorithms.symmetric_quotient)
+
+
+class DomainFunction(AlgorithmFunction):
+    """Inbuilt dom function. Returns the vector of the elements that are
+    related to some element; it has the dimension of the relation.
+    It is computed as R * L, a full composition, not in a single pass
+    over the relation."""
+
+    def __init__(self, context):
+        super().__init__("dom", ['relation'], partial(algorithms.domain, context))
+
+class RangeFunction(AlgorithmFunction):
+    """Inbuilt ran function. Returns the vector of the elements that
+    some element is related to; it has the dimension of the transposed
+    relation."""
+
+    def __init__(self, context):
+        super().__init__("ran", ['relation'], partial(algorithms.range_, context))
+
+class RowFunction(AlgorithmFunction):
+    """Inbuilt row function. Returns row i as a vector with the
+    dimension of the transposed relation.
+
+    row(rel, i):
+        rel (Relation) - the relation
+        i (int) - the row element
+    """
+
+    def __init__(self, context):
+        super().__init__("row", ['relation', 'i'], partial(algorithms.row, context), [Relation, int])
+
+class ColumnFunction(AlgorithmFunction):
+    """Inbuilt col function. Returns column j as a vector with the
+    dimension of the relation.
+
+    col(rel, j):
+        rel (Relation) - the relation
+        j (int) - the column element
+    """
+
+    def __init__(self, context):
+        super().__init__("col", ['relation', 'j'], partial(algorithms.column, context), [Relation, int])
+
+
+class PropertyFunction(AlgorithmFunction):
+    """Parent Class for builtin predicates that test a property of a
+    relation. The algorithm returns the relation of the pairs that
+    violate the property, and the predicate tests whether it is empty;
+    the first violating pair is only looked for by witness."""
+
+    def __init__(self, name, violations, context, true, false, counterexample=None):
+        """
+        Args:
+            violations - the function that builds the violating pairs
+            context - the interpreter's PyrelContext
+            true - True Relation defined in the interpreter's PyrelContext
+            false - False Relation defined in the interpreter's PyrelContext
+            counterexample - the function that finds the pair reported
+                             by witness; by default the first violation
+        """
+        super().__init__(name, ['relation'], partial(violations, context))
+        self.find = partial(counterexample or algorithms.first_violation, context)
+        self.rel_true = true
+        self.rel_false = false
+
+    def counterexample(self, callstack, args):
+        """Return the pair that violates the property, or None."""
+        violations = super().call(callstack, args)
+        return None if violations.is_empty() else self.find(args[0], violations)
+
+    def call(self, callstack, args):
+        violations = super().call(callstack, args)
+        return self.rel_true if violations.is_empty() else self.rel_false
+
+class IsReflexiveFunction(PropertyFunction):
+    """Inbuilt is_reflexive function. Tests I <= R."""
+
+    homogeneous = ('relation',)
+
+    def __init__(self, context, true, false):
+        super().__init__("is_reflexive", algorithms.reflexive_violations, context, true, false)
+
+class IsSymmetricFunction(PropertyFunction):
+    """Inbuilt is_symmetric function. Tests R^ <= R."""
+
+    homogeneous = ('relation',)
+
+    def __init__(self, context, true, false):
+        super().__init__("is_symmetric", algorithms.symmetric_violations, context, true, false)
+
+class IsAntisymmetricFunction(PropertyFunction):
+    """Inbuilt is_antisymmetric function. Tests R & R^ <= I."""
+
+    homogeneous = ('relation',)
+
+    def __init__(self, context, true, false):
+        super().__init__("is_antisymmetric", algorithms.antisymmetric_violations, context, true, false)
+
+class IsTransitiveFunction(PropertyFunction):
+    """Inbuilt is_transitive function. Tests R * R <= R."""
+
+    homogeneous = ('relation',)
+
+    def __init__(self, context, true, false):
+        super().__init__("is_transitive", algorithms.transitive_violations, context, true, false)
+
+class IsAcyclicFunction(PropertyFunction):
+    """Inbuilt is_acyclic function. Tests closure(R) & I == O."""
+
+    homogeneous = ('relation',)
+
+    def __init__(self, context, true, false):
+        super().__init__("is_acyclic", algorithms.acyclic_violations, context, true, false)
+
+class IsFunctionFunction(PropertyFunction):
+    """Inbuilt is_function function. Tests R^ * R <= I (univalence)."""
+
+    def __init__(self, context, true, false):
+        super().__init__("is_function", algorithms.function_violations, context, true, false, algorithms.function_counterexample)
+
+class IsTotalFunction(PropertyFunction):
+    """Inbuilt is_total function. Tests I <= R * R^."""
+
+    def __init__(self, context, true, false):
+        super().__init__("is_total", algorithms.total_violations, context, true, false, algorithms.total_counterexample)
+
+class IsInjectiveFunction(PropertyFunction):
+    """Inbuilt is_injective function. Tests R * R^ <= I."""
+
+    def __init__(self, context, true, false):
+        super().__init__("is_injective", algorithms.injective_violations, context, true, false, algorithms.injective_counterexample)
+
+class IsSurjectiveFunction(PropertyFunction):
+    """Inbuilt is_surjective function. Tests I <= R^ * R."""
+
+    def __init__(self, context, true, false):
+        super().__init__("is_surjective", algorithms.surjective_violations, context, true, false, algorithms.surjective_counterexample)
+
+class WitnessFunction(Callable):
+    """Inbuilt witness function. Returns the pair that violates a
+    property as ordered pairs, which are empty if the relation has
+    the property.
+
+    witness(rel, prop):
+        rel (Relation) - the relation
+        prop (PropertyFunction) - one of the is_* builtins
+    """
+
+    def __init__(self):
+        arity = (2,2)
+        super().__init__("witness", arity)
+        self.parameters = ['relation', 'property']
+
+    def call(self, callstack, args):
+        super().call(callstack, args)
+        relation, property_ = args
+        if not isinstance(property_, PropertyFunction):
+            msg = "{}() argument 'property' must be one of the is_* builtins, not {}.".format(self.name, property_.__class__.__name__)
+            raise TypeException(callstack, callstack[-1].location, self.name, msg)
+        pair = property_.counterexample(callstack, [relation])
+        return OrderedPairs.from_pairs([] if pair is None else [pair])
+
+
+class PiFunction(AlgorithmFunction):
+    """Inbuilt pi function. Returns the projection of the direct product
+    of n and m elements onto the first component; the pair (x, y) is
+    the element x * m + y.
+
+    pi(n, m):
+        n (int) - size of the first component
+        m (int) - size of the second component
+    """
+
+    def __init__(self, context):
+        super().__init__("pi", ['n', 'm'], partial(algorithms.first_projection, context), [int, int])
+
+class RhoFunction(AlgorithmFunction):
+    """Inbuilt rho function. Returns the projection of the direct
+    product of n and m elements onto the second component.
+
+    rho(n, m):
+        n (int) - size of the first component
+        m (int) - size of the second component
+    """
+
+    def __init__(self, context):
+        super().__init__("rho", ['n', 'm'], partial(algorithms.second_projection, context), [int, int])
+
+class TupleFunction(AlgorithmFunction):
+    """Inbuilt tuple function. Returns the tupling [R, S] = R * pi^ & S * rho^."""
+
+    def __init__(self, context):
+        super().__init__("tuple", ['r', 's'], partial(algorithms.tupling, context))
+
+class KronFunction(AlgorithmFunction):
+    """Inbuilt kron function. Returns the Kronecker product
+    pi * R * pi^ & rho * S * rho^."""
+
+    def __init__(self, context):
+        super().__init__("kron", ['r', 's'], partial(algorithms.kronecker, context))
+
+
+class HcatFunction(AlgorithmFunction):
+    """Inbuilt hcat function. Returns the block matrix with R left of S."""
+
+    def __init__(self, context):
+        super().__init__("hcat", ['r', 's'], partial(algorithms.hcat, context))
+
+class VcatFunction(AlgorithmFunction):
+    """Inbuilt vcat function. Returns the block matrix with R above S."""
+
+    def __init__(self, context):
+        super().__init__("vcat", ['r', 's'], partial(algorithms.vcat, context))
+
+
+class ReorderFunction(AlgorithmFunction):
+    """Inbuilt reorder function. Returns the permutation relation that
+    renumbers the elements in reverse Cuthill-McKee order."""
+
+    homogeneous = ('relation',)
+
+    def __init__(self, context):
+        super().__init__("reorder", ['relation'], partial(algorithms.reorder, context))
+
+class PermuteFunction(AlgorithmFunction):
+    """Inbuilt permute function. Returns P^ * R * P, the relation with
+    its elements renamed by the permutation P.
+
+    permute(rel, perm):
+        rel (Relation) - homogeneous relation
+        perm (Relation) - permutation relation, e.g. from reorder
+    """
+
+    def __init__(self):
+        super().__init__("permute", ['relation', 'permutation'], algorithms.permute)
+
+
+class CardFunction(AlgorithmFunction):
+    """Inbuilt card function. Returns the number of pairs in a relation."""
+
+    def __init__(self, context):
+        super().__init__("card", ['relation'], partial(algorithms.cardinality, context))
+
+class OutDegreeFunction(AlgorithmFunction):
+    """Inbuilt outdeg function. Returns the number of images of an
+    element, or the largest number of images of any element.
+
+    outdeg(rel, i):
+        rel (Relation) - the relation
+        i (int) - optional; the element
+    """
+
+    def __init__(self, context):
+        super().__init__("outdeg", ['relation', 'i'], partial(algorithms.out_degree, context), [Relation, int], required=1)
+
+class InDegreeFunction(AlgorithmFunction):
+    """Inbuilt indeg function. Returns the number of preimages of an
+    element, or the largest number of preimages of any element.
+
+    indeg(rel, j):
+        rel (Relation) - the relation
+        j (int) - optional; the element
+    """
+
+    def __init__(self, context):
+        super().__init__("indeg", ['relation', 'j'], partial(algorithms.in_degree, context), [Relation, int], required=1)
+
+class DensityFunction(AlgorithmFunction):
+    """Inbuilt density function. Returns the fraction of all pairs that
+    are in a relation."""
+
+    def __init__(self, context):
+        super().__init__("density", ['relation'], partial(algorithms.density, context))
+
+
+class FixFunction(Callable):
+    """Inbuilt fix function. Applies a function to a relation, then to
+    its result, until the result equals its argument, and returns that
+    fixpoint. The iteration does not end if the function has no
+    fixpoint reached from the relation.
+
+    fix(f, rel):
+        f (Function) - function taking a single relation argument
+        rel (Relation) - the starting relation
+    """
+
+    def __init__(self, interpreter):
+        arity = (2,2)
+        super().__init__("fix", arity)
+        self.interpreter = interpreter
+        self.parameters = ['function', 'relation']
+
+    def call(self, callstack, args):
+        super().call(callstack, args)
+        function, relation = args
+        if not isinstance(function, Callable) or not isinstance(relation, Relation):
+            msg = "{}() arguments must be a function and a relation, not {} and {}".format(self.name, function.__class__.__name__, relation.__class__.__name__)
+            raise TypeException(callstack, callstack[-1].location, self.name, msg)
+        while True:
+            result = self.interpreter.invoke(function, [relation])
+            if not isinstance(result, Relation):
+                msg = "{}() function must return a relation, not {}".format(self.name, result.__class__.__name__)
+                raise TypeException(callstack, callstack[-1].location, self.name, msg)
+            if Relation.equals(result, relation):
+                # the function may return its argument itself
+                return result.copy()
+            relation = result
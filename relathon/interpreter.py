@@ -9,13 +9,16 @@ executive descisions based upon the tree structure, node type, and
 attached data."""
 
 import relathon
+import algorithms
+from weighted import SEMIRINGS, WeightedRelation
 from ast_node import BinaryOperation
-from environment import Environment
+from environment import Environment, ImportEnvironment
 from functions import *
 from tok import *
-from errors import ArityException, NameException, RelationException, TypeException, ModuleNotFoundException
+from errors import ArityException, NameException, RelationException, TypeException, ModuleNotFoundException, ImportException
 from pyrel import PyrelContext, Relation, PyrelException
 from collections import namedtuple, OrderedDict
+from operator import eq, ne, le, ge, gt, lt
 
 
 class Return(Exception):
@@ -67,12 +70,20 @@ class Interpreter(Visitor):
             context - the pyrel context keeps track of the relations
             current_env - the current environment or scoped symbol table
             callstack - tracks function calls
+            modules - maps the path of each imported module to its
+                      environment, so that a module is run only once
+            module - environment of the module being run, the globals
+                     unless an imported module is running
+            imports - environment of the imported names, between the
+                      globals and the builtins
         """
         self.context = context if context else PyrelContext()
         builtins_ = Environment(name="_builtins_")
         self.current_env = builtins_
         self._define_builtins()
         self.callstack = []
+        self.modules = {}
+        self.module = self.current_env
 
     def _define_builtins(self):
         """Initialise the builtins and global environments."""
@@ -95,10 +106,57 @@ class Interpreter(Visitor):
             builtins_.define("L", UniversalFunction(self.context))
             builtins_.define("I", IdentityFunction(self.context))
             builtins_.define("empty", IsEmptyFunction(self.TrueRel, self.FalseRel))
+            builtins_.define("is_reflexive", IsReflexiveFunction(self.context, self.TrueRel, self.FalseRel))
+            builtins_.define("is_symmetric", IsSymmetricFunction(self.context, self.TrueRel, self.FalseRel))
+            builtins_.define("is_antisymmetric", IsAntisymmetricFunction(self.context, self.TrueRel, self.FalseRel))
+            builtins_.define("is_transitive", IsTransitiveFunction(self.context, self.TrueRel, self.FalseRel))
+            builtins_.define("is_acyclic", IsAcyclicFunction(self.context, self.TrueRel, self.FalseRel))
+            builtins_.define("is_function", IsFunctionFunction(self.context, self.TrueRel, self.FalseRel))
+            builtins_.define("is_total", IsTotalFunction(self.context, self.TrueRel, self.FalseRel))
+            builtins_.define("is_injective", IsInjectiveFunction(self.context, self.TrueRel, self.FalseRel))
+            builtins_.define("is_surjective", IsSurjectiveFunction(self.context, self.TrueRel, self.FalseRel))
+            builtins_.define("witness", WitnessFunction())
+            builtins_.define("closure", ClosureFunction())
+            builtins_.define("rtc", ReflexiveClosureFunction())
+            builtins_.define("fix", FixFunction(self))
+            builtins_.define("pow", PowerFunction())
+            builtins_.define("joinall", JoinAllFunction())
+            builtins_.define("meetall", MeetAllFunction())
+            builtins_.define("reach", ReachFunction())
+            builtins_.define("reach_within", ReachWithinFunction())
+            builtins_.define("scc", SCCFunction(self.context))
+            builtins_.define("condense", CondenseFunction(self.context))
+            builtins_.define("reduce", ReduceFunction(self.context))
+            builtins_.define("bisim", BisimFunction(self.context))
+            builtins_.define("lres", LeftResidualFunction())
+            builtins_.define("rres", RightResidualFunction())
+            builtins_.define("syq", SymmetricQuotientFunction())
+            builtins_.define("dom", DomainFunction(self.context))
+            builtins_.define("ran", RangeFunction(self.context))
+            builtins_.define("row", RowFunction(self.context))
+            builtins_.define("col", ColumnFunction(self.context))
+            builtins_.define("pi", PiFunction(self.context))
+            builtins_.define("rho", RhoFunction(self.context))
+            builtins_.define("tuple", TupleFunction(self.context))
+            builtins_.define("kron", KronFunction(self.context))
+            builtins_.define("hcat", HcatFunction(self.context))
+            builtins_.define("vcat", VcatFunction(self.context))
+            builtins_.define("reorder", ReorderFunction(self.context))
+            builtins_.define("permute", PermuteFunction())
+            builtins_.define("card", CardFunction(self.context))
+            builtins_.define("outdeg", OutDegreeFunction(self.context))
+            builtins_.define("indeg", InDegreeFunction(self.context))
+            builtins_.define("density", DensityFunction(self.context))
+            builtins_.define("weighted", WeightedFunction(self.context))
+            builtins_.define("support", SupportFunction(self.context))
+            builtins_.define("weight", WeightFunction())
+            for semiring in SEMIRINGS:
+                builtins_.define(semiring.name, semiring)
 
             # dictionary mapping operator token to relation operation
             self.operatorToOperation = {
                 STAR: Relation.composition,
+                DOUBLESTAR: algorithms.power,
                 VBAR: Relation.join,
                 OR: Relation.join,
                 AMBER: Relation.meet,
@@ -114,11 +172,42 @@ class Interpreter(Visitor):
                 NOT: Relation.complement,
             }
 
-        globals_ = Environment(
-            name='globals',
+            # dictionary mapping operator token to weighted relation operation
+            self.operatorToWeightedOperation = {
+                STAR: WeightedRelation.composition,
+                DOUBLESTAR: WeightedRelation.power,
+                VBAR: WeightedRelation.join,
+                EQEQUAL: WeightedRelation.equals,
+                NOTEQUAL: WeightedRelation.notEquals,
+                CIRCUMFLEX: WeightedRelation.transpose,
+            }
+
+            # dictionary mapping comparison token to the comparison of numbers
+            self.operatorToComparison = {
+                EQEQUAL: eq,
+                NOTEQUAL: ne,
+                LESSEQUAL: le,
+                GREATEREQUAL: ge,
+                GREATER: gt,
+                LESS: lt,
+            }
+
+            # dictionary mapping operator token to the reduction of a chain
+            self.operatorToReduction = {
+                VBAR: algorithms.join_all,
+                AMBER: algorithms.meet_all,
+            }
+
+        self.imports = ImportEnvironment(
+            name='_imports_',
             level = self.current_env.level + 1,
             enclosingEnv= self.current_env
         )
+        globals_ = Environment(
+            name='globals',
+            level = self.imports.level + 1,
+            enclosingEnv= self.imports
+        )
         self.current_env = globals_
 
     def pushCall(self, location, scope):
@@ -143,7 +232,13 @@ class Interpreter(Visitor):
         self.visitSuite(node)
 
     def visitSuite(self, node):
-        for stmt in node.statements:
+        self.execute(node.statements)
+
+    def execute(self, statements):
+        """Run statements in order. The statements may be given by a
+        generator, in which case each is dropped once it has run;
+        functions keep the statements of their own suites."""
+        for stmt in statements:
             if stmt is not None and stmt != []:
                 self.visit(stmt)
 
@@ -151,7 +246,11 @@ class Interpreter(Visitor):
         name =  node.name.data()
         parameters = [param.data() for param in node.parameters]
         statements = node.suite
-        function = Function(name, parameters, statements)
+        # only a function defined at the top of an imported module looks
+        # up names where it was defined; any other looks them up in its
+        # caller
+        imported = self.current_env is self.module and self.module.name != 'globals'
+        function = Function(name, parameters, statements, self.module if imported else None)
         self.current_env.define(name, function)
 
     def visitFunctionCall(self, node):
@@ -164,24 +263,31 @@ class Interpreter(Visitor):
         resolvedArgs = []
         for arg in node.arguments:
             resolvedArgs.append(self.visit(arg))
-        result = function.call(self.callstack, resolvedArgs)
+        result = self.invoke(function, resolvedArgs)
+        self.popCall()
+        return result
+
+    def invoke(self, function, args):
+        """Call a function with already evaluated arguments. Builtin
+        functions return their result directly; custom functions return
+        an environment in which their statements are then evaluated."""
+        result = function.call(self.callstack, args)
         if type(result) == Environment:
 
             def eval_function(env, statements):
-                env = env
-                enclosingEnv = self.current_env
+                callerEnv = self.current_env
+                enclosingEnv = function.env if function.env is not None else callerEnv
                 env.enclosingEnv = enclosingEnv
                 env.level = enclosingEnv.level + 1
                 self.current_env = env
-                r_val = False
                 try:
                     self.visitSuite(statements)
                 except Return as r:
-                    self.current_env = enclosingEnv
                     return r.value
+                finally:
+                    self.current_env = callerEnv
 
             result = eval_function(result, function.statements)
-        self.popCall()
         return result
 
     def visitReturnStatement(self, node):
@@ -204,15 +310,57 @@ class Interpreter(Visitor):
 
     def visitImportStatement(self, node):
         module = node.data().data()
+        namespace = self.import_module(node, module)
+        self.imports.add(namespace, namespace.values)
+
+    def visitFromImportStatement(self, node):
+        module = node.data().data()
+        namespace = self.import_module(node, module)
+        names = {}
+        for name in node.names:
+            name = name.data()
+            if name not in namespace.values:
+                raise ImportException(self.callstack, node.location, \
+                      self.current_env.name, name, module)
+            names[name] = namespace.values[name]
+        self.imports.add((namespace, tuple(names)), names)
+
+    def builtins(self):
+        """Return the environment of the builtins."""
         env = self.current_env
         while env.name != "_builtins_":
             env = env.enclosingEnv
+        return env
+
+    def import_module(self, node, module):
+        """Return the environment of module, running the module first if
+        it has not been imported before."""
         try:
-            relathon.import_module(self, env, module)
+            return relathon.import_module(self, module)
         except FileNotFoundError:
             raise ModuleNotFoundException(self.callstack, node.location, \
                   self.current_env.name, module)
 
+    def run_module(self, name, path, tree):
+        """Run the tree of the module at path in an environment of its
+        own and return the environment. The environment is nested in
+        that of the importing module, so the module sees the names of
+        the module that first imported it. The module is registered
+        before it is run, so that a module imported again while it runs,
+        as by modules that import each other, is not run a second time."""
+        env = Environment(name=name, level=self.module.level + 1, enclosingEnv=self.module)
+        self.modules[path] = env
+        callerEnv, callerModule = self.current_env, self.module
+        self.current_env = self.module = env
+        try:
+            self.visit(tree)
+        except BaseException:
+            del self.modules[path]
+            raise
+        finally:
+            self.current_env, self.module = callerEnv, callerModule
+        return env
+
     def visitWhileStatement(self, node):
         result = self.visit(node.condition)
         if not isinstance(result, Relation) or (result.rows, result.cols) != (1,1):
@@ -270,13 +418,23 @@ class Interpreter(Visitor):
 
     def visitBinaryOperation(self, node):
         lhs = self.visit(node.left)
-        operator = node.operator
         rhs = self.visit(node.right)
-        operation = self.getRelOperation(operator.tag)
+        return self.operate(node, lhs, rhs)
+
+    def operate(self, node, lhs, rhs):
+        operator = node.operator
+        if type(lhs) == WeightedRelation:
+            operation = self.operatorToWeightedOperation.get(operator.tag)
+            operand = WeightedRelation
+        else:
+            operation = self.getRelOperation(operator.tag)
+            operand = Relation
         try:
-            if type(rhs) != Relation:
+            if operation is None or type(rhs) != (int if operator.tag == DOUBLESTAR else operand):
                 raise AttributeError
             result = operation(lhs, rhs)
+        except ValueError as e:
+            raise RelationException(self.callstack, node.location, self.current_env.name, str(e))
         except AttributeError:
             lhs_name = lhs.__class__.__name__
             rhs_name = rhs.__class__.__name__
@@ -288,23 +446,63 @@ class Interpreter(Visitor):
         else:
             return result
 
+    def visitNaryOperation(self, node):
+        operands = [self.visit(operand) for operand in node.operands]
+        # weighted relations only have a join
+        operand_type = WeightedRelation if node.operator.tag == VBAR and type(operands[0]) == WeightedRelation else Relation
+        for operand in operands:
+            if type(operand) != operand_type:
+                name = 'char' if type(operand) == str else operand.__class__.__name__
+                raise TypeException(self.callstack, node.location, self.current_env.name, "unsupported operand type for {}: \'{}\'".format(node.data(), name))
+        reduction = self.operatorToReduction[node.operator.tag]
+        try:
+            return reduction(operands)
+        except ValueError as e:
+            raise RelationException(self.callstack, node.location, self.current_env.name, str(e))
+
     def visitBooleanOperation(self, node):
         return self.visitBinaryOperation(node)
 
     def visitComparison(self, node):
-        result =  self.visitBinaryOperation(node)
+        lhs = self.visit(node.left)
+        rhs = self.visit(node.right)
+        if type(lhs) in (int, float) and type(rhs) in (int, float):
+            result = self.operatorToComparison[node.operator.tag](lhs, rhs)
+        else:
+            result = self.operate(node, lhs, rhs)
         return self.TrueRel if result else self.FalseRel
 
     def visitUnaryOperation(self, node):
         operand = self.visit(node.operand)
-        operation = self.getRelOperation(node.operator.tag)
+        if type(operand) == WeightedRelation:
+            operation = self.operatorToWeightedOperation.get(node.operator.tag)
+        else:
+            operation = self.getRelOperation(node.operator.tag)
         try:
+            if operation is None:
+                raise AttributeError
             result = operation(operand)
         except AttributeError:
             raise TypeException(self.callstack, node.location, self.current_env.name, "bad operand type for unary {}: \'{}\'.".format(node.data(), operand.__class__.__name__))
         else:
             return result
 
+    def visitSubscript(self, node):
+        relation = self.visit(node.value)
+        if type(relation) != Relation:
+            raise TypeException(self.callstack, node.location, self.current_env.name, "\'{}\' object is not subscriptable".format(relation.__class__.__name__))
+        bounds = []
+        for slice_, size in ((node.rows, relation.rows), (node.cols, relation.cols)):
+            lower = 0 if slice_.lower is None else self.visit(slice_.lower)
+            upper = size if slice_.upper is None else self.visit(slice_.upper)
+            if type(lower) != int or type(upper) != int:
+                raise TypeException(self.callstack, slice_.location, self.current_env.name, "slice indices must be integers")
+            bounds += [lower, upper]
+        try:
+            return algorithms.submatrix(self.context, relation, *bounds)
+        except ValueError as e:
+            raise RelationException(self.callstack, node.location, self.current_env.name, str(e))
+
     def visitVariable(self, node):
         identifier = node.data()
         value = self.current_env.resolve(identifier)
@@ -313,19 +511,7 @@ class Interpreter(Visitor):
         return value
 
     def visitOrderedPairs(self, node):
-        class OrderedPairs:
-
-            def __init__(self, pairs):
-                self.pairs = pairs
-
-            def __str__(self):
-                return "[" + str(self.pairs)[1:-1] + "]"
-
-        pairs = []
-        for x,y in node.pairs:
-            pair = self.visit(x), self.visit(y)
-            pairs.append(pair)
-        return OrderedPairs(pairs)
+        return OrderedPairs(node.xs, node.ys)
 
     def visitPassStatement(self, node):
         pass
@@ -16,8 +16,68 @@ from errors import LexerException, IndentationException
 
 TABSIZE = 8
 
-class Lexer:
+# The common tokens are read by hand-written automata chosen by their
+# first character: identifiers, numbers and operators. Each reads the
+# same token as the first expression of Lexer.EXPRESSIONS that matches
+# there; any other character is left to the expressions.
+
+IDENTIFIER_START = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_')
+IDENTIFIER_CHARS = IDENTIFIER_START | frozenset('0123456789-')
+NONZERO = frozenset('123456789')
+DIGITS = NONZERO | {'0'}
+
+# state after the first character of an operator: the token it ends,
+# if any, and the token each second character completes
+OPERATORS = {
+    '(': (LPAR, {}), ')': (RPAR, {}), '[': (LSQB, {}), ']': (RSQB, {}),
+    ':': (COLON, {}), ',': (COMMA, {}), ';': (SEMI, {}), '^': (CIRCUMFLEX, {}),
+    '~': (TILDE, {}), '*': (STAR, {'=': STAREQUAL, '*': DOUBLESTAR}),
+    '|': (VBAR, {'=': VBAREQUAL}), '&': (AMBER, {'=': AMBEREQUAL}),
+    '=': (EQUAL, {'=': EQEQUAL}), '!': (None, {'=': NOTEQUAL}),
+    '<': (LESS, {'=': LESSEQUAL}), '>': (GREATER, {'=': GREATEREQUAL}),
+}
+
+def _identifier(string, p):
+    """[A-Za-z_][A-Za-z0-9_-]*"""
+    end, size = p + 1, len(string)
+    while end < size and string[end] in IDENTIFIER_CHARS:
+        end += 1
+    return IDENTIFIER, end
+
+def _fraction(string, p):
+    """The end of the decimal digits from p on."""
+    size = len(string)
+    while p < size and string[p].isdecimal():
+        p += 1
+    return p
+
+def _number(string, p):
+    r"""A float ([1-9]\d*|0)*\.\d+, else an integer [1-9]\d*|0. The
+    digits before the point may only hold other than ASCII digits after
+    a digit from 1 to 9."""
+    end, size = p, len(string)
+    valid, nonzero = True, False
+    while end < size and string[end].isdecimal():
+        char = string[end]
+        if char in NONZERO:
+            nonzero = True
+        elif char != '0' and not nonzero:
+            valid = False
+        end += 1
+    if valid and end + 1 < size and string[end] == '.' and string[end + 1].isdecimal():
+        return FLOAT, _fraction(string, end + 2)
+    return INTEGER, p + 1 if string[p] == '0' else end
+
+def _dot(string, p):
+    r"""A float \.\d+, else .."""
+    following = string[p + 1:p + 2]
+    if following.isdecimal():
+        return FLOAT, _fraction(string, p + 2)
+    if following == '.':
+        return DOTDOT, p + 2
+    return None
 
+class Lexer:
     # (Token, Regular expression) pairs
     EXPRESSIONS = (
         (NEWLINE,r'\n'),
@@ -29,6 +89,7 @@ class Lexer:
         (CHAR, r'\".\"|\'.\''),
         (FLOAT, r'(([1-9]\d*|0)*\.\d+)'),
         (INTEGER, r'([1-9]\d*|0)'),
+        (DOTDOT, r'\.\.'),
         (LPAR, r'\('),
         (RPAR, r'\)'),
         (LSQB, r'\['),
@@ -45,6 +106,7 @@ class Lexer:
         (GREATEREQUAL, r'>='),
         (LESS, r'<'),
         (GREATER, r'>'),
+        (DOUBLESTAR, r'\*\*'),
         (STAR, r'\*'),
         (VBAR, r'\|'),
         (AMBER, r'\&'),
@@ -56,11 +118,21 @@ class Lexer:
     # refer to named groups in the python regex docs
     named_groups = ['(?P<{}>{})'.format(tag, expr) for tag, expr in EXPRESSIONS]
     REGEX = re.compile('|'.join(named_groups))
+    # within a line, blanks before a token only separate it from the
+    # previous one; they are skipped by the same match as the token
+    # instead of being returned as a token of their own
+    SPACED = re.compile('[ \t]*(?:{})'.format('|'.join(named_groups)))
     del named_groups
 
+    # tokens that are returned as they are and change no state
+    PLAIN = frozenset(tag for tag, _ in EXPRESSIONS) - {
+        NEWLINE, BLANKLINE, ESCAPED_NEWLINE, COMMENT, WHITESPACE,
+        IDENTIFIER, LPAR, RPAR, LSQB, RSQB, COLON}
+
     KEYWORDS = {
         'def': FUNCDEF,
         'import' : IMPORT,
+        'from' : FROM,
         'return': RETURN,
         'if': IF,
         'elif': ELIF,
@@ -77,12 +149,29 @@ class Lexer:
         'None' : NONE
     }
 
+    # number of characters to read from a stream at a time
+    CHUNK_SIZE = 1 << 16
+
     def __init__(self, source, prompt=False):
         self.filename = source.filename
-        self.string = source.string
         self.prompt = prompt
-        if self.prompt:
-            source.string += '\n'
+
+        # a source stream is read incrementally in whole lines; self.string
+        # only holds the unconsumed input beginning at self.offset
+        self.stream = source.stream if source.string is None else None
+        self.string = '' if self.stream else source.string
+        self.offset = 0
+        self.lines = LineTable(self.filename)
+        if self.string:
+            self.lines.add(self.string, 0)
+
+        # interactive input is given a line at a time, and only while the
+        # input given so far is not a complete statement; the lines are
+        # either fed to the lexer or read from the stream when needed
+        self.more = self.prompt
+        self.readline = None
+        if self.prompt and self.stream:
+            self.readline, self.stream = self.stream.readline, None
 
         self.tokens = []
         self.current_token = None
@@ -90,7 +179,6 @@ class Lexer:
 
         self.p = 0
         self.column = 0
-        self.line_num = 1 # line count begins at 1
         self.atbol = True # True at initialization and after newline
         self.nesting = 0
         self.blocks = 0
@@ -99,19 +187,38 @@ class Lexer:
         self.pending_indents = 0
         self.indent_stack = [self.indent]
 
-        if self.prompt:
+        if self.prompt and self.string:
             self.tokenize()
 
     def tokenize(self):
-        """Tokenizes the entire source in one continuous pass.
+        """Tokenizes the input given so far in one continuous pass. The
+        tokens end with EOF only if the input is complete, that is if it
+        leaves no bracket or block open, or if there is no more input.
 
         NOTE: This is used for parsing in interactive mode.
         """
         tok = self.extractToken()
-        self.tokens = [tok]
         while tok.tag != EOF:
+            self.tokens.append(tok)
             tok = self.extractToken()
+        if not self.more or (self.nesting <= 0 and self.blocks == 0):
             self.tokens.append(tok)
+            self.more = False
+
+    def feed(self, text):
+        """Tokenize another line of interactive input, which follows the
+        input given so far. Only the new line is tokenized.
+
+        NOTE: This is used for parsing in interactive mode.
+        """
+        if not text: # end of input
+            self.more = False
+        self.offset += self.p
+        self.string = self.string[self.p:]
+        self.p = 0
+        self.lines.add(text, self.offset + len(self.string))
+        self.string += text
+        self.tokenize()
 
     def nextToken(self):
         """Return the next token.
@@ -120,14 +227,98 @@ class Lexer:
             token
         """
         if self.prompt:
+            while self.token_index == len(self.tokens) and self.more:
+                self.feed(self.readline() if self.readline else '')
             if self.token_index < len(self.tokens):
                 self.current_token = self.tokens[self.token_index]
                 self.token_index += 1
         else:
             self.current_token = self.extractToken()
-            self.tokens.append(self.current_token)
         return self.current_token
 
+    def __iter__(self):
+        """Yield the tokens up to and including EOF."""
+        token = self.nextToken()
+        yield token
+        while token.tag != EOF:
+            token = self.nextToken()
+            yield token
+
+    def _fill(self):
+        """Drop the consumed input and read more whole lines from the
+        stream.
+
+        Returns:
+            False if there is no more input
+        """
+        if self.stream is None:
+            return False
+        lines = self.stream.readlines(self.CHUNK_SIZE)
+        if not lines:
+            self.stream = None
+            return False
+        text = ''.join(lines)
+        self.offset += self.p
+        self.lines.add(text, self.offset + len(self.string) - self.p)
+        self.string = self.string[self.p:] + text
+        self.p = 0
+        return True
+
+    def _match(self, string, p):
+        """Match the token at position p of string. Blanks before it are
+        skipped unless p begins a line, where they indent it.
+
+        Returns:
+            (tag, start, end) of the token, or None
+        """
+        start, size = p, len(string)
+        if not self.atbol:
+            while start < size and string[start] in ' \t':
+                start += 1
+        if start < size:
+            char = string[start]
+            operator = OPERATORS.get(char)
+            if operator is not None:
+                tag, follow = operator
+                second = follow.get(string[start + 1:start + 2])
+                if second is not None:
+                    return second, start, start + 2
+                if tag is not None:
+                    return tag, start, start + 1
+            elif char == '\n' and start > p:
+                # blanks that end a line are a blank line even within
+                # brackets
+                return BLANKLINE, p, start + 1
+            else:
+                if char in IDENTIFIER_START:
+                    token = _identifier(string, start)
+                elif char in DIGITS:
+                    token = _number(string, start)
+                elif char == '.':
+                    token = _dot(string, start)
+                else:
+                    token = None
+                if token is not None:
+                    return token[0], start, token[1]
+        match = (self.REGEX if self.atbol else self.SPACED).match(string, p)
+        if match is None:
+            return None
+        tag = match.lastgroup
+        return (tag,) + match.span(tag)
+
+    def _scan(self):
+        """Match the token at the current position.
+
+        Returns:
+            (tag, start, end) of the token, or None
+        """
+        token = self._match(self.string, self.p)
+        # a token that reaches the end of the buffer may continue in the
+        # unread input
+        while (token is None or token[2] == len(self.string)) and self._fill():
+            token = self._match(self.string, self.p)
+        return token
+
     def extractToken(self):
         """Matches the next sequence of input from the source with a
         recognized pattern and returns the lexeme as a lexical token.
@@ -138,112 +329,122 @@ class Lexer:
         Raises:
             LexicalError - if the next token is not recogized
         """
+        # a location is only allocated for a token that is returned, not
+        # for skipped whitespace and comments
         sameLogicalLine = False
-        while self.p < len(self.string):
-            if not sameLogicalLine: # then lineBegin and columnBegin are new
-                loc = Location(self.filename, self.p, self.line_num, \
-                        self.column, self.line_num, self.column)
-            else:
-                sameLogicalLine = False
+        while True:
+            string, p = self.string, self.p
+            token = self._match(string, p)
+            if token is None or token[2] == len(string):
+                if p == len(string) and not self._fill():
+                    break
+                token = self._scan()
+                string, p = self.string, self.p
+                if token is None:
+                    if not sameLogicalLine:
+                        pos = self.offset + p
+                    raise LexerException(Location(self.lines, pos, self.offset + p + 1))
+            tag, start, end = token
+            # skipped blanks begin a new token even after an escaped
+            # newline
+            if not sameLogicalLine or start > p:
+                pos = self.offset + start
+            self.p = end
 
-            match = self.REGEX.match(self.string, self.p)
-            if not match:
-                loc.columnEnd += 1
-                raise LexerException(loc)
-            else:
-                tag = match.lastgroup
-                lexeme = match.group(tag)
-                self.p = match.end(tag)
-                # escaped or nested newline does not constitute a new logical line
-                if tag == ESCAPED_NEWLINE or (tag == NEWLINE and self.nesting > 0):
-                    self.line_num += 1
-                    self.column = 0
-                    loc.lineEnd = self.line_num
-                    sameLogicalLine = True
-                    continue
+            # most tokens are within a line and change no state
+            if not self.atbol:
+                if tag == IDENTIFIER:
+                    lexeme = string[start:end]
+                    loc = Location(self.lines, pos, self.offset + end)
+                    return Token(self.KEYWORDS.get(lexeme, tag), lexeme, loc)
+                if tag in self.PLAIN:
+                    loc = Location(self.lines, pos, self.offset + end)
+                    return Token(tag, string[start:end], loc)
+
+            sameLogicalLine = False
+            lexeme = string[start:end]
+            # escaped or nested newline does not constitute a new logical line
+            if tag == ESCAPED_NEWLINE or (tag == NEWLINE and self.nesting > 0):
+                self.column = 0
+                sameLogicalLine = True
+                continue
+
+            # Only Beginning Of Line affects indentation
+            if self.atbol:
+                self.atbol = False
 
-                # Only Beginning Of Line affects indentation
-                if self.atbol:
-                    self.atbol = False
-
-                    # blanklines and comment only lines do not affect indentation
-                    if tag in (BLANKLINE, COMMENT, NEWLINE):
-                        if tag == NEWLINE and self.prompt:
-                            if self.blocks:
-                                self.blocks = 0
-                            continue
-                        else:
-                            self.atbol = True
-                            self.line_num += 1
+                # blanklines and comment only lines do not affect indentation
+                if tag in (BLANKLINE, COMMENT, NEWLINE):
+                    if tag == NEWLINE and self.prompt:
+                        if self.blocks:
+                            self.blocks = 0
                         continue
+                    else:
+                        self.atbol = True
+                    continue
 
+                if tag == WHITESPACE:
+                    num_of_tabs = lexeme.count('\t')
+                    self.column = num_of_tabs * TABSIZE + \
+                                  (len(lexeme) - num_of_tabs)
+                if self.column > self.indent_stack[self.indent]:
+                    self.indent_stack.append(self.column)
+                    self.indent += 1
+                    self.pending_indents += 1
+                elif self.column < self.indent_stack[self.indent]:
+                    while self.indent > 0 and \
+                      self.column < self.indent_stack[self.indent]:
+                        self.indent -= 1
+                        self.pending_indents -= 1
+                    if self.column != self.indent_stack[self.indent]:
+                        loc = Location(self.lines, pos, self.offset + self.p)
+                        raise IndentationException(loc, lexer=True)
+                else: # no change of indentation
                     if tag == WHITESPACE:
-                        num_of_tabs = lexeme.count('\t')
-                        self.column = num_of_tabs * TABSIZE + \
-                                      (len(lexeme) - num_of_tabs)
-                        loc.columnEnd = self.column
-                    if self.column > self.indent_stack[self.indent]:
-                        self.indent_stack.append(self.column)
-                        self.indent += 1
+                        continue
+
+                # Return pending indentation
+                if self.pending_indents != 0:
+                    if self.pending_indents < 0:
                         self.pending_indents += 1
-                    elif self.column < self.indent_stack[self.indent]:
-                        while self.indent > 0 and \
-                          self.column < self.indent_stack[self.indent]:
-                            self.indent -= 1
-                            self.pending_indents -= 1
-                        if self.column != self.indent_stack[self.indent]:
-                            beg = self.p - self.column
-                            raise IndentationException(loc, lexer=True)
-                    else: # no change of indentation
-                        if tag == WHITESPACE:
-                            continue
-
-                    # Return pending indentation
-                    if self.pending_indents != 0:
-                        if self.pending_indents < 0:
-                            self.pending_indents += 1
-                            self.p = match.start() # DEDENT is not a character with a length,
-                            return Token(DEDENT, DEDENT, loc) # so don't count it
-                        else:
-                            self.pending_indents -= 1
-                            return Token(INDENT, INDENT, loc)
-
-                elif tag == WHITESPACE: # skip all other whitespace (e.g. nested whitespace)
-                    self.column += len(lexeme)
-                    continue
+                        self.p = start # DEDENT is not a character with a length,
+                        loc = Location(self.lines, pos, self.offset + start)
+                        return Token(DEDENT, DEDENT, loc) # so don't count it
+                    else:
+                        self.pending_indents -= 1
+                        loc = Location(self.lines, pos, self.offset + self.p)
+                        return Token(INDENT, INDENT, loc)
 
-                if tag in (COMMENT, NEWLINE, BLANKLINE):
-                    # loc.lineEnd += 1
-                    loc.columnEnd = 0
-                    if tag in (NEWLINE, BLANKLINE):
-                        if self.blocks:
-                            self.blocks = 1
-                        self.atbol = True
-                        self.line_num += len(lexeme)
-                        self.column = 0
-                        return Token(NEWLINE, "\n", loc)
-                    self.line_num += 1
-                    continue # skip comments
+            elif tag == WHITESPACE: # skip all other whitespace (e.g. nested whitespace)
+                continue
 
-                if tag in (LPAR, LSQB):
-                    self.nesting += 1
+            if tag in (COMMENT, NEWLINE, BLANKLINE):
+                if tag in (NEWLINE, BLANKLINE):
+                    if self.blocks:
+                        self.blocks = 1
+                    self.atbol = True
+                    self.column = 0
+                    loc = Location(self.lines, pos, self.offset + self.p)
+                    return Token(NEWLINE, "\n", loc)
+                continue # skip comments
 
-                elif tag in (RPAR, RSQB):
-                    self.nesting -= 1
+            if tag in (LPAR, LSQB):
+                self.nesting += 1
 
-                if tag == COLON:
-                    self.blocks = 1
+            elif tag in (RPAR, RSQB):
+                self.nesting -= 1
 
-                length = len(lexeme)
-                if tag == IDENTIFIER:
-                    if lexeme in self.KEYWORDS:
-                        tag = self.KEYWORDS[lexeme]
-                loc.columnEnd += length
-                self.column += length
-                token = Token(tag, lexeme, loc)
-                return token
-
-        loc = Location(self.filename, self.p-1, self.line_num, \
-                       self.column-1,self.line_num, self.column-1)
+            if tag == COLON and self.nesting == 0: # not a slice
+                self.blocks = 1
+
+            if tag == IDENTIFIER:
+                if lexeme in self.KEYWORDS:
+                    tag = self.KEYWORDS[lexeme]
+            loc = Location(self.lines, pos, self.offset + self.p)
+            return Token(tag, lexeme, loc)
+
+        pos = self.offset + self.p - 1
+        loc = Location(self.lines, pos, pos)
         tok = Token(EOF, None, loc)
-        return tok
\ No newline at end of file
+        return tok
+
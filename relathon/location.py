@@ -3,36 +3,93 @@
 # This file is part of relathon. Use of this source code is governed by
 # the GPL license that can be found in the LICENSE file.
 
-class Location:
+from array import array
+from bisect import bisect_right
+
+class LineTable:
+    """The offsets at which the lines of a source begin. Locations only
+    hold character offsets; their lines and columns are resolved from the
+    table when an error message needs them.
+
+    Attributes:
+        filename (str) - name of the source
+        starts (array) - offset of the first character of each line
+    """
+    __slots__ = ('filename', 'starts')
 
-    def __init__(self, filename, pos, lineBegin, columnBegin, lineEnd, columnEnd):
+    def __init__(self, filename):
         self.filename = filename
+        self.starts = array('q', [0])
+
+    def add(self, text, offset):
+        """Record the lines that begin in text, which is found at offset
+        in the source."""
+        find = text.find
+        i = find('\n')
+        while i != -1:
+            self.starts.append(offset + i + 1)
+            i = find('\n', i + 1)
+
+    def resolve(self, pos):
+        """Return the line (counting from 1) and column of offset pos."""
+        line = max(bisect_right(self.starts, pos), 1)
+        return line, pos - self.starts[line - 1]
+
+
+class Location:
+    """The span of source between two character offsets.
+
+    Attributes:
+        table (LineTable) - lines of the source
+        pos (int) - offset of the beginning
+        end (int) - offset of the end
+    """
+    __slots__ = ('table', 'pos', 'end')
+
+    def __init__(self, table, pos, end):
+        self.table = table
         self.pos = pos
-        self.lineBegin = lineBegin
-        self.columnBegin = columnBegin
-        self.lineEnd = lineEnd
-        self.columnEnd = columnEnd
+        self.end = end
+
+    @property
+    def filename(self):
+        return self.table.filename
+
+    @property
+    def lineBegin(self):
+        return self.table.resolve(self.pos)[0]
+
+    @property
+    def columnBegin(self):
+        return self.table.resolve(self.pos)[1]
+
+    @property
+    def lineEnd(self):
+        return self.table.resolve(self.end)[0]
+
+    @property
+    def columnEnd(self):
+        return self.table.resolve(self.end)[1]
 
     def __repr__(self):
-        return "{}({}, {}, {}, {}, {}, {})".format(self.__class__.__name__, self.filename, self.pos, self.lineBegin, self.columnBegin, self.lineEnd, self.columnEnd)
+        return "{}({}, {}, {})".format(self.__class__.__name__, self.filename, self.pos, self.end)
 
     def __str__(self):
-        return "{}:{} {}.{}-{}.{}".format(self.filename, self.pos, self.lineBegin,
-                                       self.columnBegin, self.lineEnd,
-                                       self.columnEnd)
+        return "{}:{} {}.{}-{}.{}".format(self.filename, self.pos,
+                                          *self.table.resolve(self.pos),
+                                          *self.table.resolve(self.end))
 
-    def __eq__(self, other):
+    def __reduce__(self):
+        # pickled as a constructor call, which is smaller and quicker
+        # to load than the slots
+        return (Location, (self.table, self.pos, self.end))
 
-        return isinstance(other, Location) and (self.filename, self.pos, self.lineBegin, self.columnBegin, self.lineEnd, self.columnEnd) == \
-            (other.filename, other.pos, other.lineBegin, other.columnBegin, other.lineEnd, other.columnEnd)
+    def __eq__(self, other):
+        return isinstance(other, Location) and (self.filename, self.pos, self.end) == \
+            (other.filename, other.pos, other.end)
 
     def combine(self, other):
         assert self.filename == other.filename
-        pos = min(self.pos, other.pos)
-        lineBegin, columnBegin = min((self.lineBegin, self.columnBegin),
-                                (other.lineBegin, other.columnBegin))
-        lineEnd, columnEnd = max((self.lineEnd, self.columnEnd),
-                            (other.lineEnd, other.columnEnd))
-        return Location(self.filename, pos, lineBegin, columnBegin, lineEnd, columnEnd)
-
-NoLoc = Location("<unknown>", 0, 0, 0, 0, 0)
\ No newline at end of file
+        return Location(self.table, min(self.pos, other.pos), max(self.end, other.end))
+
+NoLoc = Location(LineTable("<unknown>"), 0, 0)
@@ -5,11 +5,15 @@
 
 """A recursive decent parser with a lookahead of 1.
 
-Each function corresponds to a production rule in the grammar. The
+Each function corresponds to a production rule in the grammar, except
+for expressions, which are parsed by precedence climbing over a table of
+binding powers rather than by one function per level of precedence. The
 relathon grammar should be considered documentation for this module and
 can be found in grammar.txt in the project root directory.
 """
 
+from array import array
+from itertools import repeat
 from tok import *
 from lexer import Lexer
 import ast_node as ast
@@ -24,6 +28,28 @@ FLOW = (BREAK, CONTINUE, PASS)
 BOOL = (TRUE, FALSE)
 LITERAL = (*BOOL, INTEGER, FLOAT, CHAR, NONE)
 
+# most pairs a single pair of ranges may stand for
+MAX_RANGE_PAIRS = 1 << 20
+
+# binding powers of the expression operators, from loosest to tightest
+(TERNARY_BP, OR_BP, AND_BP, NOT_BP, COMPARISON_BP, FACTOR_BP, TERM_BP,
+ UNARY_BP, POSTFIX_BP, TRAILER_BP) = range(1, 11)
+
+# binding powers of the operators that follow an operand
+BINDING_POWER = {
+    IF: TERNARY_BP,
+    OR: OR_BP,
+    AND: AND_BP,
+    **dict.fromkeys(COMP_OP, COMPARISON_BP),
+    VBAR: FACTOR_BP,
+    AMBER: FACTOR_BP,
+    STAR: TERM_BP,
+    CIRCUMFLEX: POSTFIX_BP,
+    DOUBLESTAR: POSTFIX_BP,
+    LPAR: TRAILER_BP,
+    LSQB: TRAILER_BP,
+}
+
 class Parser:
 
     def __init__(self, lexer):
@@ -35,7 +61,7 @@ class Parser:
         self.p = 0
 
         self._consume() # initialize self.lookahead
-        self.location = Location(self.lexer.filename, self.p, 1, 0, 1, 0)
+        self.location = Location(self.lexer.lines, self.p, self.p)
 
         self.inLoop = False # for parsing break and continue statements
 
@@ -90,14 +116,20 @@ class Parser:
         beginloc = self.location
         stmts = []
         if self._lookaheadToken():
-            while self._lookahead() != EOF:
-                if self._lookahead()  == NEWLINE:
-                    self._match(NEWLINE, INDENT)
-                    continue
-                else:
-                    stmts.append(self.statement())
+            stmts.extend(self.statements())
         return ast.Module(self._location(beginloc), stmts)
 
+    def statements(self):
+        """Yield the statements of a module one at a time, as they are
+        parsed, so that they can be run without building the tree of the
+        whole module."""
+        while self._lookahead() != EOF:
+            if self._lookahead()  == NEWLINE:
+                self._match(NEWLINE, INDENT)
+                continue
+            else:
+                yield self.statement()
+
     def single_input(self):
         # single_input: NEWLINE | simple_stmt | compound_stmt NEWLINE
         if self._lookahead() in (NEWLINE, EOF):
@@ -153,7 +185,7 @@ class Parser:
             else:
                 expr = self.expr()
             stmt = ast.ReturnStatement(self._location(beginloc), expr)
-        elif self._lookahead() == IMPORT:
+        elif self._lookahead() in (IMPORT, FROM):
             stmt = self.import_stmt()
         else:
             stmt = self.expr_stmt()
@@ -240,6 +272,15 @@ class Parser:
 
     def import_stmt(self):
         beginloc = self.location
+        if self._lookahead() == FROM:
+            self._match(FROM)
+            module = self.name()
+            self._match(IMPORT)
+            names = [self.name()]
+            while self._lookahead() == COMMA:
+                self._match(COMMA)
+                names.append(self.name())
+            return ast.FromImportStatement(self._location(beginloc), module, names)
         self._match(IMPORT)
         module = self.name()
         return ast.ImportStatement(self._location(beginloc), module)
@@ -281,99 +322,102 @@ class Parser:
         return ast.WhileStatement(self._location(beginloc), condition, suite, _else)
 
     def expr(self):
-        beginloc = self.location
-        expr = self.or_expr()
-        if self._lookahead() == IF:
-            self._match(IF)
-            condition = self.expr()
-            self._match(ELSE)
-            orelse = self.expr()
-            return ast.TernaryOperation(self._location(beginloc), expr, condition, orelse)
-        return expr
+        return self.expression(TERNARY_BP)
 
-    def or_expr(self):
-        beginloc = self.location
-        expr = self.and_expr()
-        if self._lookahead() == OR:
-            op = self._lookaheadToken()
-            self._match(OR)
-            right_expr = self.or_expr()
-            expr = ast.BooleanOperation(self._location(beginloc), expr, op, right_expr)
-        return expr
+    def comparison(self):
+        return self.expression(COMPARISON_BP)
 
-    def and_expr(self):
-        beginloc = self.location
-        expr = self.not_expr()
-        if self._lookahead() == AND:
-            op = self._lookaheadToken()
-            self._match(AND)
-            right_expr = self.and_expr()
-            expr = ast.BooleanOperation(self._location(beginloc), expr, op, right_expr)
-        return expr
+    def expression(self, power):
+        """Parse an expression whose operators bind at least as tightly
+        as power, by precedence climbing. A prefix or atom is parsed
+        first; operators that follow it are applied while they bind
+        tightly enough, and operators of equal power group to the right.
 
-    def not_expr(self):
+        Every node spans from the begin location of the expression, as
+        the nodes of the grammar productions do.
+        """
         beginloc = self.location
-        if self._lookahead() == NOT:
+        la1 = self._lookahead()
+        if la1 == NOT and power <= NOT_BP:
             op = self._lookaheadToken()
             self._match(NOT)
-            operand = self.not_expr()
+            operand = self.expression(NOT_BP)
             expr = ast.UnaryOperation(self._location(beginloc), operand, op)
-        else:
-            expr = self.comparison()
-        return expr
-
-    def comparison(self):
-        beginloc = self.location
-        left = self.factor()
-        if self._lookahead() in COMP_OP:
-            op = self._lookaheadToken()
-            self._match(*COMP_OP)
-            right = self.comparison()
-            return ast.Comparison(self._location(beginloc), left, op, right)
-        return left
-
-    def factor(self):
-        beginloc = self.location
-        factor = self.term()
-        if self._lookahead() in (VBAR, AMBER):
-            op = self._lookaheadToken()
-            self._match(VBAR, AMBER)
-            right_factor = self.factor()
-            factor = ast.BinaryOperation(self._location(beginloc), factor, op, right_factor)
-        return factor
-
-    def term(self):
-        beginloc = self.location
-        term = self.unary_term()
-        if self._lookahead() == STAR:
-            op = self._lookaheadToken()
-            self._match(STAR)
-            right_term = self.term()
-            term = ast.BinaryOperation(self._location(beginloc), term, op, right_term)
-        return term
-
-    def unary_term(self):
-        beginloc = self.location
-        if self._lookahead() == TILDE:
+            trailers = False
+        elif la1 == TILDE:
             op = self._lookaheadToken()
             self._match(TILDE)
-            operand = self.unary_term()
-            term = ast.UnaryOperation(self._location(beginloc), operand, op)
+            operand = self.expression(UNARY_BP)
+            expr = ast.UnaryOperation(self._location(beginloc), operand, op)
+            trailers = False
         else:
-            term = self.atom_expr()
-            while self._lookahead() == CIRCUMFLEX:
-                op = self._lookaheadToken()
+            expr = self.atom()
+            trailers = True # calls and subscripts only follow an atom
+
+        while True:
+            la1 = self._lookahead()
+            bp = BINDING_POWER.get(la1)
+            if bp is None or bp < power:
+                break
+            op = self._lookaheadToken()
+            if la1 == LPAR:
+                if not trailers:
+                    break
+                trailer = self.trailer()
+                expr = ast.FunctionCall(self._location(beginloc), expr, trailer)
+                continue
+            elif la1 == LSQB:
+                if not trailers:
+                    break
+                rows, cols = self.subscript()
+                expr = ast.Subscript(self._location(beginloc), expr, rows, cols)
+                continue
+            elif la1 == CIRCUMFLEX:
                 self._match(CIRCUMFLEX)
-                term = ast.UnaryOperation(self._location(beginloc), term, op)
-        return term
+                expr = ast.UnaryOperation(self._location(beginloc), expr, op)
+            elif la1 == DOUBLESTAR:
+                self._match(DOUBLESTAR)
+                exponent = self.expression(UNARY_BP)
+                expr = ast.BinaryOperation(self._location(beginloc), expr, op, exponent)
+            elif la1 == STAR:
+                self._match(STAR)
+                right = self.expression(TERM_BP)
+                expr = ast.BinaryOperation(self._location(beginloc), expr, op, right)
+            elif la1 in (VBAR, AMBER):
+                expr = self.chain(beginloc, expr)
+            elif la1 in COMP_OP:
+                self._match(*COMP_OP)
+                right = self.expression(COMPARISON_BP)
+                expr = ast.Comparison(self._location(beginloc), expr, op, right)
+            elif la1 in BOOL_OP:
+                self._match(la1)
+                right = self.expression(bp)
+                expr = ast.BooleanOperation(self._location(beginloc), expr, op, right)
+            else: # IF
+                self._match(IF)
+                condition = self.expr()
+                self._match(ELSE)
+                orelse = self.expr()
+                expr = ast.TernaryOperation(self._location(beginloc), expr, condition, orelse)
+            trailers = False
+        return expr
 
-    def atom_expr(self):
-        beginloc = self.location
-        atom = self.atom()
-        if self._lookahead() == LPAR:
-            trailer = self.trailer()
-            return ast.FunctionCall(self._location(beginloc), atom, trailer)
-        return atom
+    def chain(self, beginloc, first):
+        # '|' and '&' group to the right; a run of the same operator is
+        # flattened into a single n-ary operation, and the last operand
+        # of a run begins the run of the other operator
+        operator = self._lookaheadToken()
+        operands = [first]
+        while self._lookahead() == operator.tag:
+            self._match(operator.tag)
+            operand_beginloc = self.location
+            operand = self.expression(TERM_BP)
+            if self._lookahead() in (VBAR, AMBER) and self._lookahead() != operator.tag:
+                operand = self.chain(operand_beginloc, operand)
+            operands.append(operand)
+        if len(operands) == 2:
+            return ast.BinaryOperation(self._location(beginloc), operands[0], operator, operands[1])
+        return ast.NaryOperation(self._location(beginloc), operator, operands)
 
     def trailer(self):
         self._match(LPAR)
@@ -381,6 +425,24 @@ class Parser:
         self._match(RPAR)
         return arglist
 
+    def subscript(self):
+        self._match(LSQB)
+        rows = self.slice()
+        self._match(COMMA)
+        cols = self.slice()
+        self._match(RSQB)
+        return rows, cols
+
+    def slice(self):
+        beginloc = self.location
+        lower = upper = None
+        if self._lookahead() != COLON:
+            lower = self.expr()
+        self._match(COLON)
+        if self._lookahead() not in (COMMA, RSQB):
+            upper = self.expr()
+        return ast.Slice(self._location(beginloc), lower, upper)
+
     def arglist(self):
         if self._lookahead() == RPAR:
             args = []
@@ -432,25 +494,53 @@ class Parser:
         return literal
 
     def ordered_pairs(self):
+        # the elements are read straight into integer arrays instead of
+        # a node per element
         beginloc = self.location
         self._match(LSQB)
-        pairs = []
+        xs, ys = array('q'), array('q')
         if self._lookahead() != RSQB:
-            pairs.append(self.pair())
+            self.pair(xs, ys)
             while self._lookahead() == COMMA and self._lookahead() != RSQB:
                 self._match(COMMA)
                 if self._lookahead() != RSQB:
-                    pairs.append(self.pair())
+                    self.pair(xs, ys)
         self._match(RSQB)
-        return ast.OrderedPairs(self._location(beginloc), pairs)
+        return ast.OrderedPairs(self._location(beginloc), xs, ys)
 
-    def pair(self):
+    def pair(self, xs, ys):
+        # a pair of ranges stands for every pair of their elements
+        beginloc = self.location
         self._match(LPAR)
-        element_x = self.integer()
+        element_x = self.bound()
         self._match(COMMA)
-        element_y = self.integer()
+        element_y = self.bound()
         self._match(RPAR)
-        return element_x, element_y
+        if len(element_x) * len(element_y) > MAX_RANGE_PAIRS:
+            msg = "range pair stands for {} pairs, more than {}".format(len(element_x) * len(element_y), MAX_RANGE_PAIRS)
+            raise ParserException(self._location(beginloc), msg)
+        try:
+            for x in element_x:
+                xs.extend(repeat(x, len(element_y)))
+                ys.extend(element_y)
+        except OverflowError:
+            raise ParserException(self._location(beginloc), "pair element is too large")
+
+    def bound(self):
+        # INTEGER ['..' INTEGER]; a range includes both of its ends
+        beginloc = self.location
+        token = self._lookaheadToken()
+        self._match(INTEGER)
+        lower = int(token.lexeme)
+        if self._lookahead() != DOTDOT:
+            return range(lower, lower + 1)
+        self._match(DOTDOT)
+        token = self._lookaheadToken()
+        self._match(INTEGER)
+        upper = int(token.lexeme)
+        if upper < lower:
+            raise ParserException(self._location(beginloc), "empty range {}..{}".format(lower, upper))
+        return range(lower, upper + 1)
 
     def integer(self):
         beginloc = self.location
@@ -12,11 +12,23 @@ Classes:
     Source - Relathon module source code
     Relathon - Interface to the Relathon programming language. Executes
         relathon scripts and provides an interactive shell that closely emulates the python shell.
+    PromptParser - Parser of interactive input entered a line at a time
+
+Options:
+    --stream - run each top-level statement as soon as it is parsed
+    --no-check - run a script without first checking the dimensions of
+        its relations and the names it uses
+    --no-cache - neither read nor write cached syntax trees
+    --cache-dir DIR - keep cached syntax trees below DIR instead of in
+        __relcache__ next to each module
+    --prune-cache - remove stale cached syntax trees below the directory
+        of the script, or the current directory without one
 """
-import sys, code
+import os, sys, code, argparse
 from ast_node import Expression, Null
 from lexer import Lexer
 from parser import Parser
+from cache import ASTCache
 import interpreter
 from errors import IndentationException, LexerException, ParserException, RelathonException
 from pyrel import PyrelException
@@ -29,12 +41,15 @@ class Source:
     Attributes:
         filename (str) - name of source file object
         string (str) - the source code string
+        stream (file) - file object the lexer reads the source from
+                        incrementally instead of string
     """
 
-    def __init__(self, filename, string=None):
+    def __init__(self, filename, string=None, stream=None):
         self.filename = filename
         self.string = string
-        if string == None:
+        self.stream = stream
+        if string == None and stream == None:
             self.read()
 
     def read(self):
@@ -54,21 +69,80 @@ class Relathon:
         ps1 - prompt string
         ps2 - secondary prompt string
         banner - Console banner
+        cache - cache of syntax trees, or None
+        checking - check each module before it is run
     """
     ps1 = '>>> '
     ps2 = '... '
     banner = ('Relathon {v}').format(v=VERSION)
+    cache = ASTCache(VERSION)
+    checking = True
 
     @classmethod
-    def run(cls, fd, intrpr=None):
-        """Parse and run source from a file."""
-        source = Source(fd.name, fd.read())
-        ast = cls.parse(source)
+    def run(cls, fd, intrpr=None, stream=False):
+        """Parse and run source from a file.
+
+        In stream mode each top-level statement is run as soon as it is
+        parsed and dropped after it has run, so that the first results of
+        a huge script appear at once and its tree is never held in
+        memory. A syntax error then stops the script only once the
+        statements before it have run. Neither the cache nor the checker
+        is used in stream mode.
+        """
         if not intrpr:
             intrpr = interpreter.Interpreter()
-        intrpr.visit(ast)
+        if stream:
+            parser = Parser(Lexer(Source(fd.name, stream=fd)))
+            intrpr.execute(parser.statements())
+        else:
+            ast = cls.load(fd)
+            cls.check(ast, intrpr)
+            intrpr.visit(ast)
         return intrpr
 
+    @classmethod
+    def check(cls, ast, intrpr, scope='globals'):
+        """Check the dimensions of the relations of a module and the
+        names it uses before it is run by intrpr, unless checking is off.
+
+        Raises:
+            NameException - a name that is never defined
+            RelationException - relations of dimensions that do not fit
+            TypeException - a condition that is not of type [1<->1]
+        """
+        if cls.checking:
+            # imported here, as the checker needs the interpreter, which
+            # imports this module
+            from checker import Checker
+            builtins_ = intrpr.builtins()
+            enclosing = None
+            if scope != 'globals':
+                # an imported module is nested in the importing module
+                enclosing, env = set(), intrpr.module
+                while env is not builtins_:
+                    enclosing.update(env.values)
+                    env = env.enclosingEnv
+                for _, namespace in intrpr.imports.namespaces:
+                    enclosing.update(namespace)
+            errors = Checker(builtins_.values, scope, enclosing).check(ast)
+            if errors:
+                raise errors[0]
+
+    @classmethod
+    def load(cls, fd):
+        """Parse source from a file and return the abstract syntax tree.
+        The syntax trees of .rel files are taken from and stored in the
+        cache, if there is one."""
+        cache = cls.cache if fd is not sys.stdin else None
+        ast = cache.load(fd.name) if cache else None
+        if ast is None:
+            status = os.fstat(fd.fileno()) if cache else None
+            source = Source(fd.name, stream=fd)
+            ast = cls.parse(source)
+            if cache:
+                cache.store(fd.name, ast, status)
+        return ast
+
     @classmethod
     def parse(cls, source, prompt=False):
         """Parse source and return the abstract syntax tree.
@@ -81,24 +155,9 @@ class Relathon:
             LexerException - Lexigraphical Errors
             ParserException - Grammatical Errors
         """
-        lexer = Lexer(source, prompt=prompt)
-        parser = Parser(lexer)
-        parseMethod = Parser.module
         if prompt == True:
-            parseMethod = Parser.single_input
-            if lexer.nesting > 0 or lexer.blocks > 0:
-                try:
-                    parser.parse(parseMethod)
-                except IndentationException as e:
-                    if not (e.lexer or e.expected):
-                        raise e
-                except ParserException as e:
-                    if e.tag in ('EOF', 'NEWLINE'):
-                        pass
-                    else:
-                        raise e
-                return
-        return parser.parse(parseMethod)
+            return PromptParser(source.filename).push(source.string)
+        return Parser(Lexer(source)).parse(Parser.module)
 
     @classmethod
     def interact(cls, locals=None):
@@ -107,12 +166,22 @@ class Relathon:
 
             def __init__(self, filename=None):
                 self.interpreter = interpreter.Interpreter()
+                self.parser = None
                 super().__init__(filename=filename)
 
+            def resetbuffer(self):
+                """Begin a new statement, also after an interrupt."""
+                super().resetbuffer()
+                self.parser = None
+
             def runsource(self, source, filename=None, symbol=None):
+                # only the line just entered is new to the parser, which
+                # has kept its state since the first line of the statement
+                if self.parser is None:
+                    self.parser = PromptParser(filename)
                 try:
                     source += '\n'
-                    ast = cls.parse(Source(filename, source), prompt=True)
+                    ast = self.parser.push(self.buffer[-1] + '\n')
                 except (LexerException, ParserException, IndentationException) as e:
                     cls.print_error(e, source, prompt=True)
                     return False
@@ -130,7 +199,7 @@ class Relathon:
                             del e
 
                     else:
-                        if result and issubclass(type(ast), Expression):
+                        if result is not None and issubclass(type(ast), Expression):
                             print(result)
                         return False
 
@@ -147,20 +216,16 @@ class Relathon:
             sys.ps1, sys.ps2 = ps1, ps2
 
     @classmethod
-    def run_in_main(cls, fd=None, interact=False, imprt=False, intrpr=None):
+    def run_in_main(cls, fd=None, interact=False, intrpr=None, stream=False):
         """Read source from input and run source."""
         if fd is None:
             fd = sys.stdin
         else:
             try:
-                suffix = '.rel' if imprt else ''
-                fd = open('{}{}'.format(fd, suffix))
+                fd = open(fd)
             except FileNotFoundError as e:
-                if imprt:
-                    raise FileNotFoundError
-                else:
-                    print(("Relathon can't open file '{fname}': {reason}").format(fname=fd,
-                      reason=str(e)))
+                print(("Relathon can't open file '{fname}': {reason}").format(fname=fd,
+                  reason=str(e)))
                 exit_code = 1
                 return exit_code
 
@@ -170,41 +235,111 @@ class Relathon:
         else:
             try:
                 exit_code = 0
-                intrpr = cls.run(fd=fd, intrpr=intrpr)
+                intrpr = cls.run(fd=fd, intrpr=intrpr, stream=stream)
             except RelathonException as e:
                 fd.seek(0)
                 cls.print_error(e, fd.read())
 
             fd.close()
-            if imprt and exit_code == 0:
-                return intrpr
             return exit_code
 
     @classmethod
     def print_error(self, error, source, prompt=False):
-        """Print the error message to stderr."""
+        """Print the error message to stderr. An error raised in an
+        imported module is shown with the source of that module."""
+        source = getattr(error, 'source', source)
         print(error.get_message(source, prompt), file=sys.stderr)
 
 
+class PromptParser:
+    """Parser of interactive input that is entered a line at a time.
+
+    The lexer keeps its state between the lines of a statement, so that
+    each line is tokenized once, when it is pushed. The statement is
+    parsed once its tokens are complete, that is when they leave no
+    bracket or block open. A syntax error is thus reported at the end of
+    the statement, a lexical error at the line it is in.
+
+    Attributes:
+        lexer (Lexer) - lexer of the lines pushed so far
+    """
+
+    def __init__(self, filename):
+        self.lexer = Lexer(Source(filename, ''), prompt=True)
+
+    def push(self, line):
+        """Parse a line of input, which ends with a newline.
+
+        Returns:
+            None if the statement needs more input, otherwise the
+            abstract syntax tree of the statement.
+
+        Raises:
+            LexerException - Lexigraphical Errors
+            ParserException - Grammatical Errors
+        """
+        self.lexer.feed(line)
+        if self.lexer.more:
+            return None
+        return Parser(self.lexer).parse(Parser.single_input)
+
+
 def main(fd=None):
-    if len(sys.argv) > 1:
-        fd = sys.argv[1]
-    return Relathon.run_in_main(fd)
+    parser = argparse.ArgumentParser(prog='relathon',
+                                     description="Run a relathon script, or an interactive console without one.")
+    parser.add_argument('script', nargs='?', help="the .rel script to run")
+    parser.add_argument('--stream', action='store_true',
+                        help="run each statement as soon as it is parsed, without keeping the tree")
+    parser.add_argument('--no-check', action='store_true',
+                        help="run the script without checking the dimensions of its relations and its names first")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="neither read nor write cached syntax trees")
+    parser.add_argument('--cache-dir', metavar='DIR',
+                        help="keep cached syntax trees below DIR instead of next to each module")
+    parser.add_argument('--prune-cache', action='store_true',
+                        help="remove stale cached syntax trees below the directory of the script")
+    args = parser.parse_args()
+    if args.script is not None:
+        fd = args.script
+    if args.no_check:
+        Relathon.checking = False
+    if args.no_cache:
+        Relathon.cache = None
+    elif args.cache_dir is not None:
+        Relathon.cache = ASTCache(VERSION, prefix=args.cache_dir)
+    if args.prune_cache:
+        cache = Relathon.cache or ASTCache(VERSION, prefix=args.cache_dir)
+        removed = cache.prune(os.path.dirname(os.path.abspath(fd)) if fd else os.getcwd())
+        print("Removed {} cache file{}".format(removed, "" if removed == 1 else "s"), file=sys.stderr)
+        if fd is None:
+            return 0
+    return Relathon.run_in_main(fd, stream=args.stream)
 
 
-def import_module(intrpr, symbol_table, module):
-    """Load and run a module and import the symbols into the current
-    environment.
+def import_module(intrpr, module):
+    """Return the environment of a module. The module is loaded and run
+    only the first time it is imported by the interpreter; later imports
+    of the same file return the environment registered then.
 
     NOTE: This function gets called only from within the interpreter.
+
+    Raises:
+        FileNotFoundError - if there is no such module
     """
-    intrpr = Relathon.run_in_main(module, imprt=True, intrpr=intrpr)
-    if type(intrpr) == int:
-        sys.exit(intrpr)
-    else:
-        symbols = intrpr.current_env
-        for sym, val in symbols.values.items():
-            symbol_table.define(sym, val)
+    path = os.path.realpath('{}.rel'.format(module))
+    namespace = intrpr.modules.get(path)
+    if namespace is None:
+        with open(path) as fd:
+            try:
+                ast = Relathon.load(fd)
+                Relathon.check(ast, intrpr, module)
+                namespace = intrpr.run_module(module, path, ast)
+            except RelathonException as e:
+                if not hasattr(e, 'source'):
+                    fd.seek(0)
+                    e.source = fd.read()
+                raise
+    return namespace
 
 
 if __name__ == '__main__':
@@ -0,0 +1,163 @@
+# Copyright Peter Roger. All rights reserved.
+#
+# This file is part of relathon. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE file.
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+from cache import ASTCache
+from relathon import Relathon, Source
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = ASTCache('test')
+        self.filename = self.write('module.rel', "def f(a) = a^\nR = f(I(2, 2))\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, text):
+        filename = os.path.join(self.directory, name)
+        with open(filename, 'w') as f:
+            f.write(text)
+        return filename
+
+    def store(self, cache=None):
+        cache = cache or self.cache
+        tree = Relathon.parse(Source(self.filename))
+        self.assertTrue(cache.store(self.filename, tree, os.stat(self.filename)))
+        return tree
+
+    def testLoad(self):
+        tree = self.store()
+        cached = self.cache.load(self.filename)
+        self.assertEqual(tree, cached)
+        location = tree.statements[1].location
+        self.assertEqual(location, cached.statements[1].location)
+        self.assertEqual((location.lineBegin, location.columnBegin, location.lineEnd),
+                         (cached.statements[1].location.lineBegin,
+                          cached.statements[1].location.columnBegin,
+                          cached.statements[1].location.lineEnd))
+
+    def testPath(self):
+        self.assertEqual(os.path.join(self.directory, '__relcache__', 'module.relc'),
+                         self.cache.path(self.filename))
+        self.assertIsNone(self.cache.path(os.path.join(self.directory, 'module.txt')))
+        self.assertEqual(self.filename, self.cache.source(self.cache.path(self.filename)))
+
+    def testPrefix(self):
+        cache = ASTCache('test', prefix=os.path.join(self.directory, 'cache'))
+        path = cache.path(self.filename)
+        self.assertTrue(path.startswith(os.path.join(self.directory, 'cache')))
+        self.assertEqual(self.filename, cache.source(path))
+        tree = self.store(cache)
+        self.assertEqual(tree, cache.load(self.filename))
+        self.assertIsNone(self.cache.load(self.filename))
+
+    def testMissing(self):
+        self.assertIsNone(self.cache.load(self.filename))
+
+    def testEditedSource(self):
+        self.store()
+        self.write('module.rel', "def f(a) = a\nR = f(I(2, 2))\n")
+        self.assertIsNone(self.cache.load(self.filename))
+
+    def testTouchedSource(self):
+        tree = self.store()
+        status = os.stat(self.filename)
+        os.utime(self.filename, ns=(status.st_atime_ns, status.st_mtime_ns + 10**9))
+        self.assertEqual(tree, self.cache.load(self.filename))
+
+    def testTouchedSourceRestamped(self):
+        tree = self.store()
+        status = os.stat(self.filename)
+        os.utime(self.filename, ns=(status.st_atime_ns, status.st_mtime_ns + 10**9))
+        self.cache.load(self.filename)
+        with mock.patch.object(ASTCache, 'digest', side_effect=AssertionError("source hashed again")):
+            self.assertEqual(tree, self.cache.load(self.filename))
+
+    def testOtherVersion(self):
+        self.store()
+        self.assertIsNone(ASTCache('other').load(self.filename))
+
+    def testOtherTreeFormat(self):
+        self.store()
+        with mock.patch('cache.tree_format', return_value=b'other'):
+            self.assertIsNone(self.cache.load(self.filename))
+
+    def testDamaged(self):
+        self.store()
+        path = self.cache.path(self.filename)
+        with open(path, 'r+b') as f:
+            f.truncate(os.path.getsize(path) // 2)
+        self.assertIsNone(self.cache.load(self.filename))
+
+    def testShared(self):
+        tree = self.store()
+        path = self.cache.path(self.filename)
+        os.chmod(path, 0o664)
+        self.assertIsNone(self.cache.load(self.filename))
+        self.assertEqual(0, self.cache.prune(self.directory))
+        os.chmod(path, 0o644)
+        os.chmod(os.path.dirname(path), 0o777)
+        self.assertIsNone(self.cache.load(self.filename))
+        os.chmod(os.path.dirname(path), 0o755)
+        with mock.patch('os.getuid', return_value=os.getuid() + 1):
+            self.assertIsNone(self.cache.load(self.filename))
+        self.assertEqual(tree, self.cache.load(self.filename))
+
+    def testSharedPrefix(self):
+        prefix = os.path.join(self.directory, 'cache')
+        cache = ASTCache('test', prefix=prefix)
+        tree = self.store(cache)
+        self.assertEqual(tree, cache.load(self.filename))
+        os.chmod(prefix, 0o777)
+        self.assertIsNone(cache.load(self.filename))
+
+    def testSourceChangedWhileParsing(self):
+        tree = Relathon.parse(Source(self.filename))
+        status = os.stat(self.filename)
+        self.write('module.rel', "R = I(3, 3)\n")
+        self.assertFalse(self.cache.store(self.filename, tree, status))
+        self.assertFalse(os.path.exists(self.cache.path(self.filename)))
+
+    def testPrune(self):
+        self.store()
+        other = self.write('other.rel', "S = I(1, 1)\n")
+        tree = Relathon.parse(Source(other))
+        self.cache.store(other, tree, os.stat(other))
+        self.assertEqual(0, self.cache.prune(self.directory))
+        os.remove(other)
+        interrupted = os.path.join(self.directory, '__relcache__', 'x.tmp')
+        open(interrupted, 'w').close()
+        old = time.time() - ASTCache.TEMPORARY_AGE - 1
+        os.utime(interrupted, (old, old))
+        writing = os.path.join(self.directory, '__relcache__', 'y.tmp')
+        open(writing, 'w').close()
+        self.assertEqual(2, self.cache.prune(self.directory))
+        self.assertEqual(['module.relc', 'y.tmp'],
+                         sorted(os.listdir(os.path.join(self.directory, '__relcache__'))))
+        os.remove(writing)
+        self.assertEqual(1, ASTCache('other').prune(self.directory))
+        self.assertFalse(os.path.exists(os.path.join(self.directory, '__relcache__')))
+
+    def testRun(self):
+        cache, Relathon.cache = Relathon.cache, self.cache
+        try:
+            with open(self.filename) as fd:
+                Relathon.run(fd)
+            self.assertTrue(os.path.exists(self.cache.path(self.filename)))
+            with open(self.filename) as fd:
+                intrpr = Relathon.run(fd)
+            self.assertIn('R', intrpr.current_env.values)
+        finally:
+            Relathon.cache = cache
+
+if __name__ == '__main__':
+    unittest.main()
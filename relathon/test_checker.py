@@ -0,0 +1,109 @@
+# Copyright Peter Roger. All rights reserved.
+#
+# This file is part of relathon. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE file.
+
+import io
+import unittest
+from contextlib import redirect_stdout
+from checker import Checker, Shape
+from interpreter import Interpreter
+from lexer import Lexer
+from parser import Parser
+from relathon import Relathon, Source
+from errors import *
+
+class TestChecker(unittest.TestCase):
+
+    def check(self, text):
+        tree = Parser(Lexer(Source('<test>', text))).parse(Parser.module)
+        self.checker = Checker(Interpreter().builtins().values)
+        return self.checker.check(tree)
+
+    def checkShapes(self, expected, text):
+        self.assertEqual([], self.check(text))
+        for name, shape in expected.items():
+            self.assertEqual(shape, self.checker.values[name])
+
+    def checkError(self, exception, line, text):
+        errors = self.check(text)
+        self.assertEqual([exception], [type(error) for error in errors])
+        self.assertEqual(line, errors[0].location.lineBegin)
+
+    def testConstructors(self):
+        self.checkShapes({'a': Shape(2, 3), 'b': Shape(2, 3), 'c': Shape(4, 4), 'd': Shape(4, None)},
+            "n = 4\na = new(2, 3, [(0,1)])\nb = I(a)\nc = random(n, n, .5)\ndef f(k) = k\nd = vec(n, f(n))")
+
+    def testOperations(self):
+        self.checkShapes({'a': Shape(3, 3), 'b': Shape(2, 3), 'c': Shape(1, 1), 'd': Shape(1, 2)},
+            "r = L(2, 3)\na = r^ * r\nb = ~r | r & r\nc = r == r\nd = r[1:, :2]")
+
+    def testBuiltins(self):
+        self.checkShapes({'a': Shape(2, 5), 'b': Shape(4, 9), 'c': Shape(6, 2), 'd': Shape(3, 2)},
+            "r = L(2, 3)\na = hcat(r, I(2, 2))\nb = kron(r, r)\nc = pi(2, 3)\nd = ran(r)")
+
+    def testAugmentedAssignment(self):
+        self.checkShapes({'r': Shape(2, 4)}, "r = L(2, 3)\nr *= L(3, 4)")
+
+    def testCompositionMismatch(self):
+        self.checkError(RelationException, 2, "r = L(2, 3)\ns = r * r")
+
+    def testJoinMismatch(self):
+        self.checkError(RelationException, 1, "r = O(2, 2) | L(2, 2) | L(3, 3)")
+
+    def testNotHomogeneous(self):
+        self.checkError(RelationException, 1, "r = closure(L(2, 3)) | I(2, 2)")
+
+    def testCondition(self):
+        self.checkError(TypeException, 1, "if I(2, 2):\n    pass")
+
+    def testUndefinedName(self):
+        self.checkError(NameException, 1, "print(r)\nr = I(2, 2)")
+
+    def testFunctionUsesLaterName(self):
+        self.assertEqual([], self.check("def f(a) = g(a) * r\ndef g(a) = a\nr = I(2, 2)"))
+        self.checkError(NameException, 1, "def f(a) = a * s\nr = I(2, 2)")
+
+    def testBranches(self):
+        self.checkShapes({'r': Shape(2, None)},
+            "if True:\n    r = L(2, 2)\nelif False:\n    r = L(2, 3)\ns = I(2, 2) * r")
+
+    def testDeadBranches(self):
+        self.assertEqual([], self.check(
+            "if False:\n    print(q)\n    r = L(2, 3) * L(2, 3)\n"
+            "elif True:\n    r = I(2, 2)\nelse:\n    r = I(2, 3) * I(2, 2)\n"
+            "while False:\n    r = L(1, 2) & L(2, 1)\n"
+            "s = I(3, 3) * L(2, 3) if False else I(2, 2)"))
+        self.checkError(RelationException, 4, "if False:\n    r = I(1, 1)\nelif True | False:\n    r = L(2, 3) * L(2, 3)")
+
+    def testLoop(self):
+        self.checkShapes({'r': Shape(2, None)},
+            "r = L(2, 2)\nwhile True:\n    s = r * I(2, 2)\n    r = hcat(r, r)")
+        self.checkError(RelationException, 3,
+            "r = L(2, 2)\nwhile True:\n    s = I(3, 3) * r\n    r = hcat(r, r)")
+
+    def testLoopBreak(self):
+        self.checkShapes({'r': Shape(None, None)},
+            "r = I(2, 2)\nwhile True:\n    r = I(3, 3)\n    if True:\n        break\n    r = I(2, 2)")
+
+    def testShadowedBuiltin(self):
+        self.assertEqual([], self.check("def new(a, b) = a\nr = new(I(2, 3), 0) * I(2, 2)"))
+
+    def testImport(self):
+        self.assertEqual([], self.check("import m\nr = q * new(2, 3) * new(2, 3)"))
+        self.checkError(NameException, 1, "print(q)\nimport m")
+
+    def testRunChecksFirst(self):
+        output = io.StringIO()
+        fd = io.StringIO("print(I(1, 1))\nr = L(2, 3) * L(2, 3)\n")
+        fd.name = '<test>'
+        cache, Relathon.cache = Relathon.cache, None
+        try:
+            with redirect_stdout(output), self.assertRaises(RelationException):
+                Relathon.run(fd)
+        finally:
+            Relathon.cache = cache
+        self.assertEqual("", output.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
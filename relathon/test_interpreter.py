@@ -10,7 +10,7 @@ from parser import *
 from interpreter import Interpreter
 from tok import *
 from functions import *
-from relathon import Source
+from relathon import Relathon, Source
 from pyrel import PyrelContext, Relation
 from errors import *
 
@@ -20,8 +20,11 @@ class TestInterpreterBase(unittest.TestCase):
     def setUp(self):
         self.context = PyrelContext()
         self.intrpr = Interpreter(self.context)
+        # imported test modules must not leave cache files behind
+        self.cache, Relathon.cache = Relathon.cache, None
 
     def tearDown(self):
+        Relathon.cache = self.cache
         del self.context
 
     def interpretFromSource(self, text):
@@ -31,6 +34,11 @@ class TestInterpreterBase(unittest.TestCase):
         ast = parser.parse(Parser.module)
         self.intrpr.visit(ast)
 
+    def interpretStatements(self, text):
+        source = Source("<test>", text)
+        parser = Parser(Lexer(source))
+        self.intrpr.execute(parser.statements())
+
     def checkInterpret(self, name, expected, text):
         self.interpretFromSource(text)
         env = self.intrpr.current_env
@@ -352,6 +360,78 @@ class TestInterpreter(TestInterpreterBase):
         rel = self.makeRelation(**kwargs)
         self.checkInterpret(name, rel, "r = new(3,3,[(0,1)])\nr *= new(3,3,[(1,2)])")
 
+    def testPower(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 4
+        kwargs['cols'] = 4
+        kwargs['bits'] = [(0,3)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = new(4,4,[(0,1),(1,2),(2,3)]) ** 3")
+
+    def testPowerZero(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 2
+        kwargs['cols'] = 2
+        kwargs['bits'] = [(0,0),(1,1)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = new(2,2,[(0,1)]) ** 0")
+
+    def testPowFunction(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 3
+        kwargs['cols'] = 3
+        kwargs['bits'] = [(0,0),(1,1),(2,2)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = pow(new(3,3,[(0,1),(1,2),(2,0)]), 6)")
+
+    def testJoinChain(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 3
+        kwargs['cols'] = 3
+        kwargs['bits'] = [(0,1),(1,2),(2,0)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = new(3,3,[(0,1)]) | new(3,3,[(1,2)]) | new(3,3,[(2,0)])")
+
+    def testMeetChain(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 2
+        kwargs['cols'] = 2
+        kwargs['bits'] = [(0,1)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = L(2,2) & new(2,2,[(0,1),(1,0)]) & new(2,2,[(0,0),(0,1)])")
+
+    def testMeetChainEmpty(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 2
+        kwargs['cols'] = 2
+        kwargs['bits'] = []
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = O(2,2) & L(2,2) & I(2,2)")
+
+    def testJoinAll(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 2
+        kwargs['cols'] = 3
+        kwargs['bits'] = [(0,0),(0,2),(1,1)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = joinall(new(2,3,[(0,0)]), new(2,3,[(1,1)]), new(2,3,[(0,2)]))")
+
+    def testMeetAll(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 2
+        kwargs['cols'] = 2
+        kwargs['bits'] = [(1,1)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = meetall(L(2,2), I(2,2), new(2,2,[(1,1),(1,0)]))")
+
     # control flow
     def testIfStmt(self):
         name = 'r'
@@ -398,6 +478,17 @@ class TestInterpreter(TestInterpreterBase):
         rel = self.makeRelation(**kwargs)
         self.checkInterpret(name, rel, "def ftc(R):\n\tP = I(R)\n\tQ = O(R)\n\tS = P\n\twhile Q != S:\n\t\tP = P * R\n\t\tQ = S\n\t\tS = S | P\n\treturn S\nr=ftc(new(3,3,[(0,1)]))")
 
+    def testStatementsStream(self):
+        self.interpretStatements("def f(a) = a^\nr = f(I(2,2))\ns = f(r)\n")
+        env = self.intrpr.current_env
+        self.assertEqual(self.makeRelation(rows=2, cols=2, bits=[(0,0),(1,1)]), env.resolve('s'))
+
+    def testStatementsRunBeforeSyntaxError(self):
+        with self.assertRaises(ParserException):
+            self.interpretStatements("r = I(2,2)\ns = (r\n")
+        self.assertEqual(self.makeRelation(rows=2, cols=2, bits=[(0,0),(1,1)]),
+                         self.intrpr.current_env.resolve('r'))
+
     # import
     def testImport(self):
         import tempfile
@@ -417,6 +508,68 @@ class TestInterpreter(TestInterpreterBase):
             self.checkInterpret(name, rel, "import {}".format(module))
             f.close()
 
+    def interpretWithModules(self, modules, text):
+        import os
+        import tempfile
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as directory:
+            for module, source in modules.items():
+                with open(os.path.join(directory, module + '.rel'), 'w') as f:
+                    f.write(source)
+            os.chdir(directory)
+            try:
+                self.interpretFromSource(text)
+            finally:
+                os.chdir(cwd)
+
+    def testImportRunsOnce(self):
+        runs = []
+        run_module = self.intrpr.run_module
+        self.intrpr.run_module = lambda *args: runs.append(args[0]) or run_module(*args)
+        self.interpretWithModules({'a': "import b\nr = I(2,2)", 'b': "import a\ns = O(2,2)"},
+            "import a\ndef f():\n\timport a\n\treturn r\nr = f()\nimport b")
+        self.assertEqual(['a', 'b'], runs)
+        self.assertEqual(2, len(self.intrpr.modules))
+        self.assertEqual(self.makeRelation(rows=2, cols=2, bits=[(0,0),(1,1)]),
+                         self.intrpr.current_env.resolve('r'))
+        self.assertEqual(self.makeRelation(rows=2, cols=2, bits=[]),
+                         self.intrpr.current_env.resolve('s'))
+
+    def testFromImport(self):
+        self.interpretWithModules({'m': "def g(a) = a^\ndef f(a) = g(a)\nx = L(2,2)"},
+            "from m import f\nr = f(new(2,2,[(0,1)]))")
+        env = self.intrpr.current_env
+        self.assertEqual(self.makeRelation(rows=2, cols=2, bits=[(1,0)]), env.resolve('r'))
+        self.assertFalse(env.resolve('g'))
+        self.assertFalse(env.resolve('x'))
+
+    def testModuleSeesImporterNames(self):
+        self.interpretWithModules({'m': "def f() = base * step\nr = base"},
+            "base = new(2,2,[(0,1)])\nstep = new(2,2,[(1,0)])\nimport m\ns = f()")
+        env = self.intrpr.current_env
+        self.assertEqual(self.makeRelation(rows=2, cols=2, bits=[(0,1)]), env.resolve('r'))
+        self.assertEqual(self.makeRelation(rows=2, cols=2, bits=[(0,0)]), env.resolve('s'))
+
+    def testFunctionSeesCallerNames(self):
+        self.interpretFromSource("def g() = x\ndef f(x) = g()\nr = f(I(2,2))")
+        self.assertEqual(self.makeRelation(rows=2, cols=2, bits=[(0,0),(1,1)]),
+                         self.intrpr.current_env.resolve('r'))
+
+    def testImportDoesNotCopy(self):
+        self.interpretWithModules({'m': "x = L(2,2)\ny = I(2,2)"}, "import m\nfrom m import y\nr = x")
+        self.assertNotIn('x', self.intrpr.builtins().values)
+        self.assertNotIn('y', self.intrpr.builtins().values)
+        self.assertIs(self.intrpr.modules[next(iter(self.intrpr.modules))].values,
+                      self.intrpr.imports.namespaces[0][1])
+
+    def testFromImportMissingName(self):
+        with self.assertRaises(ImportException):
+            self.interpretWithModules({'m': "x = L(2,2)"}, "from m import x, y")
+
+    def testImportMissingModule(self):
+        with self.assertRaises(ModuleNotFoundException):
+            self.interpretWithModules({}, "from m import x")
+
     # Inbuilt functions
     def testNewFunctionFromRel(self):
         name = 'r'
@@ -456,6 +609,11 @@ class TestInterpreter(TestInterpreterBase):
         rel = self.makeRelation(**kwargs)
         self.checkInterpret(name, rel, "r = new(3,3)\nset(r,[(0,2)])")
 
+    def testRelationRangePairs(self):
+        name = 'r'
+        rel = self.makeRelation(rows=4, cols=4, bits=[(0,3),(1,3),(2,3),(1,0),(2,0),(1,1),(2,1)])
+        self.checkInterpret(name, rel, "r = new(4,4,[(0..2, 3), (1..2, 0..1)])")
+
     def testRelationUnset(self):
         name = 'r'
         kwargs = {}
@@ -546,6 +704,426 @@ class TestInterpreter(TestInterpreterBase):
         rel = self.makeRelation(**kwargs)
         self.checkInterpret(name, rel, "s=new(3,3)\nr = vec(s,2)")
 
+    def testClosure(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 4
+        kwargs['cols'] = 4
+        kwargs['bits'] = [(0,1),(0,2),(0,3),(1,2),(1,3),(2,3)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = closure(new(4,4,[(0,1),(1,2),(2,3)]))")
+
+    def testClosureCycle(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 2
+        kwargs['cols'] = 2
+        kwargs['bits'] = [(0,0),(0,1),(1,0),(1,1)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = closure(new(2,2,[(0,1),(1,0)]))")
+
+    def testReflexiveTransitiveClosure(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 3
+        kwargs['cols'] = 3
+        kwargs['bits'] = [(0,0),(0,1),(1,1),(2,2)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = rtc(new(3,3,[(0,1)]))")
+
+    def testFix(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 3
+        kwargs['cols'] = 3
+        kwargs['bits'] = [(0,0),(0,1),(1,1),(2,2)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "R = new(3,3,[(0,1)])\ndef step(S) = S | S * R\nr = fix(step, I(3,3))")
+
+    def testFixShrinks(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 3
+        kwargs['cols'] = 3
+        kwargs['bits'] = [(0,1),(1,2)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "R = new(3,3,[(0,1),(1,2)])\ndef shrink(S) = S & R\nr = fix(shrink, L(3,3))")
+
+    def testResultsAreFresh(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 2
+        kwargs['cols'] = 2
+        kwargs['bits'] = [(0,0)]
+        rel = self.makeRelation(**kwargs)
+        for call in ("closure(R)", "R ** 1", "joinall(R)", "meetall(R)", "fix(f, R)"):
+            self.checkInterpret(name, rel, "R = new(2,2,[(0,0)])\ndef f(S) = S\ndef g(S):\n    set(S, [(1,1)])\ng({})\nr = R".format(call))
+
+    def testFixOfStep(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 3
+        kwargs['cols'] = 3
+        kwargs['bits'] = []
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "R = new(3,3,[(0,1),(1,2)])\ndef step(S) = S * R\nr = fix(step, I(3,3))")
+
+    def testReach(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 4
+        kwargs['cols'] = 2
+        kwargs['bits'] = [(1,0),(1,1),(2,0),(2,1)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "G = new(4,4,[(0,3),(1,2),(2,1)])\nr = reach(G, vec(4,2,1))")
+
+    def testReachMultiSource(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 3
+        kwargs['cols'] = 2
+        kwargs['bits'] = [(0,0),(1,0),(2,0),(1,1),(2,1)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "G = new(3,3,[(0,1),(1,2)])\nr = reach(G, new(3,2,[(0,0),(1,1)]))")
+
+    def testReachWithin(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 4
+        kwargs['cols'] = 1
+        kwargs['bits'] = [(0,0),(1,0)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "G = new(4,4,[(0,1),(1,2),(2,3)])\nr = reach_within(G, vec(4,1,0), 1)")
+
+    def testSCC(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 4
+        kwargs['cols'] = 4
+        kwargs['bits'] = [(0,0),(1,1),(1,2),(2,1),(2,2),(3,3)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = scc(new(4,4,[(0,1),(1,2),(2,1),(2,3)]))")
+
+    def testCondense(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 3
+        kwargs['cols'] = 3
+        kwargs['bits'] = [(0,1),(1,2)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = condense(new(4,4,[(0,1),(1,2),(2,1),(2,3)]))")
+
+    def testReduce(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 3
+        kwargs['cols'] = 3
+        kwargs['bits'] = [(0,1),(1,2)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = reduce(rtc(new(3,3,[(0,1),(1,2)])))")
+
+    def testReduceCycle(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 4
+        kwargs['cols'] = 4
+        kwargs['bits'] = [(0,1),(1,2),(2,0),(0,3)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = reduce(closure(new(4,4,[(0,1),(1,2),(2,0),(2,3)])))")
+
+    def testLeftResidual(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 2
+        kwargs['cols'] = 2
+        kwargs['bits'] = [(0,0),(1,0),(1,1)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = lres(new(2,2,[(0,0)]), new(2,2,[(0,0),(1,0)]))")
+
+    def testRightResidual(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 2
+        kwargs['cols'] = 2
+        kwargs['bits'] = [(0,0),(0,1),(1,1)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = rres(new(2,2,[(0,0),(0,1)]), new(2,2,[(0,0)]))")
+
+    def testSymmetricQuotient(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 2
+        kwargs['cols'] = 3
+        kwargs['bits'] = [(0,1),(1,0),(1,2)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = syq(new(2,2,[(0,0)]), new(2,3,[(0,1)]))")
+
+    def testDomain(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 3
+        kwargs['cols'] = 2
+        kwargs['bits'] = [(0,0),(0,1),(2,0),(2,1)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = dom(new(3,2,[(0,1),(2,0)]))")
+
+    def testRange(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 2
+        kwargs['cols'] = 3
+        kwargs['bits'] = [(1,0),(1,1),(1,2)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = ran(new(3,2,[(0,1),(2,1)]))")
+
+    def testRow(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 3
+        kwargs['cols'] = 2
+        kwargs['bits'] = [(0,0),(0,1),(2,0),(2,1)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = row(new(2,3,[(1,0),(1,2),(0,1)]), 1)")
+
+    def testColumn(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 2
+        kwargs['cols'] = 3
+        kwargs['bits'] = [(1,0),(1,1),(1,2)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = col(new(2,3,[(1,0),(1,2),(0,1)]), 2)")
+
+    def testBisim(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 4
+        kwargs['cols'] = 4
+        kwargs['bits'] = [(0,0),(1,1),(1,2),(2,1),(2,2),(3,3)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = bisim(new(4,4,[(0,3),(1,2),(2,2)]), L(4,4))")
+
+    def testBisimPartition(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 3
+        kwargs['cols'] = 3
+        kwargs['bits'] = [(0,0),(1,1),(2,2)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = bisim(new(3,3,[(0,2),(1,1)]), new(3,3,[(0,0),(0,1),(1,0),(1,1),(2,2)]))")
+
+    def testPi(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 6
+        kwargs['cols'] = 2
+        kwargs['bits'] = [(0,0),(1,0),(2,0),(3,1),(4,1),(5,1)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = pi(2,3)")
+
+    def testRho(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 6
+        kwargs['cols'] = 3
+        kwargs['bits'] = [(0,0),(1,1),(2,2),(3,0),(4,1),(5,2)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = rho(2,3)")
+
+    def testTuple(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 1
+        kwargs['cols'] = 1
+        kwargs['bits'] = [(0,0)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "R = new(3,2,[(0,1),(2,0),(2,1)])\nS = new(3,3,[(0,2),(1,1),(2,0)])\nr = tuple(R, S) == R * pi(2,3)^ & S * rho(2,3)^")
+
+    def testKron(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 4
+        kwargs['cols'] = 4
+        kwargs['bits'] = [(0,3),(1,2)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = kron(new(2,2,[(0,1)]), new(2,2,[(0,1),(1,0)]))")
+
+    def testSlice(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 2
+        kwargs['cols'] = 2
+        kwargs['bits'] = [(0,1),(1,0)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "R = new(4,4,[(1,3),(2,2),(0,0),(3,3)])\nr = R[1:3, 2:4]")
+
+    def testSliceOpenBounds(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 3
+        kwargs['cols'] = 1
+        kwargs['bits'] = [(0,0),(2,0)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "R = new(3,3,[(0,2),(1,1),(2,2)])\nn = 2\nr = R[:, n:]")
+
+    def testHcat(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 2
+        kwargs['cols'] = 5
+        kwargs['bits'] = [(0,1),(1,2),(1,4)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = hcat(new(2,2,[(0,1)]), new(2,3,[(1,0),(1,2)]))")
+
+    def testVcat(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 3
+        kwargs['cols'] = 2
+        kwargs['bits'] = [(0,1),(2,0)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = vcat(new(1,2,[(0,1)]), new(2,2,[(1,0)]))")
+
+    def testVcatSliceRoundTrip(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 1
+        kwargs['cols'] = 1
+        kwargs['bits'] = [(0,0)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "R = new(4,3,[(0,1),(2,2),(3,0)])\nr = vcat(R[:2, :], R[2:, :]) == R")
+
+    def testReorder(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 3
+        kwargs['cols'] = 3
+        kwargs['bits'] = [(2,0),(0,1),(1,2)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = reorder(new(3,3,[(0,2)]))")
+
+    def testPermute(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 4
+        kwargs['cols'] = 4
+        kwargs['bits'] = [(0,1),(1,2),(2,3)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "R = new(4,4,[(2,0),(0,3),(3,1)])\nr = permute(R, new(4,4,[(2,0),(0,1),(3,2),(1,3)]))")
+
+    def testReorderKeepsPairs(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 1
+        kwargs['cols'] = 1
+        kwargs['bits'] = [(0,0)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "R = new(5,5,[(0,3),(3,1),(1,4),(4,2)])\nP = reorder(R)\nr = permute(permute(R, P), P^) == R")
+
+    def testCard(self):
+        self.interpretFromSource("n = card(new(3,4,[(0,1),(2,3),(2,0)]))")
+        self.assertEqual(3, self.intrpr.current_env.resolve('n'))
+
+    def testDegree(self):
+        self.interpretFromSource("R = new(3,3,[(0,1),(0,2),(1,2)])\na = outdeg(R, 0)\nb = indeg(R, 2)\nc = outdeg(R)\nd = indeg(R, 0)")
+        env = self.intrpr.current_env
+        self.assertEqual([2, 2, 2, 0], [env.resolve(name) for name in 'abcd'])
+
+    def testDensity(self):
+        self.interpretFromSource("d = density(new(2,4,[(0,1),(1,3)]))")
+        self.assertEqual(0.25, self.intrpr.current_env.resolve('d'))
+
+    def testCardComparison(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 1
+        kwargs['cols'] = 1
+        kwargs['bits'] = [(0,0)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = card(I(3,3)) == 3 and card(L(2,2)) > 3 and density(O(2,2)) < 0.5")
+
+    def testWeightedShortestPath(self):
+        self.interpretFromSource("W = weighted(new(3,3,[(0,1),(1,2)]), minplus, 2) | weighted(new(3,3,[(0,2)]), minplus, 5)\nd = weight(closure(W), 0, 2)")
+        self.assertEqual(4, self.intrpr.current_env.resolve('d'))
+
+    def testWeightedCountPaths(self):
+        self.interpretFromSource("W = weighted(new(4,4,[(0,1),(0,2),(1,3),(2,3)]), counting)\nn = weight(closure(W), 0, 3)\nm = weight(W ** 2, 0, 3)")
+        env = self.intrpr.current_env
+        self.assertEqual([2, 2], [env.resolve('n'), env.resolve('m')])
+
+    def testWeightedBottleneck(self):
+        self.interpretFromSource("W = weighted(new(3,3,[(0,1)]), maxmin, 3) | weighted(new(3,3,[(1,2)]), maxmin, 7) | weighted(new(3,3,[(0,2)]), maxmin, 2)\nb = weight(closure(W), 0, 2)")
+        self.assertEqual(3, self.intrpr.current_env.resolve('b'))
+
+    def testWeightedSupport(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 3
+        kwargs['cols'] = 3
+        kwargs['bits'] = [(0,1),(0,2),(1,2)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = support(closure(weighted(new(3,3,[(0,1),(1,2)]), minplus, 1.5)))")
+
+    def testWeightedEquality(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 1
+        kwargs['cols'] = 1
+        kwargs['bits'] = [(0,0)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "W = weighted(new(2,3,[(0,1)]), counting, 3)\nr = W^^ == W and W * W^ != W^ * W")
+
+    def testIsTransitive(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 1
+        kwargs['cols'] = 1
+        kwargs['bits'] = [(0,0)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = is_transitive(new(3,3,[(0,1),(1,2),(0,2)]))")
+
+    def testIsNotTransitive(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 1
+        kwargs['cols'] = 1
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = is_transitive(new(3,3,[(0,1),(1,2)]))")
+
+    def testIsSymmetric(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 1
+        kwargs['cols'] = 1
+        kwargs['bits'] = [(0,0)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = is_symmetric(new(3,3,[(0,1),(1,0),(2,2)]))")
+
+    def testIsAcyclic(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 1
+        kwargs['cols'] = 1
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = is_acyclic(new(3,3,[(0,1),(1,2),(2,0)]))")
+
+    def testIsFunction(self):
+        name = 'r'
+        kwargs = {}
+        kwargs['rows'] = 1
+        kwargs['cols'] = 1
+        kwargs['bits'] = [(0,0)]
+        rel = self.makeRelation(**kwargs)
+        self.checkInterpret(name, rel, "r = is_function(new(3,2,[(0,1),(2,1)])) and is_total(L(3,2))")
+
+    def testWitness(self):
+        self.interpretFromSource("w = witness(new(3,3,[(0,1),(1,2)]), is_transitive)")
+        self.assertEqual([(0,2)], list(self.intrpr.current_env.resolve('w').pairs))
+
+    def testWitnessNone(self):
+        self.interpretFromSource("w = witness(I(3,3), is_injective)")
+        self.assertEqual([], list(self.intrpr.current_env.resolve('w').pairs))
+
 
     # Custom Functions
     def testBasicFunction(self):
@@ -708,6 +1286,81 @@ class TestInterpreter(TestInterpreterBase):
     def testModuleNotFound(self):
         self.checkInterpreterError(ModuleNotFoundException,"import x")
 
+    def testClosureNotRelation(self):
+        self.checkInterpreterError(TypeException,"closure(5)")
+
+    def testFixNotFunction(self):
+        self.checkInterpreterError(TypeException,"fix(I(2,2), I(2,2))")
+
+    def testReachWithinNotInt(self):
+        self.checkInterpreterError(TypeException,"reach_within(I(2,2), vec(2,2,0), I(2,2))")
+
+    def testSCCNotHomogeneous(self):
+        self.checkInterpreterError(RelationException,"scc(L(2,3))")
+
+    def testResidualDimensionMismatch(self):
+        self.checkInterpreterError(RelationException,"lres(L(2,3), L(3,3))")
+
+    def testRowOutOfRange(self):
+        self.checkInterpreterError(RelationException,"row(L(2,3), 2)")
+
+    def testJoinChainNotRelation(self):
+        self.checkInterpreterError(TypeException,"I(2,2) | I(2,2) | 1")
+
+    def testMeetChainDimensionMismatch(self):
+        self.checkInterpreterError(RelationException,"O(2,2) & L(2,2) & L(3,3)")
+
+    def testJoinAllNoArguments(self):
+        self.checkInterpreterError(TypeException,"joinall()")
+
+    def testBisimNotEquivalence(self):
+        self.checkInterpreterError(RelationException,"bisim(I(2,2), new(2,2,[(0,1)]))")
+
+    def testTupleRowMismatch(self):
+        self.checkInterpreterError(RelationException,"tuple(L(2,3), L(3,3))")
+
+    def testSliceOutOfRange(self):
+        self.checkInterpreterError(RelationException,"L(2,3)[0:3, :]")
+
+    def testSliceNotInt(self):
+        self.checkInterpreterError(TypeException,"L(2,3)[0:1, 'a':]")
+
+    def testSliceNotRelation(self):
+        self.checkInterpreterError(TypeException,"x = 1\nx[0:1, 0:1]")
+
+    def testPermuteNotPermutation(self):
+        self.checkInterpreterError(RelationException,"permute(I(3,3), new(3,3,[(0,1),(1,1),(2,2)]))")
+
+    def testDegreeOutOfRange(self):
+        self.checkInterpreterError(RelationException,"outdeg(L(2,3), 2)")
+
+    def testCompareIntRelation(self):
+        self.checkInterpreterError(TypeException,"card(I(2,2)) < I(2,2)")
+
+    def testWeightedJoinRelation(self):
+        self.checkInterpreterError(TypeException,"weighted(I(2,2), minplus) | I(2,2)")
+
+    def testWeightedSemiringMismatch(self):
+        self.checkInterpreterError(RelationException,"weighted(I(2,2), minplus) * weighted(I(2,2), counting)")
+
+    def testWeightedComplement(self):
+        self.checkInterpreterError(TypeException,"~weighted(I(2,2), boolean)")
+
+    def testCountingClosureCycle(self):
+        self.checkInterpreterError(RelationException,"closure(weighted(new(2,2,[(0,1),(1,0)]), counting))")
+
+    def testIsReflexiveNotHomogeneous(self):
+        self.checkInterpreterError(RelationException,"is_reflexive(L(2,3))")
+
+    def testWitnessNotProperty(self):
+        self.checkInterpreterError(TypeException,"witness(I(2,2), closure)")
+
+    def testPowerNotInt(self):
+        self.checkInterpreterError(TypeException,"I(2,2) ** I(2,2)")
+
+    def testPowerNotHomogeneous(self):
+        self.checkInterpreterError(RelationException,"L(2,3) ** 2")
+
 class TestObj:
 
     def __init__(self, test, **kwargs):
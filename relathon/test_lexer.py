@@ -3,6 +3,8 @@
 # This file is part of relathon. Use of this source code is governed by
 # the GPL license that can be found in the LICENSE file.
 
+import io
+import random
 import unittest
 from lexer import *
 from tok import *
@@ -60,6 +62,103 @@ class TestLexer(unittest.TestCase):
         (TILDE,"~"),(EQEQUAL,"=="),(NOTEQUAL,"!="),(LESSEQUAL,"<=")]:
             self.checkTags([tag], op)
 
+    def testRange(self):
+        self.checkTags([LPAR, INTEGER, DOTDOT, INTEGER, COMMA, FLOAT, RPAR, EOF], "(0..99, .5)")
+
+    def testPowerOperator(self):
+        text = "a ** 2 * b"
+        self.checkTags([IDENTIFIER, DOUBLESTAR, INTEGER, STAR, IDENTIFIER, EOF], text)
+
+    def testSliceNotBlock(self):
+        self.assertEqual(0, Lexer(Source('test', "R[0:1, :]"), prompt=True).blocks)
+        self.assertEqual(1, Lexer(Source('test', "if R:"), prompt=True).blocks)
+
+    def testPromptLines(self):
+        text = "if R:\n  x = [(0,1),\n    (1,2)]\n\n"
+        lines = iter(text.splitlines(True))
+        read = []
+        class Console:
+            def readline(self):
+                read.append(next(lines))
+                return read[-1]
+        lexer = Lexer(Source('test', stream=Console()), prompt=True)
+        tokens = [(tok.tag, tok.lexeme, tok.location) for tok in lexer]
+        whole = Lexer(Source('test', text), prompt=True)
+        self.assertEqual([(tok.tag, tok.lexeme, tok.location) for tok in whole.tokens], tokens)
+        self.assertEqual(text, "".join(read))
+        self.assertEqual("\n", lexer.string)
+
+    def testPromptLinesComplete(self):
+        lines = iter(["x = 1\n", "y = 2\n"])
+        class Console:
+            def readline(self):
+                return next(lines)
+        lexer = Lexer(Source('test', stream=Console()), prompt=True)
+        self.assertEqual([IDENTIFIER, EQUAL, INTEGER, NEWLINE, EOF], [tok.tag for tok in lexer])
+        self.assertEqual(["y = 2\n"], list(lines))
+
+    def testStream(self):
+        text = "def f(a):\n    # comment\n    return a * \\\n  b\n\nx = [(0,1),\n  (1,2)]\n"
+        expected = [(tok.tag, tok.lexeme, tok.location) for tok in Lexer(Source('test', text))]
+        lexer = Lexer(Source('test', stream=io.StringIO(text)))
+        lexer.CHUNK_SIZE = 4
+        self.assertEqual(expected, [(tok.tag, tok.lexeme, tok.location) for tok in lexer])
+
+    def testStreamDropsConsumedInput(self):
+        lexer = Lexer(Source('test', stream=io.StringIO("x = y\n" * 100)))
+        lexer.CHUNK_SIZE = 12
+        for tok in lexer:
+            self.assertLess(len(lexer.string), 24)
+        self.assertEqual([], lexer.tokens)
+
+    def testLocationLines(self):
+        text = "a\n  \nif a:\n\tb = c\n"
+        for source in (Source('test', text), Source('test', stream=io.StringIO(text))):
+            lexer = Lexer(source)
+            lexer.CHUNK_SIZE = 3
+            tok = [tok for tok in lexer if tok.lexeme == 'c'][0]
+            self.assertEqual((4, 5, 4, 6), (tok.location.lineBegin, tok.location.columnBegin,
+                                            tok.location.lineEnd, tok.location.columnEnd))
+
+    class RegexLexer(Lexer):
+        """Lexer that matches every token with the expressions and returns
+        the blanks within a line as tokens of their own, as the lexer did
+        before its automata."""
+        def _match(self, string, p):
+            match = self.REGEX.match(string, p)
+            if match is None:
+                return None
+            tag = match.lastgroup
+            return (tag,) + match.span(tag)
+
+    def testSkippedBlanks(self):
+        text = ("def f(a):\n  \t# comment\n\t return a ** 2 *= \\\r\n b\n  \n"
+                "x = [(0,1), ('a', \"b\")] | ~y^ & z\nif .5 <= 00.25 != 1٣.0 >= 012 == 0:\n"
+                "\tpass\n \x0c # form feed\nab-c_d;e[1:,:2] < f > g\n")
+        def tokens(cls):
+            return [(tok.tag, tok.lexeme, tok.location) for tok in cls(Source('test', text))]
+        self.assertEqual(tokens(self.RegexLexer), tokens(Lexer))
+
+    def testSkippedBlanksError(self):
+        for text in ("x = 1 @ 2", "x = 1.", "y = \\ z", "'ab'", "\x0c\n"):
+            with self.assertRaises(LexerException) as spaced:
+                list(Lexer(Source('test', text)))
+            with self.assertRaises(LexerException) as unspaced:
+                list(self.RegexLexer(Source('test', text)))
+            self.assertEqual(unspaced.exception.location, spaced.exception.location)
+
+    def testAutomataRandom(self):
+        random.seed(42)
+        alphabet = "aZ_-09٣1.. \t\n#'=*|&!<>^~()[]:,;@"
+        for _ in range(2000):
+            text = ''.join(random.choice(alphabet) for _ in range(random.randrange(12)))
+            def tokens(cls):
+                try:
+                    return [(tok.tag, tok.lexeme, tok.location) for tok in cls(Source('test', text))]
+                except (LexerException, IndentationException) as e:
+                    return type(e), e.location
+            self.assertEqual(tokens(self.RegexLexer), tokens(Lexer), repr(text))
+
     def testAssignmnetOperators(self):
         for tag, op in [(STAREQUAL,"*="),(VBAREQUAL,"|="),(AMBEREQUAL,"&="),(EQUAL,"=")]:
             self.checkTags([tag], op)
@@ -5,11 +5,12 @@
 
 import unittest
 import ast_node
+from array import array
 from lexer import *
 from parser import *
 from tok import *
-from relathon import Source
-from errors import ParserException, IndentationException
+from relathon import Relathon, PromptParser, Source
+from errors import LexerException, ParserException, IndentationException
 
 
 class TestParserBase(unittest.TestCase):
@@ -39,6 +40,12 @@ class TestParserBase(unittest.TestCase):
 
 class TestParser(TestParserBase):
 
+    def testStatements(self):
+        text = "def f(a):\n\treturn a\n\nx = f(a); y = x\nif x:\n\tpass\n"
+        module = self.parseFromSource(Parser.module, text)
+        statements = Parser(Lexer(Source('test', text))).statements()
+        self.assertEqual(module.statements, list(statements))
+
     def testModuleEmpty(self):
         self.checkParse(astModule([]), Parser.module, "")
 
@@ -98,13 +105,28 @@ class TestParser(TestParserBase):
         self.checkParse(astInteger(Tok(INTEGER,"1")), Parser.integer, "1")
 
     def testOrderedPairs1(self):
-        self.checkParse(astOrderedPairs([(astInteger(Tok(INTEGER,"0")),astInteger(Tok(INTEGER,"1")))]), Parser.ordered_pairs, "[(0,1)]")
+        self.checkParse(astOrderedPairs(array('q', [0]), array('q', [1])), Parser.ordered_pairs, "[(0,1)]")
 
     def testOrderedPairs2(self):
-        self.checkParse(astOrderedPairs([(astInteger(Tok(INTEGER,"0")),astInteger(Tok(INTEGER,"1"))),(astInteger(Tok(INTEGER,"2")),astInteger(Tok(INTEGER,"3")))]), Parser.ordered_pairs, "[(0,1),(2,3)]")
+        self.checkParse(astOrderedPairs(array('q', [0, 2]), array('q', [1, 3])), Parser.ordered_pairs, "[(0,1),(2,3)]")
 
     def testOrderedPairsTrailingComma(self):
-        self.checkParse(astOrderedPairs([(astInteger(Tok(INTEGER,"0")),astInteger(Tok(INTEGER,"1")))]), Parser.ordered_pairs, "[(0,1),]")
+        self.checkParse(astOrderedPairs(array('q', [0]), array('q', [1])), Parser.ordered_pairs, "[(0,1),]")
+
+    def testOrderedPairsRange(self):
+        self.checkParse(astOrderedPairs(array('q', [0, 1, 2, 7]), array('q', [5, 5, 5, 1])), Parser.ordered_pairs, "[(0..2, 5), (7, 1)]")
+
+    def testOrderedPairsRanges(self):
+        self.checkParse(astOrderedPairs(array('q', [0, 0, 1, 1]), array('q', [2, 3, 2, 3])), Parser.ordered_pairs, "[(0..1, 2..3)]")
+
+    def testOrderedPairsEmptyRange(self):
+        self.checkParseError(Parser.ordered_pairs, "[(2..1, 0)]")
+
+    def testOrderedPairsRangeTooLarge(self):
+        self.checkParseError(Parser.ordered_pairs, "[(0..999999, 0..999999)]")
+
+    def testOrderedPairsNotInteger(self):
+        self.checkParseError(Parser.ordered_pairs, "[(a, 0)]")
 
     def testComposition(self):
         self.checkParse(astBinaryOperation(astVariable(Tok(IDENTIFIER, "a")), Tok(STAR, "*"), astVariable(Tok(IDENTIFIER, "b"))), Parser.expr, "a * b")
@@ -155,6 +177,55 @@ class TestParser(TestParserBase):
     def testNegationOnExpr(self):
         self.checkParse(astUnaryOperation(astBinaryOperation(astVariable(Tok(IDENTIFIER, "a")), Tok(STAR, "*"), astVariable(Tok(IDENTIFIER, "b"))), Tok(TILDE, "~")), Parser.expr, "~(a * b)")
 
+    def testPower(self):
+        self.checkParse(astBinaryOperation(astVariable(Tok(IDENTIFIER, "a")), Tok(DOUBLESTAR, "**"), astInteger(Tok(INTEGER, "3"))), Parser.expr, "a ** 3")
+
+    def testTransposePower(self):
+        self.checkParse(astBinaryOperation(astUnaryOperation(astVariable(Tok(IDENTIFIER, "a")), Tok(CIRCUMFLEX, "^")), Tok(DOUBLESTAR, "**"), astInteger(Tok(INTEGER, "2"))), Parser.expr, "a^ ** 2")
+
+    def testNegationPower(self):
+        self.checkParse(astUnaryOperation(astBinaryOperation(astVariable(Tok(IDENTIFIER, "a")), Tok(DOUBLESTAR, "**"), astInteger(Tok(INTEGER, "2"))), Tok(TILDE, "~")), Parser.expr, "~a ** 2")
+
+    def testPowerComposition(self):
+        self.checkParse(astBinaryOperation(astBinaryOperation(astVariable(Tok(IDENTIFIER, "a")), Tok(DOUBLESTAR, "**"), astInteger(Tok(INTEGER, "2"))), Tok(STAR, "*"), astVariable(Tok(IDENTIFIER, "b"))), Parser.expr, "a ** 2 * b")
+
+    def testJoinChain(self):
+        self.checkParse(astNaryOperation(Tok(VBAR, "|"), [astVariable(Tok(IDENTIFIER, "a")), astVariable(Tok(IDENTIFIER, "b")), astVariable(Tok(IDENTIFIER, "c"))]), Parser.expr, "a | b | c")
+
+    def testMeetChain(self):
+        self.checkParse(astNaryOperation(Tok(AMBER, "&"), [astVariable(Tok(IDENTIFIER, "a")), astVariable(Tok(IDENTIFIER, "b")), astVariable(Tok(IDENTIFIER, "c")), astVariable(Tok(IDENTIFIER, "d"))]), Parser.expr, "a & b & c & d")
+
+    def testMixedChain(self):
+        self.checkParse(astBinaryOperation(astVariable(Tok(IDENTIFIER, "a")), Tok(VBAR, "|"), astBinaryOperation(astVariable(Tok(IDENTIFIER, "b")), Tok(AMBER, "&"), astVariable(Tok(IDENTIFIER, "c")))), Parser.expr, "a | b & c")
+
+    def testMixedChainRun(self):
+        self.checkParse(astNaryOperation(Tok(VBAR, "|"), [astVariable(Tok(IDENTIFIER, "a")), astVariable(Tok(IDENTIFIER, "b")), astBinaryOperation(astVariable(Tok(IDENTIFIER, "c")), Tok(AMBER, "&"), astVariable(Tok(IDENTIFIER, "d")))]), Parser.expr, "a | b | c & d")
+
+    def testNotInOperand(self):
+        self.checkParseError(Parser.expr, "a | not b")
+
+    def testCallAfterTranspose(self):
+        self.checkParseError(Parser.expr, "a^(b)")
+
+    def testDeeplyParenthesized(self):
+        depth = 200
+        self.checkParse(astVariable(Tok(IDENTIFIER, "a")), Parser.expr, "(" * depth + "a" + ")" * depth)
+
+    def testSlice(self):
+        self.checkParse(astSubscript(astVariable(Tok(IDENTIFIER, "R")), astSlice(astInteger(Tok(INTEGER, "0")), astInteger(Tok(INTEGER, "2"))), astSlice(astInteger(Tok(INTEGER, "1")), astInteger(Tok(INTEGER, "3")))), Parser.expr, "R[0:2, 1:3]")
+
+    def testSliceOpenBounds(self):
+        self.checkParse(astSubscript(astVariable(Tok(IDENTIFIER, "R")), astSlice(None, None), astSlice(astInteger(Tok(INTEGER, "1")), None)), Parser.expr, "R[:, 1:]")
+
+    def testSliceCall(self):
+        self.checkParse(astSubscript(astFunctionCall(astVariable(Tok(IDENTIFIER, "f")), [astVariable(Tok(IDENTIFIER, "R"))]), astSlice(None, astVariable(Tok(IDENTIFIER, "n"))), astSlice(None, None)), Parser.expr, "f(R)[:n, :]")
+
+    def testSliceTranspose(self):
+        self.checkParse(astUnaryOperation(astSubscript(astVariable(Tok(IDENTIFIER, "R")), astSlice(None, None), astSlice(None, None)), Tok(CIRCUMFLEX, "^")), Parser.expr, "R[:, :]^")
+
+    def testSliceMissingColumns(self):
+        self.checkParseError(Parser.expr, "R[0:2]")
+
     def testAndCondition(self):
         self.checkParse(astBooleanOperation(astVariable(Tok(IDENTIFIER, "a")), Tok(AND, "and"), astVariable(Tok(IDENTIFIER, "b"))), Parser.expr, "a and b")
 
@@ -250,13 +321,13 @@ class TestParser(TestParserBase):
         self.checkParse(astAssignment(astVariable(Tok(IDENTIFIER, "a")), Tok(EQUAL, "="), astTernaryOperation(astVariable(Tok(IDENTIFIER, "b")), astComparison(astVariable(Tok(IDENTIFIER, "b")), Tok(NOTEQUAL, "!="), astVariable(Tok(IDENTIFIER, "c"))), astVariable(Tok(IDENTIFIER, 'd')))), Parser.expr_stmt, "a = b if b != c else d")
 
     def testEmptyBitsInit(self):
-        self.checkParse(astAssignment(astVariable(Tok(IDENTIFIER, "a")), Tok(EQUAL, "="), astOrderedPairs([])), Parser.expr_stmt, "a = []")
+        self.checkParse(astAssignment(astVariable(Tok(IDENTIFIER, "a")), Tok(EQUAL, "="), astOrderedPairs(array('q', []), array('q', []))), Parser.expr_stmt, "a = []")
 
     def testBitsInit(self):
-        self.checkParse(astAssignment(astVariable(Tok(IDENTIFIER, "a")), Tok(EQUAL, "="), astOrderedPairs([(astInteger(Tok(INTEGER,"0")), astInteger(Tok(INTEGER,"1"))),(astInteger(Tok(INTEGER,"2")), astInteger(Tok(INTEGER,"3")))])), Parser.expr_stmt, "a = [(0,1),(2,3)]")
+        self.checkParse(astAssignment(astVariable(Tok(IDENTIFIER, "a")), Tok(EQUAL, "="), astOrderedPairs(array('q', [0, 2]), array('q', [1, 3]))), Parser.expr_stmt, "a = [(0,1),(2,3)]")
 
     def testBitsInitTrailingComma(self):
-        self.checkParse(astAssignment(astVariable(Tok(IDENTIFIER, "a")), Tok(EQUAL, "="), astOrderedPairs([(astInteger(Tok(INTEGER,"0")), astInteger(Tok(INTEGER,"1"))),])), Parser.expr_stmt, "a = [(0,1),]")
+        self.checkParse(astAssignment(astVariable(Tok(IDENTIFIER, "a")), Tok(EQUAL, "="), astOrderedPairs(array('q', [0]), array('q', [1]))), Parser.expr_stmt, "a = [(0,1),]")
 
     def testInvalidBitsEmpty(self):
         self.checkParseError(ParserException, "[()]")
@@ -280,6 +351,36 @@ class TestParser(TestParserBase):
     def testFunctionNewlines(self):
         self.checkParse(astModule([astFunctionDefinition(astVariable(Tok(IDENTIFIER, "foo")), [], astSuite([astPassStatement()]))]), Parser.module, "def foo():\n\n\n\tpass")
 
+    def testPromptParser(self):
+        lines = ["def f(a):\n", "  x = [(0,1),\n", "    (1,2)]\n", "  return a\n", "\n"]
+        parser = PromptParser('test')
+        for line in lines[:-1]:
+            self.assertIsNone(parser.push(line))
+        self.assertEqual(Relathon.parse(Source('test', "".join(lines)), prompt=True),
+                         parser.push(lines[-1]))
+        self.assertIsNone(Relathon.parse(Source('test', "".join(lines[:-1])), prompt=True))
+
+    def testPromptParserErrorAtEnd(self):
+        parser = PromptParser('test')
+        self.assertIsNone(parser.push("while a:\n"))
+        self.assertIsNone(parser.push("  x = a |\n"))
+        with self.assertRaises(ParserException):
+            parser.push("\n")
+
+    def testPromptParserLexerError(self):
+        parser = PromptParser('test')
+        self.assertIsNone(parser.push("while a:\n"))
+        with self.assertRaises(LexerException):
+            parser.push("  x = a @ b\n")
+
+    def testImport(self):
+        self.checkParse(astModule([astImportStatement(astVariable(Tok(IDENTIFIER, "m")))]), Parser.module, "import m")
+
+    def testFromImport(self):
+        self.checkParse(astModule([astFromImportStatement(astVariable(Tok(IDENTIFIER, "m")), [astVariable(Tok(IDENTIFIER, "f")), astVariable(Tok(IDENTIFIER, "g"))])]), Parser.module, "from m import f, g")
+        self.checkParseError(Parser.module, "from m import")
+        self.checkParseError(Parser.module, "from m")
+
     def testFunctionSingleParam(self):
         self.checkParse(astModule([astFunctionDefinition(astVariable(Tok(IDENTIFIER, "foo")), [astParameter(astVariable(Tok(IDENTIFIER, 'a')))], astSuite([astPassStatement()]))]), Parser.module, "def foo(a):\n\tpass")
 
@@ -22,6 +22,7 @@ COLON           = "COLON"
 COMMA           = "COMMA"
 SEMI            = "SEMI"
 STAR            = "STAR"
+DOUBLESTAR      = "DOUBLESTAR"
 VBAR            = "VBAR"
 AMBER           = "AMBER"
 CIRCUMFLEX      = "CIRCUMFLEX"
@@ -36,9 +37,11 @@ STAREQUAL       = "STAREQUAL"
 VBAREQUAL       = "VBAREQUAL"
 AMBEREQUAL      = "AMBEREQUAL"
 TILDE           = "TILDE"
+DOTDOT          = "DOTDOT"
 #keywords
 FUNCDEF         = "FUNCDEF"
 IMPORT          = "IMPORT"
+FROM            = "FROM"
 RETURN          = "RETURN"
 IF              = "IF"
 ELIF            = "ELIF"
@@ -61,16 +64,19 @@ COMMENT         = "COMMENT"
 
 class Token(object):
     """Lexigraphical token object."""
+    __slots__ = ('tag', 'lexeme', 'location')
 
     def __init__(self, tag, lexeme, location):
         self.tag = tag
         self.lexeme = lexeme
         self.location = location
 
+    def __reduce__(self):
+        return (self.__class__, (self.tag, self.lexeme, self.location))
+
     def __eq__(self, other):
         return (isinstance(other, self.__class__) and
-                all(val == other.__dict__[key] for key, val in self.__dict__.items()
-                    if key != "location"))
+                self.tag == other.tag and self.lexeme == other.lexeme)
 
     def __str__(self):
         return "Token({}, {})".format(self.tag, repr(self.lexeme))
@@ -0,0 +1,202 @@
+# Copyright Peter Roger. All rights reserved.
+#
+# This file is part of relathon. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE file.
+
+"""This module implements weighted relations: matrices over a semiring
+rather than over the booleans. Composition multiplies along paths and
+joins add over alternatives, so with the min-plus semiring the closure
+of a relation gives shortest path distances in a single operation.
+
+Only the pairs with a non-zero weight are stored, as one dict per row
+mapping columns to weights."""
+
+from math import inf
+import algorithms
+
+
+class Semiring:
+    """A set of weights with an addition (choosing between alternative
+    paths) and a multiplication (extending a path).
+
+    Attributes:
+        name (str) - semiring name
+        zero - identity of plus and the weight of an absent pair
+        one - identity of times and the weight of the identity relation
+        plus - addition, a function of two weights
+        times - multiplication, a function of two weights
+        idempotent (bool) - whether plus(w, w) == w, so that the closure
+                            can be computed by squaring
+    """
+
+    def __init__(self, name, zero, one, plus, times, idempotent):
+        self.name = name
+        self.zero = zero
+        self.one = one
+        self.plus = plus
+        self.times = times
+        self.idempotent = idempotent
+
+    def __str__(self):
+        return self.name
+
+
+BOOLEAN = Semiring("boolean", 0, 1, max, min, True)
+MIN_PLUS = Semiring("minplus", inf, 0, min, lambda a, b: a + b, True)
+MAX_MIN = Semiring("maxmin", -inf, inf, max, min, True)
+COUNTING = Semiring("counting", 0, 1, lambda a, b: a + b, lambda a, b: a * b, False)
+
+SEMIRINGS = (BOOLEAN, MIN_PLUS, MAX_MIN, COUNTING)
+
+
+class WeightedRelation:
+    """A rows x cols matrix over a semiring.
+
+    Attributes:
+        rows (int) - number of rows
+        cols (int) - number of columns
+        semiring (Semiring) - the weights
+        entries (list) - one dict per row mapping columns to non-zero weights
+    """
+
+    def __init__(self, rows, cols, semiring, entries=None):
+        self.rows = rows
+        self.cols = cols
+        self.semiring = semiring
+        self.entries = entries if entries is not None else [{} for _ in range(rows)]
+
+    def _check(self, other, rows, cols):
+        if self.semiring is not other.semiring:
+            raise ValueError("cannot combine {} and {} weighted relations.".format(self.semiring, other.semiring))
+        if (rows, cols) != (other.rows, other.cols):
+            raise ValueError("weighted relations of dimension [{}<->{}] and [{}<->{}] cannot be combined.".format(self.rows, self.cols, other.rows, other.cols))
+
+    def composition(self, other):
+        """Return the matrix product: the weight of (i, k) is the sum
+        over j of the products of the weights of (i, j) and (j, k)."""
+        self._check(other, self.cols, other.cols)
+        plus, times, zero = self.semiring.plus, self.semiring.times, self.semiring.zero
+        entries = []
+        for row in self.entries:
+            result = {}
+            for j, a in row.items():
+                for k, b in other.entries[j].items():
+                    weight = times(a, b)
+                    result[k] = plus(result[k], weight) if k in result else weight
+            entries.append({k: w for k, w in result.items() if w != zero})
+        return WeightedRelation(self.rows, other.cols, self.semiring, entries)
+
+    def join(self, other):
+        """Return the elementwise sum."""
+        self._check(other, self.rows, self.cols)
+        plus = self.semiring.plus
+        entries = []
+        for row, other_row in zip(self.entries, other.entries):
+            result = dict(row)
+            for j, w in other_row.items():
+                result[j] = plus(result[j], w) if j in result else w
+            entries.append(result)
+        return WeightedRelation(self.rows, self.cols, self.semiring, entries)
+
+    def transpose(self):
+        entries = [{} for _ in range(self.cols)]
+        for i, row in enumerate(self.entries):
+            for j, w in row.items():
+                entries[j][i] = w
+        return WeightedRelation(self.cols, self.rows, self.semiring, entries)
+
+    def identity(self):
+        """Return the identity with the dimension of this relation."""
+        one = self.semiring.one
+        entries = [{i: one} if i < self.cols else {} for i in range(self.rows)]
+        return WeightedRelation(self.rows, self.cols, self.semiring, entries)
+
+    def power(self, n):
+        """Return the relation composed with itself n times, by
+        repeated squaring."""
+        if self.rows != self.cols:
+            raise ValueError("power needs a homogeneous relation, not [{}<->{}].".format(self.rows, self.cols))
+        if n < 0:
+            raise ValueError("power needs a non-negative exponent, not {}.".format(n))
+        result = self.identity()
+        square = self
+        while n:
+            if n & 1:
+                result = result.composition(square)
+            n >>= 1
+            if n:
+                square = square.composition(square)
+        return result
+
+    def closure(self):
+        """Return the sum of all positive powers of the relation.
+
+        For an idempotent semiring the closure is computed by iterative
+        squaring, which converges after O(log n) steps unless there is
+        a cycle of negative weight. Otherwise the powers are summed
+        until they vanish, which they do unless there is a cycle.
+        """
+        if self.rows != self.cols:
+            raise ValueError("closure needs a homogeneous relation, not [{}<->{}].".format(self.rows, self.cols))
+        if self.semiring.idempotent:
+            result = self
+            for _ in range(self.rows.bit_length() + 1):
+                step = result.join(result.composition(result))
+                if step.equals(result):
+                    return step
+                result = step
+            raise ValueError("closure does not converge; the relation has a cycle of negative weight.")
+        result = power = self
+        for _ in range(self.rows):
+            power = power.composition(self)
+            if power.is_empty():
+                return result.copy() if result is self else result
+            result = result.join(power)
+        raise ValueError("closure does not converge; the relation has a cycle.")
+
+    def equals(self, other):
+        return (isinstance(other, WeightedRelation) and self.semiring is other.semiring
+                and (self.rows, self.cols) == (other.rows, other.cols)
+                and self.entries == other.entries)
+
+    def notEquals(self, other):
+        return not self.equals(other)
+
+    def is_empty(self):
+        return not any(self.entries)
+
+    def weight(self, i, j):
+        """Return the weight of (i, j); zero if the pair is absent."""
+        if not (0 <= i < self.rows and 0 <= j < self.cols):
+            raise ValueError("pair ({}, {}) is out of range for a relation of dimension [{}<->{}].".format(i, j, self.rows, self.cols))
+        return self.entries[i].get(j, self.semiring.zero)
+
+    def pairs(self):
+        """Return the pairs with a non-zero weight."""
+        return [(i, j) for i, row in enumerate(self.entries) for j in row]
+
+    def copy(self):
+        return WeightedRelation(self.rows, self.cols, self.semiring, [dict(row) for row in self.entries])
+
+    def __str__(self):
+        def show(w):
+            return "{:g}".format(w) if isinstance(w, float) else str(w)
+        cells = [[show(row[j]) if j in row else '.' for j in range(self.cols)] for row in self.entries]
+        width = max((len(cell) for line in cells for cell in line), default=1)
+        return "\n".join(" ".join(cell.rjust(width) for cell in line) for line in cells)
+
+
+def from_relation(context, relation, semiring, weight=None):
+    """Return the weighted relation giving each pair of a boolean
+    relation the same weight; by default the one of the semiring."""
+    weight = semiring.one if weight is None else weight
+    result = WeightedRelation(relation.rows, relation.cols, semiring)
+    if weight != semiring.zero:
+        for i, j in algorithms.pairs(context, relation):
+            result.entries[i][j] = weight
+    return result
+
+
+def support(context, weighted):
+    """Return the boolean relation of the pairs with a non-zero weight."""
+    return context.new(weighted.rows, weighted.cols, weighted.pairs())